@@ -0,0 +1,3 @@
+"""
+Бенчмарки Simple Time Tracker: генератор синтетической БД и замеры горячих путей
+"""
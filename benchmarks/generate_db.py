@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Генератор синтетической БД трекера для бенчмарков
+
+Создает db.json (или db.sqlite) заданного объема: дерево проектов заданной глубины,
+дневные маски проектов за несколько лет, пассивные маски и (опционально) заголовки
+окон по слотам. Данные детерминированы seed, поэтому замеры разных версий
+сравнимы между собой.
+
+Использование:
+    python benchmarks/generate_db.py /tmp/bench/db.json --projects 200 --depth 4 --years 3
+    python benchmarks/generate_db.py /tmp/bench/db.sqlite --projects 50 --windows
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.hierarchy import recompute_all_aggregates
+from core.masks import SLOTS_PER_DAY, format_mask, count_minutes
+from core.storage import open_storage
+from core.tracking import update_daily_analysis
+from core.windows import set_window_slot
+
+
+# Заголовки окон для daily_windows (--windows)
+WINDOW_TITLES = [
+    'main.py - simple-tracker - Visual Studio Code',
+    'storage.py - simple-tracker - Visual Studio Code',
+    'Pull requests - Google Chrome',
+    'Документация API - Google Chrome',
+    'Telegram',
+    'Входящие - Outlook',
+    'Терминал',
+    'Отчет за квартал.xlsx - Excel'
+]
+
+PROJECT_COLORS = ['#4CAF50', '#2196F3', '#FF9800', '#9C27B0', '#F44336', '#009688']
+
+
+def build_project_tree(rng, count, depth):
+    """
+    Создает список проектов с иерархией не глубже depth уровней
+
+    Returns:
+        list: Проекты без масок (id, path, title, status, ...)
+    """
+    projects = []
+    for i in range(count):
+        candidates = [project for project in projects if project['path'].count('/') < depth - 1]
+        parent = rng.choice(candidates) if candidates and rng.random() < 0.6 else None
+
+        project_id = f'project-{i:04d}'
+        projects.append({
+            'id': project_id,
+            'path': f"{parent['path']}/{project_id}" if parent else project_id,
+            'title': f'Проект {i}',
+            'status': 'paused',
+            'fill_color': PROJECT_COLORS[i % len(PROJECT_COLORS)],
+            'total_minutes': 0,
+            'aggregated_minutes': 0,
+            'description': '',
+            'daily_masks': {}
+        })
+    return projects
+
+
+def generate_day(rng, project_count):
+    """
+    Генерирует рабочий день: сессии работы за компьютером, распределенные между проектами
+
+    Returns:
+        tuple: (биты активности компьютера, {индекс проекта: биты})
+    """
+    computer = 0
+    slot = rng.randint(0, 24)
+    while slot < SLOTS_PER_DAY:
+        length = rng.randint(6, 36)
+        computer |= ((1 << min(length, SLOTS_PER_DAY - slot)) - 1) << slot
+        slot += length + rng.randint(1, 24)
+
+    # Сессии делятся на отрезки: часть отрезков - работа над проектом, часть - непроектная
+    projects = {}
+    day_projects = rng.sample(range(project_count), min(project_count, rng.randint(1, 4)))
+    slot = 0
+    while slot < SLOTS_PER_DAY:
+        length = rng.randint(3, 18)
+        chunk = (((1 << length) - 1) << slot) & computer & ((1 << SLOTS_PER_DAY) - 1)
+        if chunk and rng.random() < 0.8:
+            index = rng.choice(day_projects)
+            projects[index] = projects.get(index, 0) | chunk
+        slot += length
+    return computer, projects
+
+
+def generate_db(projects=50, depth=3, years=1.0, passive=True, windows=False, seed=42, end_date=None):
+    """
+    Генерирует данные БД
+
+    Args:
+        projects (int): Количество проектов
+        depth (int): Максимальная глубина иерархии
+        years (float): Сколько лет истории масок
+        passive (bool): Генерировать пассивные маски
+        windows (bool): Генерировать заголовки окон по слотам
+        seed (int): Seed генератора случайных чисел
+        end_date (date): Последний день истории (по умолчанию - вчера)
+
+    Returns:
+        dict: Данные БД в формате db.json
+    """
+    rng = random.Random(seed)
+    end_date = end_date or date.today() - timedelta(days=1)
+    day_count = max(1, int(years * 365))
+
+    project_list = build_project_tree(rng, projects, depth)
+    passive_tracking = {'enabled': True, 'daily_masks': {}, 'analysis': {}}
+
+    for offset in range(day_count - 1, -1, -1):
+        day = end_date - timedelta(days=offset)
+        # Выходные - редкая работа
+        if day.weekday() >= 5 and rng.random() > 0.1:
+            continue
+
+        day_key = day.isoformat()
+        computer, day_projects = generate_day(rng, len(project_list))
+        project_bits = 0
+        for index, bits in day_projects.items():
+            project_list[index]['daily_masks'][day_key] = format_mask(bits)
+            project_bits |= bits
+
+        if passive:
+            first = (computer & -computer).bit_length() - 1
+            span = ((1 << computer.bit_length()) - 1) & ~((1 << first) - 1)
+            passive_tracking['daily_masks'][day_key] = {
+                'computer_activity': format_mask(computer),
+                'project_activity': format_mask(project_bits),
+                'idle_periods': format_mask(span & ~computer),
+                'untracked_work': format_mask(computer & ~project_bits)
+            }
+            update_daily_analysis(passive_tracking, day_key)
+
+        if windows:
+            slot = 0
+            while slot < SLOTS_PER_DAY:
+                title = rng.choice(WINDOW_TITLES)
+                for position in range(slot, min(slot + rng.randint(1, 6), SLOTS_PER_DAY)):
+                    if computer >> position & 1:
+                        set_window_slot(passive_tracking, day_key, position, title)
+                slot = position + 1
+
+    for project in project_list:
+        project['total_minutes'] = sum(count_minutes(mask) for mask in project['daily_masks'].values())
+    recompute_all_aggregates(project_list)
+
+    # Активный проект - самый глубокий из последних проектов с работой
+    worked = [project for project in project_list if project['daily_masks']] or project_list
+    if worked:
+        max(worked[-10:], key=lambda project: project['path'].count('/'))['status'] = 'active'
+
+    return {
+        'meta': {
+            'work_hours': {'start': '08:00', 'end': '20:00'},
+            'idle_threshold_seconds': 300,
+            # Бенчмарк не должен показывать окна и снимать замеры
+            'break_reminders': {'enabled': False},
+            'activity_monitoring': {'idle_threshold_seconds': 300, 'sample_interval_seconds': 0},
+            'passive_tracking': passive_tracking if passive else {'enabled': False, 'daily_masks': {}},
+            'generator': {'projects': projects, 'depth': depth, 'years': years, 'seed': seed}
+        },
+        'projects': project_list
+    }
+
+
+def write_db(data, path):
+    """
+    Записывает данные через хранилище (db.json с шардами истории или SQLite по расширению)
+
+    Returns:
+        str: Путь к БД
+    """
+    storage = open_storage(path)
+    try:
+        storage.save(data)
+    finally:
+        storage.close()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Генератор синтетической БД Simple Time Tracker')
+    parser.add_argument('path', help='Путь к БД (.json или .sqlite)')
+    parser.add_argument('--projects', type=int, default=50, help='Количество проектов (по умолчанию: 50)')
+    parser.add_argument('--depth', type=int, default=3, help='Глубина иерархии (по умолчанию: 3)')
+    parser.add_argument('--years', type=float, default=1.0, help='Лет истории масок (по умолчанию: 1)')
+    parser.add_argument('--no-passive', action='store_true', help='Без пассивных масок')
+    parser.add_argument('--windows', action='store_true', help='Заголовки окон по слотам')
+    parser.add_argument('--seed', type=int, default=42, help='Seed генератора (по умолчанию: 42)')
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        print(f"ОШИБКА: {args.path} уже существует")
+        return 1
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.path)), exist_ok=True)
+    data = generate_db(args.projects, args.depth, args.years, not args.no_passive, args.windows, args.seed)
+    write_db(data, args.path)
+
+    days = len({day for project in data['projects'] for day in project['daily_masks']})
+    print(f"OK {args.path}: {len(data['projects'])} проектов, {days} рабочих дней")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
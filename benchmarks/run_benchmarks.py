@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Бенчмарки горячих путей трекера на синтетической БД
+
+Генерирует БД (см. generate_db.py) во временной директории и замеряет:
+    quick_track               - тик трекера (загрузка без истории + запись тика)
+    load_db / load_db(meta)   - полная загрузка и загрузка только метаданных
+    save_db                   - сохранение всей БД
+    update_aggregated_minutes - подъем дельты по предкам и полный пересчет поддерева
+    show_tree                 - команда tracker tree (вывод подавляется)
+    calculate_hourly_timeline_data и маршруты Flask через test client
+                              (только если установлен Flask)
+
+Результаты пишутся в JSON (stdout или --output) для сравнения версий:
+    {"parameters": {...}, "environment": {...}, "results": [{"name", "runs", "first_ms",
+     "min_ms", "median_ms", "mean_ms", "max_ms"}], "skipped": [{"name", "reason"}]}
+
+Использование:
+    python benchmarks/run_benchmarks.py --projects 200 --depth 4 --years 3 --output before.json
+    python benchmarks/run_benchmarks.py --backend sqlite --repeat 50 --only quick_track,save_db
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.generate_db import generate_db, write_db
+
+
+# Маршруты дашборда (GET), {date} / {from} / {to} подставляются датами синтетической БД
+API_ROUTES = [
+    '/api/projects',
+    '/api/active',
+    '/api/analytics?date={date}',
+    '/api/timeline?date={date}',
+    '/api/timeline/data?date={date}',
+    '/api/timeline/range?from={from}&to={to}&granularity=day',
+    '/api/windows?date={date}',
+    '/api/health',
+    '/metrics'
+]
+
+
+def measure(name, func, repeat, setup=None):
+    """
+    Замеряет функцию repeat раз
+
+    Args:
+        name (str): Название сценария
+        func (callable): Замеряемая функция func(*setup(i))
+        repeat (int): Количество запусков
+        setup (callable): Подготовка аргументов запуска setup(i) -> tuple (не замеряется)
+
+    Returns:
+        dict: Статистика в миллисекундах
+    """
+    timings = []
+    for i in range(repeat):
+        args = setup(i) if setup else ()
+        start = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'name': name,
+        'runs': repeat,
+        'first_ms': round(timings[0], 3),
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'max_ms': round(max(timings), 3)
+    }
+
+
+def get_git_commit():
+    """Возвращает текущий коммит репозитория (None вне git)"""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def get_directory_size(path):
+    """Суммарный размер файлов директории в байтах"""
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def run_benchmarks(projects=50, depth=3, years=1.0, windows=True, backend='json', repeat=20, only=None, seed=42):
+    """
+    Генерирует БД и выполняет сценарии
+
+    Args:
+        projects (int): Количество проектов
+        depth (int): Глубина иерархии
+        years (float): Лет истории масок
+        windows (bool): Генерировать заголовки окон
+        backend (str): 'json' или 'sqlite'
+        repeat (int): Запусков на сценарий
+        only (list): Выполнить только сценарии с этими названиями (по началу названия)
+        seed (int): Seed генератора
+
+    Returns:
+        dict: Результаты для JSON
+    """
+    temp_dir = tempfile.mkdtemp(prefix='tracker-bench-')
+    saved_env = {key: os.environ.get(key) for key in ('TRACKER_DB', 'TRACKER_ACTIVITY_REPLAY')}
+    results = []
+    skipped = []
+
+    def selected(name):
+        return not only or any(name.startswith(prefix) for prefix in only)
+
+    def run(name, func, setup=None):
+        if selected(name):
+            results.append(measure(name, func, repeat, setup))
+
+    try:
+        db_path = os.path.join(temp_dir, 'db.sqlite' if backend == 'sqlite' else 'db.json')
+        generate_started = time.perf_counter()
+        data = generate_db(projects, depth, years, passive=True, windows=windows, seed=seed)
+        write_db(data, db_path)
+        generate_seconds = time.perf_counter() - generate_started
+
+        # Хранилище и активность всех сценариев - синтетические (пользователь всегда активен)
+        replay_path = os.path.join(temp_dir, 'activity.txt')
+        with open(replay_path, 'w', encoding='utf-8') as f:
+            f.write("1.0 | main.py - simple-tracker - Visual Studio Code\n")
+        os.environ['TRACKER_DB'] = db_path
+        os.environ['TRACKER_ACTIVITY_REPLAY'] = replay_path
+
+        import project_manager
+        import tracker_quick
+        from core.hierarchy import update_aggregated_minutes
+
+        last_day = (date.today() - timedelta(days=1)).isoformat()
+        first_day = (date.today() - timedelta(days=30)).isoformat()
+
+        # ---------- CLI и хранилище ----------
+
+        run('load_db', lambda: project_manager.load_db())
+        run('load_db(meta)', lambda: project_manager.load_db(masks=False))
+
+        loaded, loaded_path = project_manager.load_db()
+        run('save_db', lambda: project_manager.save_db(loaded, loaded_path))
+
+        def show_tree():
+            with contextlib.redirect_stdout(io.StringIO()):
+                project_manager.show_tree()
+        run('show_tree', show_tree)
+
+        deepest = max(loaded['projects'], key=lambda project: project['path'].count('/'))
+        run('update_aggregated_minutes(delta)',
+            lambda: update_aggregated_minutes(deepest['path'], loaded['projects'], delta=5))
+        run('update_aggregated_minutes(recompute)',
+            lambda: update_aggregated_minutes(deepest['path'], loaded['projects']))
+
+        # ---------- Веб-сервер ----------
+
+        # web_server без Flask пытается установить его - импортируем только при наличии
+        if importlib.util.find_spec('flask') is None or importlib.util.find_spec('flask_cors') is None:
+            for name in ['calculate_hourly_timeline_data'] + [f'GET {route.split("?")[0]}' for route in API_ROUTES]:
+                if selected(name):
+                    skipped.append({'name': name, 'reason': 'flask not installed'})
+        else:
+            import web_server
+
+            run('calculate_hourly_timeline_data', lambda: web_server.calculate_hourly_timeline_data(last_day, loaded))
+
+            client = web_server.app.test_client()
+            for route in API_ROUTES:
+                url = route.format(**{'date': last_day, 'from': first_day, 'to': last_day})
+                run(f'GET {route.split("?")[0]}', lambda url=url: client.get(url))
+
+        # ---------- Трекер ----------
+
+        # Каждый запуск - новый слот сегодняшнего дня (повторный тик в слот ничего не пишет)
+        tick_start = datetime.combine(date.today(), datetime.min.time()).replace(hour=8)
+        run('quick_track', tracker_quick.quick_track,
+            setup=lambda i: (temp_dir, tick_start + timedelta(minutes=5 * (i % 144))))
+
+        return {
+            'parameters': {
+                'projects': projects, 'depth': depth, 'years': years, 'windows': windows,
+                'backend': backend, 'repeat': repeat, 'seed': seed
+            },
+            'environment': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'git_commit': get_git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'db_size_bytes': get_directory_size(temp_dir),
+                'generate_seconds': round(generate_seconds, 3)
+            },
+            'results': results,
+            'skipped': skipped
+        }
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарки Simple Time Tracker на синтетической БД')
+    parser.add_argument('--projects', type=int, default=50, help='Количество проектов (по умолчанию: 50)')
+    parser.add_argument('--depth', type=int, default=3, help='Глубина иерархии (по умолчанию: 3)')
+    parser.add_argument('--years', type=float, default=1.0, help='Лет истории масок (по умолчанию: 1)')
+    parser.add_argument('--no-windows', action='store_true', help='Без заголовков окон')
+    parser.add_argument('--backend', choices=('json', 'sqlite'), default='json', help='Хранилище (по умолчанию: json)')
+    parser.add_argument('--repeat', type=int, default=20, help='Запусков на сценарий (по умолчанию: 20)')
+    parser.add_argument('--only', help='Сценарии через запятую (по началу названия)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed генератора (по умолчанию: 42)')
+    parser.add_argument('--output', help='Файл результатов JSON (по умолчанию: stdout)')
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        projects=args.projects, depth=args.depth, years=args.years, windows=not args.no_windows,
+        backend=args.backend, repeat=max(1, args.repeat), seed=args.seed,
+        only=[name.strip() for name in args.only.split(',')] if args.only else None
+    )
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        for result in report['results']:
+            print(f"{result['name']:<40} median {result['median_ms']:>9.3f} ms  (min {result['min_ms']:.3f})")
+        for item in report['skipped']:
+            print(f"{item['name']:<40} пропущен: {item['reason']}")
+        print(f"OK Результаты: {args.output}")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
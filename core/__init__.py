@@ -1,37 +1,47 @@
 """
 Core модули для Simple Time Tracker
 Поддержка иерархических проектов и отслеживания активности
+
+Имена пакета загружаются при первом обращении (PEP 562): `from core.storage import ...`
+не тянет за собой core.active (ctypes) и core.notifications (tkinter), поэтому
+CLI и трекер стартуют без лишних импортов.
 """
+import importlib
+
+# Имя -> модуль, из которого оно реэкспортируется
+_EXPORTS = {
+    'transliterate': 'transliteration',
+    'generate_id_from_title': 'transliteration',
+    'generate_path_from_title': 'transliteration',
+    'detect_db_format': 'compatibility',
+    'ensure_project_fields': 'compatibility',
+    'get_aggregated_minutes_compat': 'compatibility',
+    'calculate_aggregated_minutes': 'hierarchy',
+    'update_aggregated_minutes': 'hierarchy',
+    'recompute_all_aggregates': 'hierarchy',
+    'get_all_parent_paths': 'hierarchy',
+    'is_direct_child': 'hierarchy',
+    'find_project_by_path': 'hierarchy',
+    'get_project_level': 'hierarchy',
+    'ProjectIndex': 'hierarchy',
+    'UserActivityMonitor': 'active',
+    'create_activity_monitor_from_config': 'active',
+    'show_break_notification': 'notifications',
+    'check_break_needed': 'notifications',
+    'show_simple_notification': 'notifications'
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module 'core' has no attribute '{name}'")
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+    return value
 
-from .transliteration import transliterate, generate_id_from_title, generate_path_from_title
-from .compatibility import detect_db_format, ensure_project_fields, get_aggregated_minutes_compat
-from .hierarchy import (
-    calculate_aggregated_minutes, 
-    update_aggregated_minutes,
-    get_all_parent_paths,
-    is_direct_child,
-    find_project_by_path,
-    get_project_level
-)
-from .active import UserActivityMonitor, create_activity_monitor_from_config
-from .notifications import show_break_notification, check_break_needed, show_simple_notification
 
-__all__ = [
-    'transliterate',
-    'generate_id_from_title', 
-    'generate_path_from_title',
-    'detect_db_format',
-    'ensure_project_fields',
-    'get_aggregated_minutes_compat',
-    'calculate_aggregated_minutes',
-    'update_aggregated_minutes',
-    'get_all_parent_paths',
-    'is_direct_child',
-    'find_project_by_path',
-    'get_project_level',
-    'UserActivityMonitor',
-    'create_activity_monitor_from_config',
-    'show_break_notification',
-    'check_break_needed',
-    'show_simple_notification'
-]
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,34 +1,128 @@
 #!/usr/bin/env python3
 """
-core/active.py - Отслеживание активности пользователя Windows
-Этап 1: Базовая проверка активности через Windows API
+core/active.py - Отслеживание активности пользователя
+Этап 1: Базовая проверка активности через источник активности платформы
+(Windows API, X11, /proc/interrupts или файл замеров - см. core.activity_backends)
+
+Без выборок активность слота определяется одним замером времени бездействия в момент тика.
+В режиме демона монитор снимает замеры каждые sample_interval_seconds в кольцевой буфер
+(ActivitySampler) и считает слот активным, если доля активных замеров за последние 5 минут
+не меньше active_fraction_threshold. На диск попадает только итог слота.
+
+Настройки в meta.activity_monitoring БД:
+    {"idle_threshold_seconds": 300, "sample_interval_seconds": 10, "active_fraction_threshold": 0.2,
+     "backend": "auto"}
 """
-import ctypes
+import math
 import time
 import json
+from array import array
 from datetime import datetime
-from ctypes import wintypes
 
+from .activity_backends import create_activity_backend
+
+
+# Интервал замеров в режиме демона (0 - замеры выключены)
+DEFAULT_SAMPLE_INTERVAL_SECONDS = 10
 
-class LASTINPUTINFO(ctypes.Structure):
-    """Структура для GetLastInputInfo Windows API"""
-    _fields_ = [
-        ('cbSize', wintypes.UINT),
-        ('dwTime', wintypes.DWORD)
-    ]
+# Минимальная доля активных замеров, при которой слот считается активным (1 минута из 5)
+DEFAULT_ACTIVE_FRACTION_THRESHOLD = 0.2
+
+# Окно, по которому считается доля активности - длительность слота
+SLOT_SECONDS = 300
+
+
+class ActivitySampler:
+    """
+    Кольцевой буфер замеров времени бездействия
+    
+    Хранит последние замеры в двух массивах фиксированного размера (время по
+    time.monotonic и секунды бездействия), памяти - несколько килобайт независимо
+    от времени работы демона. Замер активен, если ввод был после предыдущего
+    замера (бездействие меньше интервала).
+    """
+    
+    def __init__(self, interval_seconds=DEFAULT_SAMPLE_INTERVAL_SECONDS, window_seconds=SLOT_SECONDS):
+        """
+        Args:
+            interval_seconds (float): Интервал между замерами
+            window_seconds (float): Окно, по которому считается доля активности
+        """
+        self.interval = interval_seconds
+        self.window = window_seconds
+        # Замеров за окно + запас на неровные паузы между ними
+        self.size = int(math.ceil(window_seconds / interval_seconds)) * 2
+        self._times = array('d', [0.0]) * self.size
+        self._idle = array('f', [0.0]) * self.size
+        self._count = 0
+        self._next = 0
+    
+    def __len__(self):
+        return self._count
+    
+    def add(self, idle_seconds, timestamp=None):
+        """
+        Добавляет замер (самый старый замер перезаписывается)
+        
+        Args:
+            idle_seconds (float): Время бездействия в момент замера
+            timestamp (float): Время замера по time.monotonic (по умолчанию - текущее)
+        """
+        self._times[self._next] = time.monotonic() if timestamp is None else timestamp
+        self._idle[self._next] = idle_seconds
+        self._next = (self._next + 1) % self.size
+        self._count = min(self._count + 1, self.size)
+    
+    def clear(self):
+        self._count = 0
+        self._next = 0
+    
+    def get_active_fraction(self, now=None):
+        """
+        Считает долю активных замеров за последнее окно
+        
+        Args:
+            now (float): Текущее время по time.monotonic (по умолчанию - текущее)
+            
+        Returns:
+            tuple: (доля 0..1 или None, количество замеров в окне) - None, если замеров
+                меньше половины ожидаемых (демон только запущен или система спала)
+        """
+        now = time.monotonic() if now is None else now
+        since = now - self.window
+        samples = 0
+        active = 0
+        for i in range(self._count):
+            position = (self._next - 1 - i) % self.size
+            if self._times[position] <= since:
+                break
+            samples += 1
+            if self._idle[position] < self.interval:
+                active += 1
+        
+        if samples < max(1, int(self.window / self.interval) // 2):
+            return None, samples
+        return active / samples, samples
 
 
 class UserActivityMonitor:
-    """Монитор активности пользователя Windows"""
+    """Монитор активности пользователя"""
     
-    def __init__(self, idle_threshold_seconds=300):
+    def __init__(self, idle_threshold_seconds=300, sampler=None,
+                 active_fraction_threshold=DEFAULT_ACTIVE_FRACTION_THRESHOLD, backend=None):
         """
         Инициализация монитора активности
         
         Args:
             idle_threshold_seconds (int): Порог бездействия в секундах (по умолчанию 5 минут)
+            sampler (ActivitySampler): Буфер замеров (режим демона), None - только мгновенный замер
+            active_fraction_threshold (float): Доля активных замеров для активного слота
+            backend: Источник активности (по умолчанию - автоматический выбор для платформы)
         """
         self.idle_threshold = idle_threshold_seconds
+        self.sampler = sampler
+        self.active_fraction_threshold = active_fraction_threshold
+        self.backend = backend if backend is not None else create_activity_backend()
         
     def get_idle_time(self):
         """
@@ -38,26 +132,7 @@ class UserActivityMonitor:
             float: Время бездействия в секундах
         """
         try:
-            # Создаем структуру для API вызова
-            lii = LASTINPUTINFO()
-            lii.cbSize = ctypes.sizeof(LASTINPUTINFO)
-            
-            # Вызываем Windows API
-            result = ctypes.windll.user32.GetLastInputInfo(ctypes.byref(lii))
-            
-            if not result:
-                # Если API вызов неудачен, возвращаем 0 (считаем пользователя активным)
-                return 0.0
-            
-            # Получаем текущее время системы
-            current_time = ctypes.windll.kernel32.GetTickCount()
-            
-            # Вычисляем время бездействия
-            idle_time_ms = current_time - lii.dwTime
-            idle_time_seconds = idle_time_ms / 1000.0
-            
-            # Защита от отрицательных значений (может происходить при переполнении)
-            return max(0.0, idle_time_seconds)
+            return float(self.backend.get_idle_time())
             
         except Exception as e:
             # В случае ошибки считаем пользователя активным
@@ -71,27 +146,23 @@ class UserActivityMonitor:
             str: Заголовок активного окна или пустую строку при ошибке
         """
         try:
-            # Получаем handle активного окна
-            hwnd = ctypes.windll.user32.GetForegroundWindow()
-            
-            if not hwnd:
-                return ""
-            
-            # Получаем длину заголовка
-            length = ctypes.windll.user32.GetWindowTextLengthW(hwnd)
-            
-            if length == 0:
-                return ""
-            
-            # Создаем буфер и получаем заголовок
-            buff = ctypes.create_unicode_buffer(length + 1)
-            ctypes.windll.user32.GetWindowTextW(hwnd, buff, length + 1)
-            
-            return buff.value or ""
+            return self.backend.get_active_window_title() or ""
             
         except Exception as e:
             return ""
     
+    def sample(self):
+        """
+        Снимает замер времени бездействия в буфер (если он есть)
+        
+        Returns:
+            float: Время бездействия в секундах
+        """
+        idle_time = self.get_idle_time()
+        if self.sampler is not None:
+            self.sampler.add(idle_time)
+        return idle_time
+    
     def is_user_active(self):
         """
         Определяет активен ли пользователь
@@ -126,19 +197,31 @@ class UserActivityMonitor:
         Returns:
             dict: Полный отчет с timestamp, активностью и активным окном
         """
-        idle_time = self.get_idle_time()
+        idle_time = self.sample()
         is_active = idle_time < self.idle_threshold
         active_window = self.get_active_window_title()
         
-        return {
+        report = {
             'timestamp': datetime.now().isoformat(),
             'is_active': is_active,
             'idle_seconds': round(idle_time, 1),
             'threshold_seconds': self.idle_threshold,
             'activity_level': self._get_activity_level(idle_time),
             'active_window': active_window,
-            'window_available': bool(active_window)
+            'window_available': bool(active_window),
+            'backend': self.backend.name
         }
+        
+        # При достаточном числе замеров активность слота - доля активных замеров,
+        # а не один замер в момент тика
+        if self.sampler is not None:
+            fraction, samples = self.sampler.get_active_fraction()
+            report['samples'] = samples
+            if fraction is not None:
+                report['active_fraction'] = round(fraction, 3)
+                report['is_active'] = fraction >= self.active_fraction_threshold
+        
+        return report
     
     def _get_activity_level(self, idle_time):
         """
@@ -158,12 +241,14 @@ class UserActivityMonitor:
             return 'away'
 
 
-def create_activity_monitor_from_config(config_data):
+def create_activity_monitor_from_config(config_data, sampler=None, state_path=None):
     """
     Создает монитор активности на основе конфигурации
     
     Args:
         config_data (dict): Данные конфигурации из db.json
+        sampler (ActivitySampler): Буфер замеров (режим демона), опционально
+        state_path (str): Файл состояния источника между разовыми запусками, опционально
         
     Returns:
         UserActivityMonitor: Настроенный монитор активности
@@ -174,8 +259,29 @@ def create_activity_monitor_from_config(config_data):
     
     # Используем значение из конфигурации или значение по умолчанию
     idle_threshold = activity_config.get('idle_threshold_seconds', 300)
+    active_fraction = activity_config.get('active_fraction_threshold', DEFAULT_ACTIVE_FRACTION_THRESHOLD)
+    
+    return UserActivityMonitor(
+        idle_threshold_seconds=idle_threshold, sampler=sampler, active_fraction_threshold=active_fraction,
+        backend=create_activity_backend(activity_config, state_path)
+    )
+
+
+def create_activity_sampler_from_config(config_data):
+    """
+    Создает буфер замеров для режима демона
     
-    return UserActivityMonitor(idle_threshold_seconds=idle_threshold)
+    Args:
+        config_data (dict): Данные конфигурации из db.json
+        
+    Returns:
+        ActivitySampler|None: Буфер замеров или None, если замеры выключены (интервал 0)
+    """
+    activity_config = config_data.get('meta', {}).get('activity_monitoring', {})
+    interval = activity_config.get('sample_interval_seconds', DEFAULT_SAMPLE_INTERVAL_SECONDS)
+    if not interval or interval <= 0:
+        return None
+    return ActivitySampler(interval_seconds=min(interval, SLOT_SECONDS))
 
 
 def test_activity_monitor():
@@ -0,0 +1,370 @@
+"""
+Модуль источников активности пользователя для core.active
+
+Источник (backend) отвечает на два вопроса: сколько секунд пользователь бездействует
+и какой заголовок у активного окна. UserActivityMonitor работает с любым источником:
+    windows          - GetLastInputInfo / GetForegroundWindow (ctypes.windll)
+    xprintidle       - X11: утилиты xprintidle и xdotool (заголовок окна, если установлена)
+    proc_interrupts  - Linux без X11: время с последнего изменения счетчиков прерываний
+                       устройств ввода в /proc/interrupts
+    replay           - детерминированные замеры из файла (тесты и нагрузочные прогоны)
+    none             - источника нет: пользователь всегда активен (прежнее поведение)
+
+Выбор источника:
+    1. Переменная окружения TRACKER_ACTIVITY_REPLAY - путь к файлу замеров (replay)
+    2. meta.activity_monitoring.backend ("auto" по умолчанию)
+    3. auto: windows на Windows, иначе xprintidle при наличии утилиты и DISPLAY,
+       иначе proc_interrupts при наличии устройств ввода в /proc/interrupts, иначе none
+
+Формат файла замеров - строка на замер, "#" - комментарий:
+    12.5                                  - секунды бездействия
+    0.8 | main.py - Visual Studio Code    - секунды бездействия и заголовок окна
+
+proc_interrupts и replay помнят состояние между замерами (последние счетчики и время
+их изменения, позиция в файле). Демон держит источник в памяти; разовый запуск из
+планировщика передает state_path (activity_state.json рядом с tracker.log), иначе
+первый замер каждого процесса давал бы бездействие 0, а replay - всегда первый замер:
+    {"proc_interrupts": {"total": 1234, "changed_at": 1749456300.0},
+     "replay": {"file": "/path/activity.txt", "position": 3}}
+"""
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+
+REPLAY_ENV_VAR = 'TRACKER_ACTIVITY_REPLAY'
+
+# Строки /proc/interrupts, относящиеся к устройствам ввода (клавиатура, мышь, тачпад, USB)
+DEFAULT_INTERRUPTS_PATTERN = r'i8042|keyboard|mouse|touchpad|hid|xhci|ehci|ohci|uhci'
+
+PROC_INTERRUPTS_PATH = '/proc/interrupts'
+
+# Таймаут внешних утилит X11 (тик не должен зависнуть на недоступном X сервере)
+COMMAND_TIMEOUT_SECONDS = 2
+
+ACTIVITY_STATE_FILE = 'activity_state.json'
+
+
+def read_backend_state(state_path, name):
+    """
+    Читает сохраненное состояние источника
+
+    Returns:
+        dict: Состояние источника (пустой словарь, если файла нет или он поврежден)
+    """
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    section = state.get(name) if isinstance(state, dict) else None
+    return section if isinstance(section, dict) else {}
+
+
+def write_backend_state(state_path, name, section):
+    """Атомарно сохраняет состояние источника (состояния других источников сохраняются)"""
+    from .locking import atomic_write_text
+
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if not isinstance(state, dict):
+            state = {}
+    except (OSError, ValueError):
+        state = {}
+    state[name] = section
+    atomic_write_text(state_path, json.dumps(state, ensure_ascii=False, indent=2))
+
+
+class WindowsBackend:
+    """Источник активности через Windows API"""
+
+    name = 'windows'
+
+    def __init__(self):
+        # ctypes загружается только для этого источника
+        import ctypes
+        from ctypes import wintypes
+
+        class LASTINPUTINFO(ctypes.Structure):
+            """Структура для GetLastInputInfo Windows API"""
+            _fields_ = [
+                ('cbSize', wintypes.UINT),
+                ('dwTime', wintypes.DWORD)
+            ]
+
+        self._ctypes = ctypes
+        self._last_input_info = LASTINPUTINFO
+
+    @staticmethod
+    def is_available():
+        return sys.platform == 'win32'
+
+    def get_idle_time(self):
+        ctypes = self._ctypes
+        lii = self._last_input_info()
+        lii.cbSize = ctypes.sizeof(self._last_input_info)
+
+        if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(lii)):
+            # Если API вызов неудачен, считаем пользователя активным
+            return 0.0
+
+        # Защита от отрицательных значений (переполнение GetTickCount)
+        idle_time_ms = ctypes.windll.kernel32.GetTickCount() - lii.dwTime
+        return max(0.0, idle_time_ms / 1000.0)
+
+    def get_active_window_title(self):
+        ctypes = self._ctypes
+        hwnd = ctypes.windll.user32.GetForegroundWindow()
+        if not hwnd:
+            return ""
+
+        length = ctypes.windll.user32.GetWindowTextLengthW(hwnd)
+        if length == 0:
+            return ""
+
+        buff = ctypes.create_unicode_buffer(length + 1)
+        ctypes.windll.user32.GetWindowTextW(hwnd, buff, length + 1)
+        return buff.value or ""
+
+
+def _run_command(args):
+    """Выполняет утилиту и возвращает stdout без пробелов по краям (None при ошибке)"""
+    import subprocess
+
+    try:
+        result = subprocess.run(args, capture_output=True, text=True, timeout=COMMAND_TIMEOUT_SECONDS)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip()
+
+
+class XprintidleBackend:
+    """Источник активности X11: xprintidle (миллисекунды бездействия) и xdotool (заголовок окна)"""
+
+    name = 'xprintidle'
+
+    def __init__(self):
+        self._xprintidle = shutil.which('xprintidle')
+        self._xdotool = shutil.which('xdotool')
+
+    @staticmethod
+    def is_available():
+        return bool(os.environ.get('DISPLAY')) and shutil.which('xprintidle') is not None
+
+    def get_idle_time(self):
+        output = _run_command([self._xprintidle or 'xprintidle'])
+        if not output:
+            return 0.0
+        try:
+            return max(0.0, int(output) / 1000.0)
+        except ValueError:
+            return 0.0
+
+    def get_active_window_title(self):
+        if not self._xdotool:
+            return ""
+        return _run_command([self._xdotool, 'getactivewindow', 'getwindowname']) or ""
+
+
+class ProcInterruptsBackend:
+    """
+    Источник активности Linux без X11: бездействие - время с последнего изменения
+    суммы счетчиков прерываний устройств ввода
+
+    Первый замер только запоминает счетчики (бездействие 0). В демоне источник живет
+    между тиками; разовый запуск передает state_path, и счетчики с временем их изменения
+    (по time.time) переживают процесс
+    """
+
+    name = 'proc_interrupts'
+
+    def __init__(self, pattern=DEFAULT_INTERRUPTS_PATTERN, path=PROC_INTERRUPTS_PATH, state_path=None):
+        self.path = path
+        self.state_path = state_path
+        self._pattern = re.compile(pattern, re.IGNORECASE)
+        self._last_total = None
+        self._last_change = None
+        if state_path:
+            state = read_backend_state(state_path, self.name)
+            if isinstance(state.get('total'), int) and isinstance(state.get('changed_at'), (int, float)):
+                self._last_total = state['total']
+                self._last_change = state['changed_at']
+
+    @staticmethod
+    def is_available(path=PROC_INTERRUPTS_PATH, pattern=DEFAULT_INTERRUPTS_PATTERN):
+        """Доступен, если в /proc/interrupts есть строки устройств ввода (на серверах и в ВМ их нет)"""
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                return any(re.search(pattern, line, re.IGNORECASE) for line in f)
+        except OSError:
+            return False
+
+    def read_input_interrupts(self):
+        """
+        Суммирует счетчики прерываний устройств ввода по всем CPU
+
+        Returns:
+            int: Сумма счетчиков строк, подходящих под шаблон
+        """
+        total = 0
+        with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if not self._pattern.search(line):
+                    continue
+                # "  1:   1234   5678   IO-APIC   1-edge   i8042" - числа после "IRQ:"
+                for field in line.split(':', 1)[-1].split():
+                    if not field.isdigit():
+                        break
+                    total += int(field)
+        return total
+
+    def get_idle_time(self, now=None):
+        """
+        Args:
+            now (float): Время по time.monotonic, с state_path - по time.time
+                (по умолчанию - текущее)
+        """
+        if now is None:
+            now = time.time() if self.state_path else time.monotonic()
+        total = self.read_input_interrupts()
+        if self._last_total is None or total != self._last_total:
+            self._last_total = total
+            self._last_change = now
+            if self.state_path:
+                write_backend_state(self.state_path, self.name, {'total': total, 'changed_at': now})
+        return max(0.0, now - self._last_change)
+
+    def get_active_window_title(self):
+        return ""
+
+
+class ReplayBackend:
+    """
+    Источник активности из файла замеров: каждый вызов get_idle_time возвращает
+    следующий замер, заголовок окна - заголовок последнего замера
+
+    После последнего замера файл читается сначала (loop=True) или повторяется
+    последний замер. С state_path позиция сохраняется между запусками
+    """
+
+    name = 'replay'
+
+    def __init__(self, path, loop=True, state_path=None):
+        self.path = path
+        self.loop = loop
+        self.state_path = state_path
+        self.samples = self.read_samples(path)
+        self._position = 0
+        self._title = ""
+        if state_path:
+            state = read_backend_state(state_path, self.name)
+            if state.get('file') == os.path.abspath(path) and isinstance(state.get('position'), int):
+                self._position = state['position']
+
+    @staticmethod
+    def read_samples(path):
+        """
+        Читает файл замеров
+
+        Returns:
+            list: [(секунды бездействия, заголовок окна)]
+
+        Raises:
+            ValueError: Некорректное число в строке
+        """
+        samples = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                idle, _, title = line.partition('|')
+                try:
+                    samples.append((float(idle), title.strip()))
+                except ValueError:
+                    raise ValueError(f"{path}:{line_number}: ожидалось число секунд бездействия: {idle.strip()!r}")
+        return samples
+
+    def get_idle_time(self):
+        if not self.samples:
+            return 0.0
+        if self._position >= len(self.samples):
+            self._position = 0 if self.loop else len(self.samples) - 1
+        idle, self._title = self.samples[self._position]
+        self._position += 1
+        if self.state_path:
+            write_backend_state(self.state_path, self.name, {'file': os.path.abspath(self.path), 'position': self._position})
+        return idle
+
+    def get_active_window_title(self):
+        return self._title
+
+
+class NullBackend:
+    """Источник не найден: пользователь всегда активен, заголовка окна нет"""
+
+    name = 'none'
+
+    @staticmethod
+    def is_available():
+        return True
+
+    def get_idle_time(self):
+        return 0.0
+
+    def get_active_window_title(self):
+        return ""
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (WindowsBackend, XprintidleBackend, ProcInterruptsBackend, ReplayBackend, NullBackend)
+}
+
+# Порядок проверки в режиме auto
+AUTO_BACKENDS = (WindowsBackend, XprintidleBackend, ProcInterruptsBackend)
+
+
+def create_activity_backend(config=None, state_path=None):
+    """
+    Создает источник активности по настройкам
+
+    Args:
+        config (dict): Секция meta.activity_monitoring (backend, replay_file, replay_loop,
+            interrupts_pattern), опционально
+        state_path (str): Файл состояния proc_interrupts и replay между запусками
+            (разовый тик; демон держит источник в памяти и не передает его)
+
+    Returns:
+        Источник активности (get_idle_time, get_active_window_title, name)
+
+    Raises:
+        ValueError: Неизвестный источник или replay без файла
+    """
+    config = config or {}
+    replay_file = os.environ.get(REPLAY_ENV_VAR) or config.get('replay_file')
+    name = 'replay' if os.environ.get(REPLAY_ENV_VAR) else config.get('backend', 'auto')
+
+    if name == 'auto':
+        for backend in AUTO_BACKENDS:
+            if backend.is_available():
+                name = backend.name
+                break
+        else:
+            name = NullBackend.name
+
+    if name == ReplayBackend.name:
+        if not replay_file:
+            raise ValueError(f"Для источника replay нужен replay_file или {REPLAY_ENV_VAR}")
+        return ReplayBackend(replay_file, loop=config.get('replay_loop', True), state_path=state_path)
+    if name == ProcInterruptsBackend.name:
+        return ProcInterruptsBackend(config.get('interrupts_pattern', DEFAULT_INTERRUPTS_PATTERN), state_path=state_path)
+    if name not in BACKENDS:
+        raise ValueError(f"Неизвестный источник активности: {name} (доступны: {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
@@ -0,0 +1,462 @@
+"""
+Модуль аналитики пассивного отслеживания
+Чистые вычисления над данными БД: результат - словари, которые выводит CLI
+и отдает веб-API (без форматирования строк и перехвата stdout)
+"""
+import importlib.util
+from datetime import date as date_type, timedelta
+
+from .compatibility import get_project_id_compat
+from .masks import (
+    SLOTS_PER_DAY, SLOT_MINUTES, parse_mask, count_minutes, mask_to_bytes, bit_count, range_bits
+)
+from .windows import get_application_name, parse_window_slots
+
+# NumPy опционален: без него часовые суммы считаются popcount по битовым маскам.
+# Сам импорт откладывается до первого векторного подсчета (~100 мс, CLI он не нужен)
+NUMPY_SUPPORT = importlib.util.find_spec('numpy') is not None
+
+
+# Длительность рабочего дня 08:00-20:00 в минутах
+WORKDAY_MINUTES = SLOTS_PER_DAY * SLOT_MINUTES
+
+WORKDAY_START_HOUR = 8
+SLOTS_PER_HOUR = 60 // SLOT_MINUTES
+
+# Коды ошибок (поле 'error' результата)
+ERROR_NOT_CONFIGURED = 'not_configured'
+ERROR_DISABLED = 'disabled'
+ERROR_NO_DATA = 'no_data'
+ERROR_NO_DATE = 'no_date'
+
+# Рекомендации по уровню продуктивности
+PRODUCTIVITY_RECOMMENDATIONS = {
+    'low': "Низкая продуктивность. Возможно, много времени на администрирование?",
+    'high': "Отличная продуктивность! Много времени на проектную работу.",
+    'normal': "Нормальная продуктивность. Баланс между проектами и другими задачами."
+}
+
+UNTRACKED_RECOMMENDATION = "Непроектного времени больше чем проектного. Рассмотрите создание проектов для рутинных задач."
+
+# Допустимая детализация и максимальная длина диапазона для calculate_range_timeline
+RANGE_GRANULARITIES = ('hour', 'day', 'week')
+MAX_RANGE_DAYS = 366
+
+# Символы временной шкалы
+TIMELINE_LEGEND = {
+    'P': 'Проект',
+    'A': 'Активность',
+    'I': 'Простой',
+    '-': 'Нет данных'
+}
+
+
+def get_passive_day_masks(data, date=None, check_enabled=True):
+    """
+    Находит пассивные маски за дату (по умолчанию - последняя доступная)
+
+    Args:
+        data (dict): Данные БД
+        date (str): Дата в формате YYYY-MM-DD (опционально)
+        check_enabled (bool): Считать выключенное отслеживание ошибкой
+
+    Returns:
+        tuple: (date, masks, error) - error это код ERROR_* или None
+    """
+    if 'passive_tracking' not in data.get('meta', {}):
+        return date, None, ERROR_NOT_CONFIGURED
+
+    passive = data['meta']['passive_tracking']
+
+    if check_enabled and not passive.get('enabled', True):
+        return date, None, ERROR_DISABLED
+
+    daily_masks = passive.get('daily_masks', {})
+
+    # Если дата не указана, берем последнюю доступную
+    if not date:
+        if not daily_masks:
+            return None, None, ERROR_NO_DATA
+        date = max(daily_masks)
+
+    if date not in daily_masks:
+        return date, None, ERROR_NO_DATE
+
+    return date, daily_masks[date], None
+
+
+def get_available_dates(data):
+    """Возвращает отсортированный список дат с пассивными данными"""
+    return sorted(data.get('meta', {}).get('passive_tracking', {}).get('daily_masks', {}))
+
+
+def percent(part, whole):
+    """Процент с одним знаком после запятой (0 если делитель нулевой)"""
+    return round(part / whole * 100, 1) if whole > 0 else 0
+
+
+def calculate_passive_stats(data, date=None):
+    """
+    Вычисляет статистику пассивного отслеживания за день
+
+    Args:
+        data (dict): Данные БД
+        date (str): Дата в формате YYYY-MM-DD (по умолчанию - последняя доступная)
+
+    Returns:
+        dict: Статистика; при ошибке - {'date', 'error', 'available_dates'}
+    """
+    date, masks, error = get_passive_day_masks(data, date)
+    if error:
+        return {'date': date, 'error': error, 'available_dates': get_available_dates(data)}
+
+    computer_minutes = count_minutes(masks.get('computer_activity'))
+    project_minutes = count_minutes(masks.get('project_activity'))
+    idle_minutes = count_minutes(masks.get('idle_periods'))
+    untracked_minutes = count_minutes(masks.get('untracked_work'))
+
+    productivity = percent(project_minutes, computer_minutes)
+
+    # Рекомендации
+    if productivity < 30:
+        level = 'low'
+    elif productivity > 70:
+        level = 'high'
+    else:
+        level = 'normal'
+
+    recommendations = [PRODUCTIVITY_RECOMMENDATIONS[level]]
+    if untracked_minutes > project_minutes:
+        recommendations.append(UNTRACKED_RECOMMENDATION)
+
+    return {
+        'date': date,
+        'error': None,
+        'workday_minutes': WORKDAY_MINUTES,
+        'computer_minutes': computer_minutes,
+        'project_minutes': project_minutes,
+        'untracked_minutes': untracked_minutes,
+        'idle_minutes': idle_minutes,
+        'computer_pct': percent(computer_minutes, WORKDAY_MINUTES),
+        'project_pct': percent(project_minutes, computer_minutes),
+        'untracked_pct': percent(untracked_minutes, computer_minutes),
+        'idle_pct': percent(idle_minutes, WORKDAY_MINUTES),
+        'productivity': productivity,
+        'productivity_level': level,
+        'recommendations': recommendations
+    }
+
+
+def calculate_passive_timeline(data, date=None):
+    """
+    Вычисляет посимвольную временную шкалу активности за день
+
+    Каждый 5-минутный слот: 'P' - проект, 'A' - активность, 'I' - простой, '-' - нет данных
+
+    Args:
+        data (dict): Данные БД
+        date (str): Дата в формате YYYY-MM-DD (по умолчанию - последняя доступная)
+
+    Returns:
+        dict: {'date', 'error', 'legend', 'hours': [{'hour', 'slots'}]};
+            при ошибке - {'date', 'error', 'available_dates'}
+    """
+    date, masks, error = get_passive_day_masks(data, date, check_enabled=False)
+    if error:
+        return {'date': date, 'error': error, 'available_dates': get_available_dates(data)}
+
+    computer_bits = parse_mask(masks.get('computer_activity'))
+    project_bits = parse_mask(masks.get('project_activity'))
+    idle_bits = parse_mask(masks.get('idle_periods'))
+
+    hours = []
+    for hour_index in range(SLOTS_PER_DAY // SLOTS_PER_HOUR):
+        hour_start = hour_index * SLOTS_PER_HOUR
+        slots = []
+
+        for slot in range(hour_start, hour_start + SLOTS_PER_HOUR):
+            if project_bits >> slot & 1:
+                slots.append('P')
+            elif computer_bits >> slot & 1:
+                slots.append('A')
+            elif idle_bits >> slot & 1:
+                slots.append('I')
+            else:
+                slots.append('-')
+
+        hours.append({
+            'hour': f"{WORKDAY_START_HOUR + hour_index:02d}:00",
+            'slots': ''.join(slots)
+        })
+
+    return {
+        'date': date,
+        'error': None,
+        'legend': TIMELINE_LEGEND,
+        'hours': hours
+    }
+
+
+def count_hourly_slots(masks):
+    """
+    Считает отмеченные слоты по часам для набора дневных масок
+
+    С NumPy маски разворачиваются в плотную матрицу N x 144 и суммируются
+    векторно, без NumPy - popcount по 12-битным окнам каждой маски
+
+    Args:
+        masks (list): Маски (int) - по одной на день/проект
+
+    Returns:
+        list: Для каждой маски список из 12 чисел (слотов за час)
+    """
+    hours_per_day = SLOTS_PER_DAY // SLOTS_PER_HOUR
+
+    if not masks:
+        return []
+
+    if NUMPY_SUPPORT:
+        import numpy as np
+
+        raw = np.frombuffer(b''.join(mask_to_bytes(bits) for bits in masks), dtype=np.uint8)
+        matrix = np.unpackbits(raw.reshape(len(masks), -1), axis=1, bitorder='little')
+        return matrix.reshape(len(masks), hours_per_day, SLOTS_PER_HOUR).sum(axis=2).tolist()
+
+    return [
+        [bit_count(range_bits(bits, hour * SLOTS_PER_HOUR, (hour + 1) * SLOTS_PER_HOUR)) for hour in range(hours_per_day)]
+        for bits in masks
+    ]
+
+
+def get_bucket_key(day, hour, granularity):
+    """
+    Возвращает ключ интервала агрегации для часа дня
+
+    Args:
+        day (date): День
+        hour (int): Час рабочего дня (0-11)
+        granularity (str): 'hour', 'day' или 'week' (неделя начинается с понедельника)
+
+    Returns:
+        str: Начало интервала ('YYYY-MM-DD HH:00' для часа, 'YYYY-MM-DD' для дня и недели)
+    """
+    if granularity == 'hour':
+        return f"{day.isoformat()} {WORKDAY_START_HOUR + hour:02d}:00"
+    if granularity == 'week':
+        return (day - timedelta(days=day.weekday())).isoformat()
+    return day.isoformat()
+
+
+def validate_range(date_from, date_to, granularity='day'):
+    """
+    Проверяет параметры диапазона для calculate_range_timeline
+
+    Returns:
+        tuple: (первая дата, последняя дата) как datetime.date
+
+    Raises:
+        ValueError: Неверные даты, детализация или слишком длинный диапазон
+    """
+    if granularity not in RANGE_GRANULARITIES:
+        raise ValueError(f"Неверная детализация '{granularity}'. Доступны: {', '.join(RANGE_GRANULARITIES)}")
+
+    start = date_type.fromisoformat(date_from)
+    end = date_type.fromisoformat(date_to)
+    if end < start:
+        raise ValueError("Дата 'to' раньше даты 'from'")
+    if (end - start).days + 1 > MAX_RANGE_DAYS:
+        raise ValueError(f"Диапазон больше {MAX_RANGE_DAYS} дней")
+    return start, end
+
+
+def calculate_range_timeline(data, date_from, date_to, granularity='day'):
+    """
+    Вычисляет активность и время проектов за диапазон дат одним проходом
+
+    Args:
+        data (dict): Данные БД
+        date_from (str): Первая дата диапазона (YYYY-MM-DD)
+        date_to (str): Последняя дата диапазона включительно (YYYY-MM-DD)
+        granularity (str): Детализация: 'hour', 'day' или 'week'
+
+    Returns:
+        dict: {'from', 'to', 'granularity', 'buckets': [...], 'totals': {...}}
+
+    Raises:
+        ValueError: Неверные даты, детализация или слишком длинный диапазон
+    """
+    start, end = validate_range(date_from, date_to, granularity)
+
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    day_keys = [day.isoformat() for day in days]
+
+    # Строки матрицы: активность (computer | project), проектное время, затем проекты
+    passive_masks = data.get('meta', {}).get('passive_tracking', {}).get('daily_masks', {})
+    rows = []
+    for key in day_keys:
+        day_masks = passive_masks.get(key, {})
+        project_bits = parse_mask(day_masks.get('project_activity'))
+        rows.append(parse_mask(day_masks.get('computer_activity')) | project_bits)
+        rows.append(project_bits)
+
+    # (ключ проекта, проект): в старом формате id нет - ключ из get_project_key
+    projects = []
+    for index, project in enumerate(data.get('projects', [])):
+        project_masks = project.get('daily_masks', {})
+        project_rows = [parse_mask(project_masks.get(key)) for key in day_keys]
+        if any(project_rows):
+            projects.append((get_project_key(project, index), project))
+            rows.extend(project_rows)
+
+    counts = count_hourly_slots(rows)
+    days_count = len(days)
+
+    buckets = {}
+    for day_index, day in enumerate(days):
+        active_counts = counts[2 * day_index]
+        project_counts = counts[2 * day_index + 1]
+
+        for hour in range(SLOTS_PER_DAY // SLOTS_PER_HOUR):
+            key = get_bucket_key(day, hour, granularity)
+            bucket = buckets.setdefault(key, {'start': key, 'active_minutes': 0, 'project_minutes': 0, 'projects': {}})
+            bucket['active_minutes'] += active_counts[hour] * SLOT_MINUTES
+            bucket['project_minutes'] += project_counts[hour] * SLOT_MINUTES
+
+            for project_index, (project_id, _) in enumerate(projects):
+                slots = counts[2 * days_count + project_index * days_count + day_index][hour]
+                if slots:
+                    bucket['projects'][project_id] = bucket['projects'].get(project_id, 0) + slots * SLOT_MINUTES
+
+    # При дублях id побеждает первый проект, как и при поиске по id
+    projects_by_id = {}
+    for project_id, project in projects:
+        projects_by_id.setdefault(project_id, project)
+
+    def format_projects(minutes_by_id):
+        # Самый активный проект первым (как в tasks у /api/timeline/data)
+        items = [
+            {
+                'id': project_id,
+                'title': projects_by_id[project_id].get('title', 'Без названия'),
+                'color': projects_by_id[project_id].get('fill_color', '#4CAF50'),
+                'minutes': minutes
+            }
+            for project_id, minutes in minutes_by_id.items()
+        ]
+        items.sort(key=lambda item: item['minutes'], reverse=True)
+        return items
+
+    totals = {'active_minutes': 0, 'project_minutes': 0, 'projects': {}}
+    result_buckets = []
+    for bucket in buckets.values():
+        totals['active_minutes'] += bucket['active_minutes']
+        totals['project_minutes'] += bucket['project_minutes']
+        for project_id, minutes in bucket['projects'].items():
+            totals['projects'][project_id] = totals['projects'].get(project_id, 0) + minutes
+
+        bucket['projects'] = format_projects(bucket['projects'])
+        result_buckets.append(bucket)
+
+    totals['projects'] = format_projects(totals['projects'])
+
+    return {
+        'from': date_from,
+        'to': date_to,
+        'granularity': granularity,
+        'buckets': result_buckets,
+        'totals': totals
+    }
+
+
+def calculate_window_usage(data, date=None):
+    """
+    Вычисляет время по приложениям и заголовкам активных окон за день
+
+    Args:
+        data (dict): Данные БД
+        date (str): Дата в формате YYYY-MM-DD (по умолчанию - последняя доступная)
+
+    Returns:
+        dict: {'date', 'error', 'total_minutes', 'applications': [{'application', 'minutes',
+            'titles': [{'title', 'minutes'}]}]} - по убыванию времени;
+            при ошибке - {'date', 'error', 'available_dates'}
+    """
+    date, masks, error = get_passive_day_masks(data, date)
+    if error:
+        return {'date': date, 'error': error, 'available_dates': get_available_dates(data)}
+
+    passive = data['meta']['passive_tracking']
+    titles = passive.get('window_titles', [])
+    slots = parse_window_slots(passive.get('daily_windows', {}).get(date))
+
+    # Слоты на заголовок: ID -> количество
+    slot_counts = {}
+    for title_id in slots:
+        if title_id:
+            slot_counts[title_id] = slot_counts.get(title_id, 0) + 1
+
+    applications = {}
+    for title_id, count in slot_counts.items():
+        title = titles[title_id - 1] if title_id <= len(titles) else f'#{title_id}'
+        application = applications.setdefault(get_application_name(title), {'minutes': 0, 'titles': []})
+        application['minutes'] += count * SLOT_MINUTES
+        application['titles'].append({'title': title, 'minutes': count * SLOT_MINUTES})
+
+    result = []
+    for name, application in applications.items():
+        application['titles'].sort(key=lambda item: (-item['minutes'], item['title']))
+        result.append({'application': name, 'minutes': application['minutes'], 'titles': application['titles']})
+    result.sort(key=lambda item: (-item['minutes'], item['application']))
+
+    return {
+        'date': date,
+        'error': None,
+        'total_minutes': sum(item['minutes'] for item in result),
+        'applications': result
+    }
+
+
+def get_project_key(project, index):
+    """
+    Идентификатор проекта для группировки времени
+
+    В старом формате у проектов нет id: он генерируется из title, как и в остальном
+    API (get_project_id_compat); проект без id и title получает позицию в списке
+
+    Examples:
+        >>> get_project_key({'id': 'exlibrus'}, 0)
+        'exlibrus'
+        >>> get_project_key({}, 3)
+        'project-3'
+    """
+    if 'id' in project or 'title' in project:
+        return get_project_id_compat(project)
+    return f'project-{index}'
+
+
+def find_last_tracked_slot(data):
+    """
+    Находит последний записанный слот проектного времени (последний BIT_SET трекера)
+
+    Args:
+        data (dict): Данные БД (достаточно масок текущего месяца)
+
+    Returns:
+        dict|None: {'date', 'slot', 'project_id', 'minutes_of_day'} - minutes_of_day от полуночи
+            до начала слота; None если проектного времени нет
+    """
+    last = None
+    for index, project in enumerate(data.get('projects', [])):
+        masks = project.get('daily_masks') or {}
+        # Последний день с установленными битами (пустые маски пропускаются)
+        for day in sorted(masks, reverse=True):
+            bits = parse_mask(masks[day])
+            if bits:
+                slot = bits.bit_length() - 1
+                if last is None or (day, slot) > (last['date'], last['slot']):
+                    last = {'date': day, 'slot': slot, 'project_id': get_project_key(project, index)}
+                break
+
+    if last:
+        last['minutes_of_day'] = WORKDAY_START_HOUR * 60 + last['slot'] * SLOT_MINUTES
+    return last
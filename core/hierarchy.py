@@ -1,37 +1,174 @@
 """
 Модуль для работы с иерархией проектов
 Алгоритмы расчета aggregated_minutes и управления parent/child отношениями
+
+Функции поиска принимают необязательный ProjectIndex: без него выполняется
+линейный проход по списку, с ним - поиск по словарю
 """
 
 
-def find_project_by_path(path, projects_list):
+def get_parent_path(project_path):
+    """
+    Возвращает path прямого родителя
+    
+    Args:
+        project_path (str): Path проекта
+        
+    Returns:
+        str|None: Path родителя или None для корневого проекта
+        
+    Examples:
+        >>> get_parent_path("exlibrus/frontend")
+        'exlibrus'
+        >>> get_parent_path("exlibrus") is None
+        True
+    """
+    if "/" not in project_path:
+        return None
+    return project_path.rsplit("/", 1)[0]
+
+
+class ProjectIndex:
+    """
+    Индексы проектов для загруженной БД
+    
+    Строится один раз за O(n): словари по id, path и title (без учета регистра),
+    карта parent path -> прямые дети и дерево path (включая промежуточные уровни
+    без собственного проекта). Индекс не отслеживает изменения списка:
+    после добавления или удаления проектов его нужно построить заново
+    """
+    
+    def __init__(self, projects_list):
+        """
+        Args:
+            projects_list (list): Список всех проектов
+        """
+        self.projects = projects_list
+        self.by_id = {}
+        self.by_path = {}
+        self.by_title = {}
+        self.children = {}
+        self._projects_at_path = {}
+        self._subpaths = {}
+        
+        for project in projects_list:
+            # При дублях побеждает первый проект, как и при линейном поиске
+            if 'id' in project:
+                self.by_id.setdefault(project['id'], project)
+            
+            path = project.get('path', '')
+            self.by_path.setdefault(path, project)
+            
+            if 'title' in project:
+                self.by_title.setdefault(project['title'].lower(), project)
+            
+            self._projects_at_path.setdefault(path, []).append(project)
+            
+            parent_path = get_parent_path(path)
+            if parent_path is not None:
+                self.children.setdefault(parent_path, []).append(project)
+            
+            # Дерево path поднимается до уже известного уровня
+            while parent_path is not None:
+                subpaths = self._subpaths.setdefault(parent_path, set())
+                if path in subpaths:
+                    break
+                subpaths.add(path)
+                path, parent_path = parent_path, get_parent_path(parent_path)
+    
+    def find_by_id(self, project_id):
+        return self.by_id.get(project_id)
+    
+    def find_by_path(self, path):
+        return self.by_path.get(path)
+    
+    def find_by_title(self, title):
+        return self.by_title.get(title.lower())
+    
+    def get_direct_children(self, parent_path):
+        return list(self.children.get(parent_path, []))
+    
+    def get_all_descendants(self, parent_path):
+        """Возвращает всех потомков, в том числе под промежуточными уровнями без проекта"""
+        descendants = []
+        stack = list(self._subpaths.get(parent_path, ()))
+        while stack:
+            path = stack.pop()
+            descendants.extend(self._projects_at_path.get(path, []))
+            stack.extend(self._subpaths.get(path, ()))
+        return descendants
+    
+    def _child_paths(self, parent_path):
+        """Уникальные path прямых детей: дубль path учитывается один раз (первый проект)"""
+        return list(dict.fromkeys(child.get('path', '') for child in self.children.get(parent_path, [])))
+    
+    def calculate_subtree_aggregated(self, project_path):
+        """
+        Вычисляет aggregated_minutes для всех проектов поддерева одним post-order проходом
+        
+        Args:
+            project_path (str): Path корня поддерева
+            
+        Returns:
+            dict: path -> aggregated_minutes (пустой если проект не найден)
+        """
+        if project_path not in self.by_path:
+            return {}
+        
+        aggregated = {}
+        # Стек (path, дети уже обработаны)
+        stack = [(project_path, False)]
+        while stack:
+            path, children_done = stack.pop()
+            if not children_done:
+                stack.append((path, True))
+                for child_path in self._child_paths(path):
+                    stack.append((child_path, False))
+                continue
+            
+            own_minutes = self.by_path[path].get('total_minutes', 0)
+            children_sum = sum(aggregated[child_path] for child_path in self._child_paths(path))
+            aggregated[path] = own_minutes + children_sum
+        
+        return aggregated
+
+
+def find_project_by_path(path, projects_list, index=None):
     """
     Находит проект по path
     
     Args:
         path (str): Path проекта
         projects_list (list): Список всех проектов
+        index (ProjectIndex): Индекс проектов (опционально)
         
     Returns:
         dict|None: Найденный проект или None
     """
+    if index is not None:
+        return index.find_by_path(path)
+    
     for project in projects_list:
         if project.get('path') == path:
             return project
     return None
 
 
-def find_project_by_id(project_id, projects_list):
+def find_project_by_id(project_id, projects_list, index=None):
     """
     Находит проект по ID
     
     Args:
         project_id (str): ID проекта
         projects_list (list): Список всех проектов
+        index (ProjectIndex): Индекс проектов (опционально)
         
     Returns:
         dict|None: Найденный проект или None
     """
+    if index is not None:
+        return index.find_by_id(project_id)
+    
     for project in projects_list:
         if project.get('id') == project_id:
             return project
@@ -65,17 +202,21 @@ def is_direct_child(child_path, parent_path):
     return "/" not in remaining
 
 
-def get_direct_children(parent_path, projects_list):
+def get_direct_children(parent_path, projects_list, index=None):
     """
     Получает всех прямых детей проекта
     
     Args:
         parent_path (str): Path родительского проекта
         projects_list (list): Список всех проектов
+        index (ProjectIndex): Индекс проектов (опционально)
         
     Returns:
         list: Список прямых дочерних проектов
     """
+    if index is not None:
+        return index.get_direct_children(parent_path)
+    
     children = []
     for project in projects_list:
         project_path = project.get('path', '')
@@ -84,17 +225,21 @@ def get_direct_children(parent_path, projects_list):
     return children
 
 
-def get_all_descendants(parent_path, projects_list):
+def get_all_descendants(parent_path, projects_list, index=None):
     """
     Получает всех потомков проекта (на всех уровнях)
     
     Args:
         parent_path (str): Path родительского проекта
         projects_list (list): Список всех проектов
+        index (ProjectIndex): Индекс проектов (опционально)
         
     Returns:
         list: Список всех потомков
     """
+    if index is not None:
+        return index.get_all_descendants(parent_path)
+    
     descendants = []
     for project in projects_list:
         project_path = project.get('path', '')
@@ -150,7 +295,7 @@ def get_project_level(project_path):
     return project_path.count("/")
 
 
-def calculate_aggregated_minutes(project_path, projects_list):
+def calculate_aggregated_minutes(project_path, projects_list, index=None):
     """
     Вычисляет aggregated_minutes для проекта
     
@@ -158,43 +303,36 @@ def calculate_aggregated_minutes(project_path, projects_list):
     1. Найти проект по path
     2. Получить его total_minutes (собственное время)
     3. Найти всех прямых детей
-    4. Рекурсивно просуммировать aggregated_minutes всех детей
+    4. Просуммировать aggregated_minutes всех детей (post-order обход поддерева)
     5. Вернуть: total_minutes + сумма_детей
     
     Args:
         project_path (str): Path проекта
         projects_list (list): Список всех проектов
+        index (ProjectIndex): Индекс проектов (опционально, иначе строится на месте)
         
     Returns:
         int: Aggregated minutes для проекта
     """
-    # Найти текущий проект
-    current_project = find_project_by_path(project_path, projects_list)
-    if not current_project:
-        return 0
+    if index is None:
+        index = ProjectIndex(projects_list)
     
-    own_minutes = current_project.get('total_minutes', 0)
-    
-    # Найти всех прямых детей и рекурсивно просуммировать их aggregated_minutes
-    children_sum = 0
-    direct_children = get_direct_children(project_path, projects_list)
-    
-    for child in direct_children:
-        child_path = child.get('path', '')
-        children_sum += calculate_aggregated_minutes(child_path, projects_list)
-    
-    return own_minutes + children_sum
+    return index.calculate_subtree_aggregated(project_path).get(project_path, 0)
 
 
-def update_aggregated_minutes(changed_project_path, projects_list):
+def update_aggregated_minutes(changed_project_path, projects_list, index=None, delta=None):
     """
     Обновляет aggregated_minutes для проекта и всех его родителей
     
-    Вызывается после любого изменения total_minutes
+    Вызывается после любого изменения total_minutes. Если известна дельта,
+    она прибавляется к aggregated_minutes вверх по цепочке предков без
+    пересчета поддеревьев; иначе поддерево пересчитывается полностью
     
     Args:
         changed_project_path (str): Path проекта, у которого изменился total_minutes
         projects_list (list): Список всех проектов (изменяется in-place)
+        index (ProjectIndex): Индекс проектов (опционально)
+        delta (int): Изменение total_minutes проекта (опционально)
         
     Returns:
         list: Список path проектов, которые были обновлены
@@ -206,17 +344,99 @@ def update_aggregated_minutes(changed_project_path, projects_list):
     all_paths_to_update = [changed_project_path] + parent_paths
     updated_paths = []
     
+    if delta is not None:
+        chain = apply_aggregated_delta(all_paths_to_update, projects_list, index, delta)
+        if chain is not None:
+            return chain
+    
+    if index is None:
+        index = ProjectIndex(projects_list)
+    
+    # Начинаем с самого верхнего предка: его поддерево содержит всю цепочку,
+    # поэтому обычно хватает одного прохода. Пропущенный уровень иерархии
+    # разрывает цепочку - тогда нижняя часть считается отдельным проходом
+    aggregated = {}
+    for path in reversed(all_paths_to_update):
+        if path not in aggregated and index.find_by_path(path):
+            aggregated.update(index.calculate_subtree_aggregated(path))
+    
     for path in all_paths_to_update:
-        project = find_project_by_path(path, projects_list)
+        project = index.find_by_path(path)
         if project:
-            old_aggregated = project.get('aggregated_minutes', 0)
-            new_aggregated = calculate_aggregated_minutes(path, projects_list)
-            project['aggregated_minutes'] = new_aggregated
+            project['aggregated_minutes'] = aggregated[path]
             updated_paths.append(path)
     
     return updated_paths
 
 
+def apply_aggregated_delta(chain_paths, projects_list, index, delta):
+    """
+    Прибавляет дельту к aggregated_minutes проекта и его предков
+    
+    Args:
+        chain_paths (list): Path проекта и его родителей (от проекта к корню)
+        projects_list (list): Список всех проектов (изменяется in-place)
+        index (ProjectIndex): Индекс проектов (опционально)
+        delta (int): Изменение total_minutes
+        
+    Returns:
+        list|None: Обновленные path или None, если нужен полный пересчет
+            (у проекта цепочки нет aggregated_minutes)
+    """
+    chain = []
+    for path in chain_paths:
+        project = find_project_by_path(path, projects_list, index)
+        if not project:
+            # Пропущенный уровень иерархии разрывает цепочку: выше время не агрегируется
+            break
+        if 'aggregated_minutes' not in project:
+            return None
+        chain.append(project)
+    
+    for project in chain:
+        project['aggregated_minutes'] += delta
+    
+    return [project['path'] for project in chain]
+
+
+def recompute_all_aggregates(projects_list):
+    """
+    Пересчитывает aggregated_minutes всех проектов за один проход
+    
+    Path обрабатываются от самых глубоких к корневым: собственное время
+    проекта плюс накопленное время его детей прибавляется к родителю.
+    Проекты с одинаковым path считаются одним проектом (первым в списке),
+    как в calculate_aggregated_minutes
+    
+    Args:
+        projects_list (list): Список всех проектов (изменяется in-place)
+        
+    Returns:
+        list: Список path проектов, у которых aggregated_minutes изменилось
+    """
+    own_minutes = {}
+    for project in projects_list:
+        # При дублях path учитывается первый проект, как и при поиске по path
+        own_minutes.setdefault(project.get('path', ''), project.get('total_minutes', 0))
+    
+    aggregated = dict(own_minutes)
+    for path in sorted(own_minutes, key=get_project_level, reverse=True):
+        parent_path = get_parent_path(path)
+        if parent_path in aggregated:
+            aggregated[parent_path] += aggregated[path]
+    
+    changed_paths = []
+    for project in projects_list:
+        if not project.get('path'):
+            continue
+        new_aggregated = aggregated[project['path']]
+        if project.get('aggregated_minutes') != new_aggregated:
+            project['aggregated_minutes'] = new_aggregated
+            changed_paths.append(project['path'])
+    
+    return changed_paths
+
+
 def validate_hierarchy_integrity(projects_list):
     """
     Проверяет целостность иерархии проектов
@@ -0,0 +1,252 @@
+"""
+Модуль помесячных файлов истории (шардов) масок
+
+db.json хранит метаданные проектов и маски текущего месяца, маски прошлых месяцев
+лежат в history/YYYY-MM.json рядом с БД:
+    {
+        "month": "2025-06",
+        "projects": {"exlibrus": {"2025-06-09": "b64:..."}},
+        "passive": {"2025-06-09": {"computer_activity": "b64:...", ...}},
+        "windows": {"2025-06-09": "b64:..."}
+    }
+
+Таблица заголовков окон (passive_tracking.window_titles) общая и остается в db.json,
+шарды хранят только ID заголовков по слотам (см. core.windows)
+
+Загрузка и сохранение текущего месяца не зависят от объема истории, шард открывается
+только когда нужны данные его месяца.
+
+Маски объединяются по OR: ни одна операция не снимает установленные биты, поэтому
+данные, загруженные без истории (или с частью месяцев), сохраняются без потери
+архивных месяцев, а повторное применение шарда идемпотентно.
+"""
+import json
+import os
+from datetime import date as date_type
+
+from .compatibility import get_project_id_compat
+from .masks import parse_mask, format_mask
+from .windows import merge_window_slots
+
+
+HISTORY_DIR_NAME = 'history'
+
+
+def get_history_dir(db_path):
+    """
+    Возвращает директорию шардов истории для файла БД
+
+    Examples:
+        >>> get_history_dir("C:/tracker/db.json")
+        'C:/tracker/history'
+    """
+    return os.path.join(os.path.dirname(db_path), HISTORY_DIR_NAME)
+
+
+def get_shard_path(history_dir, month):
+    """Возвращает путь к шарду месяца (YYYY-MM)"""
+    return os.path.join(history_dir, f'{month}.json')
+
+
+def get_month(date):
+    """
+    Возвращает месяц даты
+
+    Examples:
+        >>> get_month("2025-06-09")
+        '2025-06'
+    """
+    return date[:7]
+
+
+def get_hot_month(today=None):
+    """
+    Возвращает месяц, маски которого хранятся в db.json (текущий)
+
+    Args:
+        today (date): Текущая дата (по умолчанию - сегодня)
+    """
+    return (today or date_type.today()).strftime('%Y-%m')
+
+
+def get_months_in_range(date_from, date_to):
+    """
+    Возвращает список месяцев, которые покрывает диапазон дат (включительно)
+
+    Examples:
+        >>> get_months_in_range("2025-05-30", "2025-07-01")
+        ['2025-05', '2025-06', '2025-07']
+    """
+    year, month = int(date_from[:4]), int(date_from[5:7])
+    last = get_month(date_to)
+    months = []
+    while True:
+        current = f'{year:04d}-{month:02d}'
+        if current > last:
+            return months
+        months.append(current)
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+
+
+def list_history_months(history_dir):
+    """
+    Возвращает отсортированный список месяцев, для которых есть шарды
+
+    Args:
+        history_dir (str): Директория шардов
+    """
+    try:
+        names = os.listdir(history_dir)
+    except OSError:
+        return []
+    return sorted(name[:-5] for name in names if name.endswith('.json') and len(name) == 12)
+
+
+def read_shard(history_dir, month):
+    """
+    Читает шард месяца
+
+    Returns:
+        dict|None: Шард или None если его нет
+    """
+    try:
+        with open(get_shard_path(history_dir, month), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def make_shard(month):
+    """Создает пустой шард месяца"""
+    return {'month': month, 'projects': {}, 'passive': {}, 'windows': {}}
+
+
+def merge_masks(target, source):
+    """
+    Объединяет словарь масок source в target по OR
+
+    Args:
+        target (dict): {ключ: маска} (изменяется in-place)
+        source (dict): {ключ: маска}
+
+    Returns:
+        bool: Изменился ли target
+    """
+    changed = False
+    for key, value in source.items():
+        existing = target.get(key)
+        if existing is None:
+            target[key] = value
+            changed = True
+            continue
+
+        bits = parse_mask(existing) | parse_mask(value)
+        if bits != parse_mask(existing):
+            target[key] = format_mask(bits)
+            changed = True
+    return changed
+
+
+def merge_shard_into_shard(target, source):
+    """
+    Объединяет шард source в шард target по OR
+
+    Returns:
+        bool: Изменился ли target
+    """
+    changed = False
+    for project_id, masks in source.get('projects', {}).items():
+        changed |= merge_masks(target['projects'].setdefault(project_id, {}), masks)
+    for date, masks in source.get('passive', {}).items():
+        changed |= merge_masks(target['passive'].setdefault(date, {}), masks)
+    # Шарды, записанные до появления заголовков окон, не содержат ключа windows
+    changed |= merge_window_slots(target.setdefault('windows', {}), source.get('windows', {}))
+    return changed
+
+
+def merge_shard_into_data(data, shard):
+    """
+    Добавляет маски шарда в данные БД (проекты, которых нет в данных, пропускаются)
+
+    Args:
+        data (dict): Данные БД (изменяются in-place)
+        shard (dict): Шард месяца
+    """
+    projects_by_id = {get_project_id_compat(project): project for project in data.get('projects', [])}
+    for project_id, masks in shard.get('projects', {}).items():
+        project = projects_by_id.get(project_id)
+        if project is not None:
+            merge_masks(project.setdefault('daily_masks', {}), masks)
+
+    passive = data.get('meta', {}).get('passive_tracking')
+    if passive is not None:
+        daily_masks = passive.setdefault('daily_masks', {})
+        for date, masks in shard.get('passive', {}).items():
+            merge_masks(daily_masks.setdefault(date, {}), masks)
+        if shard.get('windows'):
+            merge_window_slots(passive.setdefault('daily_windows', {}), shard['windows'])
+
+
+def split_history(data, hot_month):
+    """
+    Разделяет данные БД на документ db.json (маски с hot_month и новее) и шарды прошлых месяцев
+
+    Исходные данные не изменяются: проекты и пассивное отслеживание в документе -
+    поверхностные копии с отфильтрованными масками
+
+    Args:
+        data (dict): Данные БД
+        hot_month (str): Месяц YYYY-MM, маски которого остаются в db.json
+
+    Returns:
+        tuple: (документ db.json, {месяц: шард})
+    """
+    shards = {}
+
+    def get_shard(date):
+        month = get_month(date)
+        if month not in shards:
+            shards[month] = make_shard(month)
+        return shards[month]
+
+    document = dict(data)
+
+    projects = []
+    for project in data.get('projects', []):
+        daily_masks = project.get('daily_masks')
+        if daily_masks and any(get_month(date) < hot_month for date in daily_masks):
+            project = dict(project)
+            hot_masks = {}
+            for date, mask in daily_masks.items():
+                if get_month(date) < hot_month:
+                    get_shard(date)['projects'].setdefault(get_project_id_compat(project), {})[date] = mask
+                else:
+                    hot_masks[date] = mask
+            project['daily_masks'] = hot_masks
+        projects.append(project)
+    if 'projects' in data:
+        document['projects'] = projects
+
+    passive = data.get('meta', {}).get('passive_tracking')
+    if passive and any(get_month(date) < hot_month
+                       for date in list(passive.get('daily_masks', {})) + list(passive.get('daily_windows', {}))):
+        hot_masks = {}
+        for date, masks in passive.get('daily_masks', {}).items():
+            if get_month(date) < hot_month:
+                get_shard(date)['passive'][date] = masks
+            else:
+                hot_masks[date] = masks
+        hot_windows = {}
+        for date, slots in passive.get('daily_windows', {}).items():
+            if get_month(date) < hot_month:
+                get_shard(date)['windows'][date] = slots
+            else:
+                hot_windows[date] = slots
+        document['meta'] = dict(data['meta'])
+        document['meta']['passive_tracking'] = dict(passive, daily_masks=hot_masks)
+        if 'daily_windows' in passive:
+            document['meta']['passive_tracking']['daily_windows'] = hot_windows
+
+    return document, shards
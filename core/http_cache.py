@@ -0,0 +1,144 @@
+"""
+Модуль HTTP кеширования и сжатия ответов веб-сервера
+
+Чистые функции над заголовками и телом ответа, без зависимости от Flask:
+    ETag          - слабый (W/"...") тег версии: от сигнатуры БД для API и от mtime/size
+                    для статических файлов; одинаков для сжатого и несжатого ответа
+    If-None-Match - сравнение тегов запроса по слабому правилу (RFC 9110, 13.1.2)
+    gzip          - сжатие текстовых ответов больше GZIP_MIN_BYTES, если клиент принимает gzip
+
+Дашборд опрашивает API каждые 30 секунд: пока БД не менялась, браузер получает
+304 без тела вместо полного списка проектов.
+"""
+import gzip
+import hashlib
+
+
+# Ответы меньше этого размера не сжимаются: заголовки и CPU дороже экономии
+GZIP_MIN_BYTES = 1024
+
+GZIP_LEVEL = 6
+
+# MIME типы, которые имеет смысл сжимать (изображения и архивы уже сжаты)
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/javascript', 'text/', 'image/svg+xml'
+)
+
+# Cache-Control ответов API: браузер хранит ответ, но перепроверяет его ETag при каждом запросе
+API_CACHE_CONTROL = 'no-cache'
+
+# Cache-Control статических файлов дашборда (имена без хеша версии - кеш недолгий)
+STATIC_MAX_AGE_SECONDS = 300
+
+
+def make_etag(*parts):
+    """
+    Строит слабый ETag из частей версии (сигнатура БД, путь запроса, дата)
+
+    Examples:
+        >>> make_etag('db.json', (1, 2)) == make_etag('db.json', (1, 2))
+        True
+        >>> make_etag('a').startswith('W/"')
+        True
+    """
+    digest = hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _opaque_tag(etag):
+    """Тег без префикса слабости W/ для слабого сравнения"""
+    etag = etag.strip()
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Проверяет заголовок If-None-Match (список тегов или *) против текущего ETag
+
+    Args:
+        if_none_match (str|None): Значение заголовка запроса
+        etag (str): Текущий ETag ресурса
+
+    Returns:
+        bool: True если клиент уже имеет эту версию (можно ответить 304)
+
+    Examples:
+        >>> etag_matches('"x", W/"abc"', 'W/"abc"')
+        True
+        >>> etag_matches('"abc"', 'W/"abc"')
+        True
+        >>> etag_matches(None, 'W/"abc"')
+        False
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    current = _opaque_tag(etag)
+    return any(_opaque_tag(tag) == current for tag in if_none_match.split(',') if tag.strip())
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Проверяет, принимает ли клиент gzip (с учетом q=0)
+
+    Examples:
+        >>> accepts_gzip('gzip, deflate, br')
+        True
+        >>> accepts_gzip('gzip;q=0, identity')
+        False
+        >>> accepts_gzip('*')
+        True
+    """
+    if not accept_encoding:
+        return False
+
+    accepted = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    if 'gzip' in accepted:
+        return accepted['gzip'] > 0
+    return accepted.get('*', 0) > 0
+
+
+def is_compressible(mimetype):
+    """Имеет ли смысл сжимать ответ с таким MIME типом"""
+    return bool(mimetype) and any(mimetype.startswith(prefix) for prefix in COMPRESSIBLE_TYPES)
+
+
+def should_compress(body_size, mimetype, accept_encoding, content_encoding=None):
+    """
+    Нужно ли сжимать ответ
+
+    Args:
+        body_size (int): Размер тела в байтах
+        mimetype (str): MIME тип ответа
+        accept_encoding (str): Заголовок Accept-Encoding запроса
+        content_encoding (str): Текущий Content-Encoding ответа (уже сжатый ответ не трогаем)
+    """
+    return (
+        not content_encoding
+        and body_size >= GZIP_MIN_BYTES
+        and is_compressible(mimetype)
+        and accepts_gzip(accept_encoding)
+    )
+
+
+def gzip_body(body, level=GZIP_LEVEL):
+    """Сжимает тело ответа (mtime=0 - одинаковый результат для одинакового тела)"""
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def get_static_cache_control(max_age=STATIC_MAX_AGE_SECONDS):
+    """Cache-Control статического файла"""
+    return f'public, max-age={max_age}'
@@ -0,0 +1,244 @@
+"""
+Модуль журнала тиков (db.journal)
+Append-only запись тиков трекера со сворачиванием (compaction) в db.json
+
+Каждый тик добавляет в журнал одну компактную строку JSON:
+    {"d": "2025-06-09", "s": 24, "p": "exlibrus", "f": 3}
+    d - дата, s - позиция бита, p - ID проекта (null без проекта), f - флаги пассивного отслеживания
+
+Стоимость записи тика - O(1) вместо перезаписи всего db.json
+
+Записи прошлых месяцев (журнал, не свернутый до смены месяца) применяются только после
+загрузки шардов их месяцев: иначе уже учтенный слот выглядит пустым и время проекта
+увеличивается повторно
+"""
+import json
+import os
+
+from .tracking import apply_tick
+from .history import get_month, get_hot_month
+
+
+# Порог размера журнала, после которого трекер сворачивает его в db.json (~неделя тиков)
+DEFAULT_COMPACT_THRESHOLD_BYTES = 64 * 1024
+
+
+def get_journal_path(db_path):
+    """
+    Возвращает путь к журналу для файла БД
+
+    Examples:
+        >>> get_journal_path("C:/tracker/db.json")
+        'C:/tracker/db.journal'
+    """
+    return os.path.splitext(db_path)[0] + '.journal'
+
+
+def get_compacting_path(journal_path):
+    """Возвращает путь к журналу, находящемуся в процессе сворачивания"""
+    return journal_path + '.compacting'
+
+
+def get_compact_threshold(data):
+    """
+    Получает порог сворачивания журнала из настроек meta.journal
+
+    Args:
+        data (dict): Данные БД
+
+    Returns:
+        int: Порог в байтах
+    """
+    journal_config = data.get('meta', {}).get('journal', {})
+    return journal_config.get('compact_threshold_bytes', DEFAULT_COMPACT_THRESHOLD_BYTES)
+
+
+def make_record(date, slot, project_id, flags, window=None):
+    """
+    Создает запись журнала
+
+    Args:
+        date (str): Дата в формате YYYY-MM-DD
+        slot (int): Позиция бита (0-143)
+        project_id (str|None): ID проекта, которому засчитан слот
+        flags (int): Флаги пассивного отслеживания (core.tracking.FLAG_*)
+        window (str|None): Заголовок активного окна (ключ 'w' пишется только если он есть)
+
+    Returns:
+        dict: Запись журнала
+    """
+    record = {'d': date, 's': slot, 'p': project_id, 'f': flags}
+    if window:
+        record['w'] = window
+    return record
+
+
+def append_record(journal_path, record):
+    """
+    Дописывает запись в конец журнала одной операцией записи
+
+    Args:
+        journal_path (str): Путь к журналу
+        record (dict): Запись (см. make_record)
+    """
+    line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+    with open(journal_path, 'a', encoding='utf-8') as f:
+        f.write(line)
+        # Тик должен пережить сбой питания: запись одна на 5 минут, fsync дешев
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_records(journal_path):
+    """
+    Читает записи журнала
+
+    Поврежденные строки (например, недописанная последняя строка после сбоя) пропускаются
+
+    Args:
+        journal_path (str): Путь к журналу
+
+    Returns:
+        list: Список записей
+    """
+    if not os.path.exists(journal_path):
+        return []
+
+    records = []
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def get_history_months(records, hot_month=None):
+    """
+    Возвращает месяцы записей, маски которых хранятся в шардах истории (раньше текущего)
+
+    Examples:
+        >>> get_history_months([{'d': '2025-05-31'}, {'d': '2025-06-01'}, {}], '2025-06')
+        ['2025-05']
+    """
+    hot_month = hot_month or get_hot_month()
+    months = {get_month(record['d']) for record in records if isinstance(record.get('d'), str)}
+    return sorted(month for month in months if month < hot_month)
+
+
+def replay_records(data, records, load_history_func=None):
+    """
+    Применяет записи журнала к данным БД
+
+    Args:
+        data (dict): Данные БД (изменяются in-place)
+        records (list): Записи журнала
+        load_history_func (callable): Загрузка шардов load_history_func(data, months) для записей
+            прошлых месяцев (None - данные уже содержат нужные маски)
+
+    Returns:
+        int: Количество примененных записей
+    """
+    if load_history_func is not None:
+        months = get_history_months(records)
+        if months:
+            load_history_func(data, months)
+
+    applied = 0
+    for record in records:
+        try:
+            apply_tick(data, record['d'], record['s'], record.get('p'), record.get('f', 0), record.get('w'))
+            applied += 1
+        except (KeyError, IndexError, TypeError):
+            continue
+    return applied
+
+
+def load_journal(data, db_path, load_history_func=None):
+    """
+    Применяет к данным все несвернутые записи журнала без записи на диск
+
+    Используется трекером при холодном старте, чтобы видеть актуальные маски
+
+    Args:
+        data (dict): Данные БД (изменяются in-place)
+        db_path (str): Путь к db.json
+        load_history_func (callable): Загрузка шардов для записей прошлых месяцев (см. replay_records)
+
+    Returns:
+        int: Количество примененных записей
+    """
+    journal_path = get_journal_path(db_path)
+    applied = replay_records(data, read_records(get_compacting_path(journal_path)), load_history_func)
+    applied += replay_records(data, read_records(journal_path), load_history_func)
+    return applied
+
+
+def compact_journal(data, db_path, save_func, load_history_func=None):
+    """
+    Сворачивает журнал в db.json
+
+    Журнал сначала атомарно переименовывается, поэтому тики, записанные во время
+    сворачивания, попадают в новый журнал и не теряются. Если процесс упал до удаления
+    переименованного файла, он будет повторно применен при следующем сворачивании
+    (применение тиков идемпотентно).
+
+    Args:
+        data (dict): Данные БД (изменяются in-place)
+        db_path (str): Путь к db.json
+        save_func (callable): Функция сохранения save_func(data, db_path)
+        load_history_func (callable): Загрузка шардов для записей прошлых месяцев (см. replay_records)
+
+    Returns:
+        int: Количество свернутых записей
+    """
+    journal_path = get_journal_path(db_path)
+    compacting_path = get_compacting_path(journal_path)
+    compacted = 0
+
+    # Остаток прерванного сворачивания
+    if os.path.exists(compacting_path):
+        compacted += replay_records(data, read_records(compacting_path), load_history_func)
+        save_func(data, db_path)
+        os.remove(compacting_path)
+
+    if os.path.exists(journal_path) and os.path.getsize(journal_path) > 0:
+        try:
+            os.replace(journal_path, compacting_path)
+        except OSError:
+            # Журнал занят другим процессом - применяем только в памяти, свернем в следующий раз
+            return compacted + replay_records(data, read_records(journal_path), load_history_func)
+
+        compacted += replay_records(data, read_records(compacting_path), load_history_func)
+        save_func(data, db_path)
+        os.remove(compacting_path)
+
+    return compacted
+
+
+def has_pending_journal(db_path):
+    """
+    Проверяет есть ли несвернутые записи (журнал или остаток прерванного сворачивания)
+
+    Args:
+        db_path (str): Путь к db.json
+    """
+    journal_path = get_journal_path(db_path)
+    return os.path.exists(get_compacting_path(journal_path)) or get_journal_size(db_path) > 0
+
+
+def get_journal_size(db_path):
+    """
+    Возвращает размер журнала в байтах (0 если журнала нет)
+
+    Args:
+        db_path (str): Путь к db.json
+    """
+    try:
+        return os.path.getsize(get_journal_path(db_path))
+    except OSError:
+        return 0
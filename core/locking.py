@@ -0,0 +1,205 @@
+"""
+Модуль межпроцессной блокировки и атомарной записи файлов БД
+
+Запись файла: временный файл в той же директории -> flush + fsync -> os.replace -> fsync директории.
+Читатель всегда видит либо старую, либо новую версию файла целиком, поэтому читатели
+блокировку не берут и никогда не ждут писателей.
+
+Писатели (трекер, project_manager, веб-сервер) сериализуются advisory-блокировкой
+файла db.lock рядом с БД:
+    Linux/macOS - fcntl.flock
+    Windows     - msvcrt.locking
+"""
+import os
+import stat
+import time
+
+try:
+    import fcntl
+    FCNTL_SUPPORT = True
+except ImportError:
+    FCNTL_SUPPORT = False
+
+try:
+    import msvcrt
+    MSVCRT_SUPPORT = True
+except ImportError:
+    MSVCRT_SUPPORT = False
+
+
+# Сколько писатель ждет блокировку, секунды (запись db.json занимает миллисекунды)
+DEFAULT_LOCK_TIMEOUT = 30.0
+
+# Интервал повторных попыток захвата блокировки и замены файла, секунды
+RETRY_INTERVAL = 0.05
+
+# Сколько раз повторять os.replace (на Windows замена падает, пока файл открыт читателем)
+REPLACE_ATTEMPTS = 20
+
+
+class LockTimeout(Exception):
+    """Блокировка не получена за отведенное время"""
+
+
+def get_lock_path(db_path):
+    """
+    Возвращает путь к файлу блокировки для файла БД
+
+    Examples:
+        >>> get_lock_path("C:/tracker/db.json")
+        'C:/tracker/db.lock'
+    """
+    return os.path.splitext(db_path)[0] + '.lock'
+
+
+def _try_lock(lock_file):
+    """Пытается захватить блокировку без ожидания (OSError если занята)"""
+    if FCNTL_SUPPORT:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    elif MSVCRT_SUPPORT:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+def _unlock(lock_file):
+    if FCNTL_SUPPORT:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    elif MSVCRT_SUPPORT:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """
+    Эксклюзивная межпроцессная блокировка на файле
+
+    Повторный захват тем же экземпляром не блокируется (счетчик вложенности),
+    поэтому операции хранилища могут вызывать друг друга под одной блокировкой.
+
+    Использование:
+        with FileLock(get_lock_path(db_path)):
+            ...
+    """
+
+    def __init__(self, path, timeout=DEFAULT_LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._file = None
+        self._depth = 0
+
+    @property
+    def is_locked(self):
+        return self._depth > 0
+
+    def acquire(self):
+        """
+        Захватывает блокировку, ожидая не дольше timeout
+
+        Raises:
+            LockTimeout: Блокировку держит другой процесс дольше timeout
+        """
+        if self._depth:
+            self._depth += 1
+            return
+
+        lock_file = open(self.path, 'a+b')
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                _try_lock(lock_file)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    lock_file.close()
+                    raise LockTimeout(f"Не удалось получить блокировку {self.path} за {self.timeout} с")
+                time.sleep(RETRY_INTERVAL)
+
+        self._file = lock_file
+        self._depth = 1
+
+    def release(self):
+        if not self._depth:
+            return
+
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                _unlock(self._file)
+            finally:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+def fsync_directory(directory):
+    """Сбрасывает на диск запись директории (переименование файла переживает сбой питания)"""
+    if os.name == 'nt':
+        # На Windows директорию нельзя открыть для fsync, NTFS журналирует метаданные сама
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def replace_file(source, target):
+    """os.replace с повторами (на Windows целевой файл может быть открыт читателем)"""
+    for attempt in range(REPLACE_ATTEMPTS):
+        try:
+            os.replace(source, target)
+            return
+        except PermissionError:
+            if attempt == REPLACE_ATTEMPTS - 1:
+                raise
+            time.sleep(RETRY_INTERVAL)
+
+
+def atomic_write_text(path, text):
+    """
+    Атомарно записывает текст в файл
+
+    После сбоя на любом шаге на диске остается либо старая, либо новая версия файла
+    целиком; недописанный временный файл удаляется.
+
+    Args:
+        path (str): Путь к файлу
+        text (str): Содержимое
+    """
+    # tempfile (и random) нужны только при записи - команды чтения их не загружают
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # mkstemp создает файл с правами 0600 - сохраняем права исходного файла
+        try:
+            os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+        except OSError:
+            pass
+
+        replace_file(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    fsync_directory(directory)
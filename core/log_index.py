@@ -0,0 +1,456 @@
+"""
+Модуль колоночного индекса tracker.log
+
+Лог (вместе с архивными сегментами, в т.ч. .gz) читается потоково, строка за
+строкой, и раскладывается в колонки компактных массивов array - по строке индекса
+на запись ACTIVITY / NO_ACTIVE_PROJECT / BIT_SET / BIT_SKIP:
+    second  - секунда от начала дня
+    event   - код события (EVENT_*)
+    active  - активен ли пользователь (1/0, -1 неизвестно)
+    idle    - секунды простоя (float32, -1 неизвестно)
+    window  - ID заголовка окна в таблице windows (-1 нет)
+    project - ID названия проекта в таблице projects (-1 нет)
+    reason  - ID причины BIT_SET/BIT_SKIP в таблице reasons (-1 нет)
+
+Заголовки окон, проекты и причины хранятся один раз (interning), для каждой даты
+хранятся диапазоны строк [start, end), поэтому запрос за неделю не просматривает
+остальной лог. Память при построении - колонки (~22 байта на запись) и таблицы
+уникальных строк, объем самого лога роли не играет.
+
+Запись ACTIVITY тика получает проект из следующей за ней записи BIT_SET/BIT_SKIP
+с тем же временем - так окна связываются с проектами.
+"""
+import base64
+import json
+import os
+import sys
+from array import array
+
+from .locking import atomic_write_text
+from .tracker_log import iter_log_lines, list_log_segments
+
+
+INDEX_VERSION = 1
+
+EVENT_ACTIVITY = 0
+EVENT_NO_PROJECT = 1
+EVENT_BIT_SET = 2
+EVENT_BIT_SKIP = 3
+
+EVENT_NAMES = {
+    'ACTIVITY': EVENT_ACTIVITY,
+    'NO_ACTIVE_PROJECT': EVENT_NO_PROJECT,
+    'BIT_SET': EVENT_BIT_SET,
+    'BIT_SKIP': EVENT_BIT_SKIP
+}
+
+# Колонка -> typecode array
+COLUMNS = {
+    'second': 'i',
+    'event': 'b',
+    'active': 'b',
+    'idle': 'f',
+    'window': 'i',
+    'project': 'i',
+    'reason': 'i'
+}
+
+# Минут в одной записи ACTIVITY (тик раз в 5 минут)
+MINUTES_PER_ROW = 5
+
+
+def get_index_path(log_path):
+    """
+    Возвращает путь к индексу для файла лога
+
+    Examples:
+        >>> get_index_path("C:/tracker/tracker.log")
+        'C:/tracker/tracker.log.index.json'
+    """
+    return log_path + '.index.json'
+
+
+def get_log_sources(log_path):
+    """
+    Возвращает сигнатуру файлов лога: [(имя, размер, mtime_ns)] сегментов и текущего файла
+
+    Индекс устарел, если сигнатура изменилась (новые тики, ротация)
+    """
+    paths = list_log_segments(log_path)
+    if os.path.exists(log_path):
+        paths.append(log_path)
+
+    sources = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        sources.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return sources
+
+
+def _parse_flag(field, prefix):
+    """'Active: True' -> 1, 'Active: False' -> 0, иначе -1"""
+    if not field.startswith(prefix):
+        return -1
+    value = field[len(prefix):].strip()
+    if value == 'True':
+        return 1
+    if value == 'False':
+        return 0
+    return -1
+
+
+def _parse_idle(field):
+    """'Idle: 12.5s' -> 12.5, иначе -1"""
+    if not field.startswith('Idle: '):
+        return -1.0
+    try:
+        return float(field[len('Idle: '):].rstrip('s'))
+    except ValueError:
+        return -1.0
+
+
+def parse_log_line(line):
+    """
+    Разбирает строку tracker.log
+
+    Заголовок окна и название проекта могут сами содержать " | ", поэтому
+    они собираются из нескольких полей
+
+    Args:
+        line (str): Строка лога
+
+    Returns:
+        dict|None: {'date', 'second', 'event', 'active', 'idle', 'window', 'project', 'reason'}
+            или None для строк, которые не индексируются
+    """
+    fields = line.split(' | ')
+    timestamp = fields[0]
+    if len(fields) < 2 or len(timestamp) != 19:
+        return None
+    try:
+        second = int(timestamp[11:13]) * 3600 + int(timestamp[14:16]) * 60 + int(timestamp[17:19])
+    except ValueError:
+        return None
+
+    entry = {
+        'date': timestamp[:10], 'second': second, 'active': -1, 'idle': -1.0,
+        'window': None, 'project': None, 'reason': None
+    }
+
+    if fields[1] in ('ACTIVITY', 'NO_ACTIVE_PROJECT'):
+        entry['event'] = EVENT_NAMES[fields[1]]
+        if len(fields) > 2:
+            entry['active'] = _parse_flag(fields[2], 'Active: ')
+        if len(fields) > 3:
+            entry['idle'] = _parse_idle(fields[3])
+        for i, field in enumerate(fields[4:], 4):
+            if field.startswith("Window: '"):
+                window = ' | '.join(fields[i:])[len("Window: '"):]
+                entry['window'] = window[:-1] if window.endswith("'") else window
+                break
+        return entry
+
+    # "время | проект | BIT_SET | Position: N | ... | REASON: причина"
+    for i in range(2, len(fields)):
+        if fields[i] in ('BIT_SET', 'BIT_SKIP'):
+            entry['event'] = EVENT_NAMES[fields[i]]
+            entry['project'] = ' | '.join(fields[1:i])
+            if fields[-1].startswith('REASON: '):
+                entry['reason'] = fields[-1][len('REASON: '):]
+            return entry
+
+    return None
+
+
+class LogIndex:
+    """
+    Колоночный индекс tracker.log
+
+    Строится потоково (build) или загружается из файла (load); запросы
+    (top_windows, reasons_summary, day_summary) работают только со строками нужных дней
+    """
+
+    def __init__(self):
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+        self.windows = []
+        self.projects = []
+        self.reasons = []
+        self.days = {}
+        self.sources = []
+        self._interned = {'windows': {}, 'projects': {}, 'reasons': {}}
+
+    def __len__(self):
+        return len(self.columns['event'])
+
+    def _intern(self, table_name, value):
+        if value is None:
+            return -1
+        table = self._interned[table_name]
+        value_id = table.get(value)
+        if value_id is None:
+            value_id = len(table)
+            table[value] = value_id
+            getattr(self, table_name).append(value)
+        return value_id
+
+    def _append(self, entry):
+        row = len(self)
+        ranges = self.days.setdefault(entry['date'], [])
+        if ranges and ranges[-1][1] == row:
+            ranges[-1][1] = row + 1
+        else:
+            # Дата встретилась не подряд (перевод часов, склейка логов) - новый диапазон
+            ranges.append([row, row + 1])
+
+        columns = self.columns
+        columns['second'].append(entry['second'])
+        columns['event'].append(entry['event'])
+        columns['active'].append(entry['active'])
+        columns['idle'].append(entry['idle'])
+        columns['window'].append(self._intern('windows', entry['window']))
+        columns['project'].append(self._intern('projects', entry['project']))
+        columns['reason'].append(self._intern('reasons', entry['reason']))
+
+    @classmethod
+    def build(cls, log_path, include_rotated=True):
+        """
+        Строит индекс потоковым чтением лога
+
+        Args:
+            log_path (str): Путь к tracker.log
+            include_rotated (bool): Индексировать и архивные сегменты
+
+        Returns:
+            LogIndex: Индекс
+        """
+        index = cls()
+        index.sources = get_log_sources(log_path) if include_rotated else [
+            source for source in get_log_sources(log_path) if source[0] == os.path.basename(log_path)
+        ]
+
+        # Последняя запись ACTIVITY ждет BIT_SET/BIT_SKIP своего тика
+        pending_row, pending_key = None, None
+
+        for line in iter_log_lines(log_path, include_rotated):
+            entry = parse_log_line(line)
+            if entry is None:
+                continue
+
+            if entry['event'] in (EVENT_BIT_SET, EVENT_BIT_SKIP):
+                if pending_key == (entry['date'], entry['second']):
+                    index.columns['project'][pending_row] = index._intern('projects', entry['project'])
+                pending_row, pending_key = None, None
+            elif entry['event'] == EVENT_ACTIVITY:
+                pending_row, pending_key = len(index), (entry['date'], entry['second'])
+
+            index._append(entry)
+
+        return index
+
+    def save(self, index_path):
+        """Атомарно сохраняет индекс (колонки - base64 от байтов array)"""
+        document = {
+            'version': INDEX_VERSION,
+            'byteorder': sys.byteorder,
+            'sources': self.sources,
+            'windows': self.windows,
+            'projects': self.projects,
+            'reasons': self.reasons,
+            'days': self.days,
+            'columns': {
+                name: base64.b64encode(column.tobytes()).decode('ascii')
+                for name, column in self.columns.items()
+            }
+        }
+        atomic_write_text(index_path, json.dumps(document, ensure_ascii=False, separators=(',', ':')))
+
+    @classmethod
+    def load(cls, index_path):
+        """
+        Загружает индекс из файла
+
+        Returns:
+            LogIndex|None: Индекс или None если файла нет или он другой версии
+        """
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if document.get('version') != INDEX_VERSION:
+            return None
+
+        index = cls()
+        index.sources = document['sources']
+        index.windows = document['windows']
+        index.projects = document['projects']
+        index.reasons = document['reasons']
+        index.days = document['days']
+        for name, typecode in COLUMNS.items():
+            column = array(typecode)
+            column.frombytes(base64.b64decode(document['columns'][name]))
+            if document['byteorder'] != sys.byteorder:
+                column.byteswap()
+            index.columns[name] = column
+        for table_name in ('windows', 'projects', 'reasons'):
+            index._interned[table_name] = {value: i for i, value in enumerate(getattr(index, table_name))}
+        return index
+
+    def iter_rows(self, date_from=None, date_to=None):
+        """
+        Перебирает номера строк за диапазон дат (включительно)
+
+        Args:
+            date_from (str): Начальная дата YYYY-MM-DD (None - с начала)
+            date_to (str): Конечная дата YYYY-MM-DD (None - до конца)
+        """
+        for date in sorted(self.days):
+            if (date_from and date < date_from) or (date_to and date > date_to):
+                continue
+            for start, end in self.days[date]:
+                yield from range(start, end)
+
+    def find_project_id(self, title):
+        """Возвращает ID проекта по названию из лога (без учета регистра) или None"""
+        value_id = self._interned['projects'].get(title)
+        if value_id is not None:
+            return value_id
+        lowered = title.lower()
+        for i, project in enumerate(self.projects):
+            if project.lower() == lowered:
+                return i
+        return None
+
+    def top_windows(self, date_from=None, date_to=None, project=None, limit=10, active_only=True):
+        """
+        Самые частые заголовки окон за период
+
+        Args:
+            date_from (str): Начальная дата YYYY-MM-DD
+            date_to (str): Конечная дата YYYY-MM-DD
+            project (str): Название проекта - только тики этого проекта (None - все)
+            limit (int): Сколько окон вернуть
+            active_only (bool): Учитывать только тики, когда пользователь был активен
+
+        Returns:
+            list: [{'window', 'ticks', 'minutes', 'avg_idle_seconds'}] по убыванию ticks
+        """
+        project_id = None
+        if project is not None:
+            project_id = self.find_project_id(project)
+            if project_id is None:
+                return []
+
+        columns = self.columns
+        events, windows, projects = columns['event'], columns['window'], columns['project']
+        actives, idles = columns['active'], columns['idle']
+
+        ticks = {}
+        idle_sums = {}
+        for row in self.iter_rows(date_from, date_to):
+            if events[row] != EVENT_ACTIVITY or windows[row] < 0:
+                continue
+            if project_id is not None and projects[row] != project_id:
+                continue
+            if active_only and actives[row] == 0:
+                continue
+            window = windows[row]
+            ticks[window] = ticks.get(window, 0) + 1
+            idle_sums[window] = idle_sums.get(window, 0.0) + max(idles[row], 0.0)
+
+        top = sorted(ticks.items(), key=lambda item: (-item[1], self.windows[item[0]]))[:limit]
+        return [
+            {
+                'window': self.windows[window],
+                'ticks': count,
+                'minutes': count * MINUTES_PER_ROW,
+                'avg_idle_seconds': round(idle_sums[window] / count, 1)
+            }
+            for window, count in top
+        ]
+
+    def reasons_summary(self, date_from=None, date_to=None, project=None):
+        """
+        Количество BIT_SET/BIT_SKIP по причинам за период
+
+        Returns:
+            dict: {'BIT_SET': {причина: n}, 'BIT_SKIP': {причина: n}}
+        """
+        project_id = self.find_project_id(project) if project is not None else None
+        events, reasons, projects = self.columns['event'], self.columns['reason'], self.columns['project']
+
+        summary = {'BIT_SET': {}, 'BIT_SKIP': {}}
+        if project is not None and project_id is None:
+            return summary
+
+        for row in self.iter_rows(date_from, date_to):
+            event = events[row]
+            if event not in (EVENT_BIT_SET, EVENT_BIT_SKIP):
+                continue
+            if project_id is not None and projects[row] != project_id:
+                continue
+            counts = summary['BIT_SET' if event == EVENT_BIT_SET else 'BIT_SKIP']
+            reason = self.reasons[reasons[row]] if reasons[row] >= 0 else 'unknown'
+            counts[reason] = counts.get(reason, 0) + 1
+        return summary
+
+    def day_summary(self, date):
+        """
+        Сводка дня: тики, активные тики, средний простой, проекты
+
+        Returns:
+            dict|None: Сводка или None если дня нет в индексе
+        """
+        if date not in self.days:
+            return None
+
+        events, actives, idles, projects = (
+            self.columns['event'], self.columns['active'], self.columns['idle'], self.columns['project']
+        )
+        ticks = active_ticks = idle_count = 0
+        idle_sum = 0.0
+        project_ticks = {}
+        for row in self.iter_rows(date, date):
+            event = events[row]
+            if event in (EVENT_ACTIVITY, EVENT_NO_PROJECT):
+                ticks += 1
+                active_ticks += actives[row] == 1
+                if idles[row] >= 0:
+                    idle_sum += idles[row]
+                    idle_count += 1
+            elif event == EVENT_BIT_SET:
+                title = self.projects[projects[row]]
+                project_ticks[title] = project_ticks.get(title, 0) + 1
+
+        return {
+            'date': date,
+            'ticks': ticks,
+            'active_ticks': active_ticks,
+            'avg_idle_seconds': round(idle_sum / idle_count, 1) if idle_count else 0.0,
+            'project_minutes': {title: count * MINUTES_PER_ROW for title, count in project_ticks.items()}
+        }
+
+
+def load_or_build_index(log_path, rebuild=False):
+    """
+    Загружает индекс лога, перестраивая его если лог изменился
+
+    Args:
+        log_path (str): Путь к tracker.log
+        rebuild (bool): Перестроить принудительно
+
+    Returns:
+        tuple: (LogIndex, перестроен ли индекс)
+    """
+    index_path = get_index_path(log_path)
+    if not rebuild:
+        index = LogIndex.load(index_path)
+        if index is not None and index.sources == get_log_sources(log_path):
+            return index, False
+
+    index = LogIndex.build(log_path)
+    index.save(index_path)
+    return index, True
@@ -0,0 +1,226 @@
+"""
+Модуль представления битовых масок daily_masks
+Маска дня хранится как Python int (бит N = слот N), в db.json - компактно в base64
+
+Форматы значения маски в db.json:
+    "b64:AAAAAAAAAAAAAAAAAAAAAAAA"  - компактный: 18 байт little-endian в base64 (24 символа)
+    "110010000100..."               - legacy: строка '0'/'1' длиной до 144 символов
+
+Читаются оба формата, записывается всегда компактный
+"""
+import base64
+
+
+# Количество 5-минутных слотов в рабочем дне (08:00-20:00)
+SLOTS_PER_DAY = 144
+
+# Размер маски в байтах (144 бита)
+MASK_BYTES = SLOTS_PER_DAY // 8
+
+COMPACT_PREFIX = 'b64:'
+
+# Минут в одном слоте
+SLOT_MINUTES = 5
+
+FULL_MASK = (1 << SLOTS_PER_DAY) - 1
+
+
+def bit_count(bits):
+    """
+    Считает количество установленных битов (popcount)
+
+    Args:
+        bits (int): Маска
+
+    Returns:
+        int: Количество единичных битов
+    """
+    try:
+        return bits.bit_count()
+    except AttributeError:
+        # Python < 3.10
+        return bin(bits).count('1')
+
+
+def parse_mask(value):
+    """
+    Преобразует значение маски из любого формата в int
+
+    Args:
+        value (str|int|None): Компактная строка, legacy строка '0'/'1', int или пустое значение
+
+    Returns:
+        int: Маска (бит N = слот N)
+
+    Examples:
+        >>> parse_mask("101")
+        5
+        >>> parse_mask(format_mask(5))
+        5
+        >>> parse_mask("")
+        0
+    """
+    if not value:
+        return 0
+
+    if isinstance(value, int):
+        return value
+
+    if value.startswith(COMPACT_PREFIX):
+        raw = base64.b64decode(value[len(COMPACT_PREFIX):])
+        return int.from_bytes(raw, 'little')
+
+    # TODO: LEGACY_SUPPORT - строка '0'/'1', первый символ = слот 0
+    return int(value[SLOTS_PER_DAY - 1::-1], 2) if value[:SLOTS_PER_DAY].strip('01') == '' else 0
+
+
+def format_mask(bits):
+    """
+    Сериализует маску в компактный формат для db.json
+
+    Args:
+        bits (int): Маска
+
+    Returns:
+        str: Строка вида "b64:..."
+    """
+    raw = (bits & FULL_MASK).to_bytes(MASK_BYTES, 'little')
+    return COMPACT_PREFIX + base64.b64encode(raw).decode('ascii')
+
+
+def to_legacy(value):
+    """
+    Преобразует маску в legacy строку '0'/'1' из 144 символов (для API и отладки)
+
+    Args:
+        value (str|int|None): Маска в любом формате
+
+    Returns:
+        str: Строка из 144 символов '0'/'1'
+    """
+    bits = parse_mask(value)
+    return format(bits, f'0{SLOTS_PER_DAY}b')[::-1]
+
+
+def mask_to_bytes(value):
+    """
+    Упаковывает маску в 18 байт (для бинарных хранилищ)
+
+    Args:
+        value (str|int|None): Маска в любом формате
+
+    Returns:
+        bytes: 18 байт little-endian
+    """
+    return (parse_mask(value) & FULL_MASK).to_bytes(MASK_BYTES, 'little')
+
+
+def mask_from_bytes(raw):
+    """
+    Распаковывает маску из байтов (см. mask_to_bytes)
+
+    Args:
+        raw (bytes|None): Байты маски
+
+    Returns:
+        int: Маска
+    """
+    return int.from_bytes(raw, 'little') if raw else 0
+
+
+def is_compact(value):
+    """Проверяет записана ли маска в компактном формате"""
+    return isinstance(value, str) and value.startswith(COMPACT_PREFIX)
+
+
+def is_bit_set(value, slot):
+    """
+    Проверяет установлен ли бит слота
+
+    Args:
+        value (str|int|None): Маска в любом формате
+        slot (int): Позиция бита (0-143)
+
+    Returns:
+        bool: True если бит установлен
+    """
+    return bool(parse_mask(value) >> slot & 1)
+
+
+def set_bit(value, slot):
+    """
+    Устанавливает бит слота
+
+    Args:
+        value (str|int|None): Маска в любом формате
+        slot (int): Позиция бита (0-143)
+
+    Returns:
+        tuple: (новая маска в компактном формате, был ли бит изменен 0 -> 1)
+    """
+    bits = parse_mask(value)
+    flag = 1 << slot
+    if bits & flag:
+        return (value if is_compact(value) else format_mask(bits)), False
+    return format_mask(bits | flag), True
+
+
+def count_slots(value):
+    """Считает количество отмеченных слотов в маске"""
+    return bit_count(parse_mask(value))
+
+
+def count_minutes(value):
+    """Считает количество минут в маске (каждый бит = 5 минут)"""
+    return count_slots(value) * SLOT_MINUTES
+
+
+def range_bits(bits, start, end):
+    """
+    Вырезает из маски диапазон слотов [start, end)
+
+    Args:
+        bits (int): Маска
+        start (int): Первый слот
+        end (int): Слот после последнего
+
+    Returns:
+        int: Биты диапазона, сдвинутые к нулевой позиции
+    """
+    return (bits >> start) & ((1 << (end - start)) - 1)
+
+
+def count_minutes_in_range(bits, start, end):
+    """Считает минуты маски в диапазоне слотов [start, end)"""
+    return bit_count(range_bits(bits, start, end)) * SLOT_MINUTES
+
+
+def compact_daily_masks(data):
+    """
+    Переводит все маски БД (проекты и пассивное отслеживание) в компактный формат
+
+    Уже компактные маски не трогаются, поэтому повторный вызов дешевый
+
+    Args:
+        data (dict): Данные БД (изменяются in-place)
+
+    Returns:
+        int: Количество преобразованных масок
+    """
+    converted = 0
+
+    for project in data.get('projects', []):
+        daily_masks = project.get('daily_masks', {})
+        for date, value in daily_masks.items():
+            if not is_compact(value):
+                daily_masks[date] = format_mask(parse_mask(value))
+                converted += 1
+
+    passive = data.get('meta', {}).get('passive_tracking', {})
+    for day_masks in passive.get('daily_masks', {}).values():
+        for mask_name, value in day_masks.items():
+            if not is_compact(value):
+                day_masks[mask_name] = format_mask(parse_mask(value))
+                converted += 1
+
+    return converted
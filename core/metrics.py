@@ -0,0 +1,228 @@
+"""
+Модуль метрик в текстовом формате Prometheus (text exposition format 0.0.4)
+
+Минимальный реестр без внешних зависимостей для /metrics веб-сервера:
+    Counter   - монотонный счетчик (запросы, загрузки БД, попадания в кеш)
+    Histogram - гистограмма длительностей с накопительными бакетами (_bucket, _sum, _count)
+    Gauge     - текущее значение, вычисляемое при каждом запросе /metrics (размер БД, проекты)
+
+Метрики потокобезопасны: Flask обслуживает запросы в нескольких потоках.
+
+Использование:
+    registry = MetricsRegistry()
+    requests = registry.counter('tracker_http_requests_total', 'Запросы', ('route', 'status'))
+    requests.inc(route='/api/projects', status='200')
+    registry.gauge('tracker_projects', 'Проекты', ('status',), lambda: {('active',): 1})
+    text = registry.render()
+"""
+import math
+import threading
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Бакеты длительностей в секундах: от stat() закешированной БД до загрузки большой истории
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def format_value(value):
+    """
+    Форматирует число для текстового формата
+
+    Examples:
+        >>> format_value(3)
+        '3'
+        >>> format_value(0.25)
+        '0.25'
+        >>> format_value(float('inf'))
+        '+Inf'
+    """
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        if math.isnan(value):
+            return 'NaN'
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return repr(value)
+    return str(value)
+
+
+def escape_label_value(value):
+    """Экранирует значение метки: обратный слеш, кавычки и перевод строки"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=None):
+    """
+    Форматирует набор меток {name="value",...}
+
+    Args:
+        names (tuple): Имена меток
+        values (tuple): Значения меток
+        extra (tuple): Дополнительная метка (имя, значение), например le гистограммы
+    """
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + '}'
+
+
+class _Metric:
+    """Общая часть метрик: имя, описание, метки и значения по наборам меток"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: ожидались метки {self.labelnames}, получены {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    """Монотонный счетчик"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        """Текущее значение (0 для набора меток без событий)"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def collect(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{format_labels(self.labelnames, key)} {format_value(value)}' for key, value in items]
+
+
+class Histogram(_Metric):
+    """Гистограмма с накопительными бакетами (значения в секундах)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [счетчики бакетов (последний - +Inf), сумма, количество]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            state[1] += value
+            state[2] += 1
+
+    def get_count(self, **labels):
+        """Количество наблюдений для набора меток"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state else 0
+
+    def collect(self):
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = format_labels(self.labelnames, key, ('le', format_value(float(bound))))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Gauge(_Metric):
+    """
+    Текущее значение, вычисляемое функцией при каждом render()
+
+    Функция возвращает число (метрика без меток) или {(значения меток): число};
+    None - значение неизвестно, метрика не выводится
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def collect(self):
+        values = self.function()
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [
+            f'{self.name}{format_labels(self.labelnames, key)} {format_value(value)}'
+            for key, value in sorted(values.items()) if value is not None
+        ]
+
+
+class MetricsRegistry:
+    """Реестр метрик: регистрация и вывод в текстовом формате"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def _register(self, metric):
+        if any(existing.name == metric.name for existing in self._metrics):
+            raise ValueError(f"Метрика уже зарегистрирована: {metric.name}")
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, labelnames=(), function=None):
+        return self._register(Gauge(name, documentation, labelnames, function))
+
+    def render(self):
+        """
+        Выводит все метрики в текстовом формате
+
+        Ошибка вычисления одной метрики (например, недоступная БД) не ломает
+        остальные: метрика выводится без значений
+
+        Returns:
+            str: Текст для ответа /metrics
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            try:
+                lines.extend(metric.collect())
+            except Exception:
+                pass
+        return '\n'.join(lines) + '\n'
@@ -7,12 +7,19 @@
     action = show_break_notification("Перерыв!", "Время отдохнуть")
     if action == "pause_5":
         start_break(5)
+
+Трекер не ждет ответа пользователя: окно о перерыве показывает отдельный процесс
+(dispatch_break_notification), тик к этому моменту уже записан. Выбор пользователя
+применяется в этом процессе (apply_break_action) и сохраняется в break_state.json:
+    {"pending_since": "...", "quiet_until": "...", "last_action": "snooze"}
+Пока окно открыто или не истек перерыв/отложение, новые окна не показываются.
 """
 
-import tkinter as tk
-from tkinter import ttk
+import json
+import os
 import threading
 import time
+from datetime import datetime, timedelta
 
 def show_break_notification(title="Время для перерыва!", message="Вы работаете уже долго. Сделайте перерыв."):
     """
@@ -31,6 +38,13 @@ def show_break_notification(title="Время для перерыва!", message
     - "snooze": Перерыв отложен
     - "cancelled": Окно закрыто без выбора
     """
+    # tkinter загружается только когда окно действительно показывается
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+    except ImportError:
+        return None
+    
     result = {"action": None}
     
     def create_dialog():
@@ -162,6 +176,13 @@ def show_simple_notification(title, message, buttons=None):
     if not buttons:
         buttons = [{"text": "OK", "value": "ok"}]
     
+    # tkinter загружается только когда окно действительно показывается
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+    except ImportError:
+        return "cancelled"
+    
     result = {"action": None}
     
     def create_dialog():
@@ -232,6 +253,131 @@ def check_break_needed(work_minutes, break_interval_minutes=120):
     """
     return work_minutes >= break_interval_minutes
 
+# Файл состояния уведомлений о перерыве (рядом с tracker.log)
+BREAK_STATE_FILE = 'break_state.json'
+
+# Через сколько минут открытое окно считается потерянным (процесс окна мог упасть)
+DEFAULT_PENDING_TIMEOUT_MINUTES = 120
+
+# Длительность тишины после выбора пользователя, минуты
+BREAK_ACTION_QUIET_MINUTES = {
+    "pause_5": 5,
+    "pause_15": 15,
+    "snooze": 10
+}
+
+
+def read_break_state(state_path):
+    """
+    Читает состояние уведомлений о перерыве
+    
+    Returns:
+        dict: Состояние (пустой словарь, если файла нет или он поврежден)
+    """
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_break_state(state_path, state):
+    """Атомарно записывает состояние уведомлений о перерыве"""
+    from .locking import atomic_write_text
+    atomic_write_text(state_path, json.dumps(state, ensure_ascii=False, indent=2))
+
+
+def get_break_block_reason(state, now, pending_timeout_minutes=DEFAULT_PENDING_TIMEOUT_MINUTES):
+    """
+    Проверяет, можно ли показать новое окно о перерыве
+    
+    Args:
+        state (dict): Состояние из break_state.json
+        now (datetime): Текущее время
+        pending_timeout_minutes (int): Возраст открытого окна, после которого оно считается потерянным
+        
+    Returns:
+        str|None: 'pending' (окно еще открыто), 'quiet' (идет перерыв или отложение) или None
+    """
+    pending_since = state.get('pending_since')
+    if pending_since and now - datetime.fromisoformat(pending_since) < timedelta(minutes=pending_timeout_minutes):
+        return 'pending'
+    
+    quiet_until = state.get('quiet_until')
+    if quiet_until and now < datetime.fromisoformat(quiet_until):
+        return 'quiet'
+    
+    return None
+
+
+def launch_background(args):
+    """
+    Запускает процесс, не связанный с текущим (переживает завершение трекера)
+    
+    Args:
+        args (list): Команда
+    """
+    import subprocess
+    
+    options = {'stdin': subprocess.DEVNULL, 'stdout': subprocess.DEVNULL, 'stderr': subprocess.DEVNULL}
+    if os.name == 'nt':
+        options['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        options['start_new_session'] = True
+    subprocess.Popen(args, close_fds=True, **options)
+
+
+def dispatch_break_notification(state_path, args, now, launcher=None):
+    """
+    Показывает окно о перерыве в отдельном процессе, не дожидаясь ответа
+    
+    Args:
+        state_path (str): Путь к break_state.json
+        args (list): Команда процесса окна (он вызывает apply_break_action после выбора)
+        now (datetime): Текущее время
+        launcher (callable): Запуск процесса launcher(args), по умолчанию launch_background
+        
+    Returns:
+        bool: True если процесс запущен
+    """
+    state = read_break_state(state_path)
+    state['pending_since'] = now.isoformat()
+    write_break_state(state_path, state)
+    
+    try:
+        (launcher or launch_background)(args)
+    except Exception:
+        # Окно не показано - следующий тик попробует снова
+        state.pop('pending_since', None)
+        write_break_state(state_path, state)
+        return False
+    return True
+
+
+def apply_break_action(state_path, action, now):
+    """
+    Сохраняет выбор пользователя: окно закрыто, для перерыва и отложения - время тишины
+    
+    Args:
+        state_path (str): Путь к break_state.json
+        action (str|None): "pause_5", "pause_15", "snooze", "cancelled" или None
+        now (datetime): Время выбора
+        
+    Returns:
+        dict: Новое состояние
+    """
+    state = read_break_state(state_path)
+    state.pop('pending_since', None)
+    state['last_action'] = action
+    
+    quiet_minutes = BREAK_ACTION_QUIET_MINUTES.get(action)
+    if quiet_minutes:
+        state['quiet_until'] = (now + timedelta(minutes=quiet_minutes)).isoformat()
+    
+    write_break_state(state_path, state)
+    return state
+
+
 def suggest_break_interactive():
     """
     Интерактивное предложение перерыва
@@ -0,0 +1,180 @@
+"""
+Модуль параметров списка проектов /api/projects
+
+Параметры позволяют ограничить размер ответа количеством проектов, а не длиной истории:
+    fields=id,title,status              - только перечисленные поля проекта
+    include_masks=all|none|today|range  - маски дней: все загруженные (по умолчанию, прежний
+                                          ответ эндпоинта), без масок, за сегодня или
+                                          за диапазон from..to (не больше MAX_MASK_RANGE_DAYS)
+    status=active,paused                - фильтр по статусам
+    path=exlibrus                       - проект и его потомки (префикс path по сегментам)
+    limit=50&offset=100                 - страница списка (после фильтров и сортировки),
+                                          количество проектов - в заголовке X-Total-Count
+
+Разбор параметров - чистая функция над словарем аргументов запроса, ошибки - ValueError
+с текстом для ответа 400 (как core.analytics.validate_range).
+"""
+from datetime import date as date_type, timedelta
+
+
+# Поля проекта в ответе API (см. web_server.format_project_for_api)
+PROJECT_FIELDS = (
+    'id', 'path', 'title', 'status', 'total_minutes', 'aggregated_minutes', 'today_minutes',
+    'total_time', 'aggregated_time', 'today_time', 'fill_color', 'description', 'daily_masks'
+)
+
+PROJECT_STATUSES = ('active', 'paused', 'completed', 'archived')
+
+# 'all' - прежнее поведение эндпоинта, существующие клиенты получают тот же ответ
+MASK_MODES = ('all', 'none', 'today', 'range')
+DEFAULT_MASK_MODE = 'all'
+
+# Максимальный диапазон масок в ответе (квартал): дольше - /api/timeline/range
+MAX_MASK_RANGE_DAYS = 92
+
+# Максимальный размер страницы
+MAX_LIMIT = 1000
+
+
+def _split_list(value):
+    """Разбирает список через запятую без пустых элементов"""
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _parse_int(args, name, minimum, maximum=None):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"Параметр '{name}' должен быть целым числом")
+    if number < minimum or (maximum is not None and number > maximum):
+        bounds = f"от {minimum} до {maximum}" if maximum is not None else f"не меньше {minimum}"
+        raise ValueError(f"Параметр '{name}' должен быть {bounds}")
+    return number
+
+
+def parse_project_query(args, today):
+    """
+    Разбирает и проверяет параметры /api/projects
+
+    Args:
+        args (Mapping): Параметры запроса (request.args или dict)
+        today (str): Сегодняшняя дата YYYY-MM-DD (маски режима today)
+
+    Returns:
+        dict: {'fields': tuple|None, 'include_masks', 'date_from', 'date_to',
+            'statuses': tuple|None, 'path': str|None, 'limit': int|None, 'offset': int}
+
+    Raises:
+        ValueError: Неизвестные поля, статус или режим масок, неверные даты или страница
+    """
+    fields = None
+    if args.get('fields'):
+        fields = tuple(_split_list(args['fields']))
+        unknown = [field for field in fields if field not in PROJECT_FIELDS]
+        if unknown:
+            raise ValueError(f"Неизвестные поля: {', '.join(unknown)}. Доступны: {', '.join(PROJECT_FIELDS)}")
+
+    include_masks = args.get('include_masks') or DEFAULT_MASK_MODE
+    if include_masks not in MASK_MODES:
+        raise ValueError(f"Неверный include_masks '{include_masks}'. Доступны: {', '.join(MASK_MODES)}")
+
+    date_from = date_to = None
+    if include_masks == 'today':
+        date_from = date_to = today
+    elif include_masks == 'range':
+        date_from, date_to = args.get('from'), args.get('to')
+        if not date_from or not date_to:
+            raise ValueError("Для include_masks=range требуются параметры 'from' и 'to' (YYYY-MM-DD)")
+        try:
+            start, end = date_type.fromisoformat(date_from), date_type.fromisoformat(date_to)
+        except ValueError:
+            raise ValueError("Даты 'from' и 'to' должны быть в формате YYYY-MM-DD")
+        if end < start:
+            raise ValueError("Дата 'to' раньше даты 'from'")
+        if end - start >= timedelta(days=MAX_MASK_RANGE_DAYS):
+            raise ValueError(f"Диапазон масок больше {MAX_MASK_RANGE_DAYS} дней")
+        date_from, date_to = start.isoformat(), end.isoformat()
+
+    # Маски не нужны, если поле daily_masks не запрошено
+    if fields is not None and 'daily_masks' not in fields:
+        include_masks, date_from, date_to = 'none', None, None
+
+    statuses = None
+    if args.get('status'):
+        statuses = tuple(_split_list(args['status']))
+        unknown = [status for status in statuses if status not in PROJECT_STATUSES]
+        if unknown:
+            raise ValueError(f"Неизвестные статусы: {', '.join(unknown)}. Доступны: {', '.join(PROJECT_STATUSES)}")
+
+    return {
+        'fields': fields,
+        'include_masks': include_masks,
+        'date_from': date_from,
+        'date_to': date_to,
+        'statuses': statuses,
+        'path': (args.get('path') or '').strip('/') or None,
+        'limit': _parse_int(args, 'limit', 1, MAX_LIMIT),
+        'offset': _parse_int(args, 'offset', 0) or 0
+    }
+
+
+def select_daily_masks(daily_masks, date_from, date_to):
+    """
+    Выбирает маски дней диапазона (включительно)
+
+    Examples:
+        >>> sorted(select_daily_masks({'2025-06-08': 'a', '2025-06-09': 'b'}, '2025-06-09', '2025-06-09'))
+        ['2025-06-09']
+    """
+    if date_from == date_to:
+        return {date_from: daily_masks[date_from]} if date_from in daily_masks else {}
+    return {date: mask for date, mask in daily_masks.items() if date_from <= date <= date_to}
+
+
+def matches_path(project_path, prefix):
+    """
+    Проект совпадает с префиксом или является его потомком (по сегментам path)
+
+    Examples:
+        >>> matches_path('exlibrus/frontend', 'exlibrus')
+        True
+        >>> matches_path('exlibrus-old', 'exlibrus')
+        False
+    """
+    return project_path == prefix or project_path.startswith(prefix + '/')
+
+
+def apply_project_query(projects, query):
+    """
+    Фильтрует, разбивает на страницы и сокращает до нужных полей отформатированные проекты
+
+    Args:
+        projects (list): Отсортированные проекты API (не изменяются)
+        query (dict): Результат parse_project_query
+
+    Returns:
+        dict: {'projects', 'total' - после фильтров, 'offset', 'limit', 'has_more'}
+    """
+    selected = projects
+    if query['statuses']:
+        selected = [project for project in selected if project.get('status') in query['statuses']]
+    if query['path']:
+        selected = [project for project in selected if matches_path(project.get('path', ''), query['path'])]
+
+    total = len(selected)
+    offset, limit = query['offset'], query['limit']
+    page = selected[offset:offset + limit] if limit is not None else selected[offset:]
+
+    if query['fields']:
+        page = [{field: project[field] for field in query['fields'] if field in project} for project in page]
+
+    return {
+        'projects': page,
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'has_more': offset + len(page) < total
+    }
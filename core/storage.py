@@ -0,0 +1,1055 @@
+"""
+Модуль хранилищ БД трекера
+Единый интерфейс над db.json (+ журнал тиков) и SQLite
+
+Выбор хранилища:
+    1. Переменная окружения TRACKER_DB - путь к файлу БД (.sqlite/.sqlite3/.db - SQLite, иначе JSON)
+    2. db.sqlite рядом со скриптами, если существует
+    3. db.json рядом со скриптами
+
+Оба хранилища реализуют одинаковые методы:
+    load() / save(data)              - полная загрузка и сохранение
+    load(history=False)              - загрузка без масок прошлых месяцев
+    load(masks=False)                - только метаданные: маски проекта - при первом обращении
+    load_history(data, months)       - догрузка масок прошлых месяцев
+    load_projects()                  - список проектов
+    find_project(identifier)         - поиск по id, path или title
+    get_active_project()             - активный проект
+    set_project_status(id, status)   - смена статуса
+    get_passive_masks(date)          - пассивные маски за дату
+    count_projects()                 - количество проектов
+    commit_tick(data, record)        - фиксация тика трекера
+    update(mutator)                  - чтение-изменение-запись под блокировкой писателей
+
+Маски прошлых месяцев хранятся отдельно от текущего (см. core.history) и при
+сохранении объединяются с сохраненными по OR, поэтому данные, загруженные
+без истории, можно сохранять без потери архива
+
+Конкурентный доступ (тик трекера, команды project_manager, POST запросы дашборда):
+    - писатели сериализуются: db.lock (JSON) или транзакция BEGIN IMMEDIATE (SQLite)
+    - читатели не блокируются: db.json заменяется атомарно, SQLite работает в режиме WAL
+    - счетчик версий meta.version растет при каждой записи; save() данных, загруженных
+      до чужой записи, завершается ConflictError вместо молчаливой потери изменений
+"""
+import json
+import os
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from functools import partial
+
+from .compatibility import (
+    ensure_project_fields, get_project_id_compat, get_project_path_compat, legacy_find_project_by_title
+)
+from .hierarchy import find_project_by_id, find_project_by_path, get_all_parent_paths
+from .history import (
+    get_history_dir, get_hot_month, list_history_months, read_shard, make_shard, get_month,
+    merge_shard_into_data, merge_shard_into_shard, split_history, get_shard_path, merge_masks
+)
+from .journal import (
+    append_record, compact_journal, load_journal, get_journal_path, get_journal_size, get_compact_threshold,
+    has_pending_journal
+)
+from .locking import DEFAULT_LOCK_TIMEOUT, FileLock, atomic_write_text, get_lock_path
+from .masks import (
+    SLOT_MINUTES, format_mask, parse_mask, mask_to_bytes, mask_from_bytes, compact_daily_masks
+)
+from .tracking import FLAG_COMPUTER_ACTIVITY, PASSIVE_MASK_FLAGS, ensure_passive_tracking, update_daily_analysis
+from .windows import (
+    format_window_slots, intern_window_title, merge_slot_bytes, parse_window_slots, slots_from_bytes,
+    slots_to_bytes
+)
+
+
+SQLITE_EXTENSIONS = ('.sqlite', '.sqlite3', '.db')
+
+# Поля проекта, хранящиеся в SQLite отдельными колонками (остальные - JSON в колонке extra)
+PROJECT_COLUMNS = ('id', 'path', 'title', 'status', 'total_minutes', 'aggregated_minutes')
+
+
+class ConflictError(Exception):
+    """БД изменена другим процессом после загрузки данных (версия на диске не совпадает)"""
+
+
+def get_data_version(data):
+    """
+    Возвращает версию данных БД (meta.version, 0 для БД без счетчика)
+
+    Args:
+        data (dict): Данные БД
+
+    Returns:
+        int: Версия
+    """
+    return data.get('meta', {}).get('version', 0)
+
+
+def bump_data_version(data):
+    """
+    Увеличивает версию данных перед записью
+
+    Legacy БД без секции meta не версионируется (секцию добавляет migrate)
+
+    Args:
+        data (dict): Данные БД (изменяются in-place)
+    """
+    if 'meta' in data:
+        data['meta']['version'] = get_data_version(data) + 1
+
+
+class LazyMasks(MutableMapping):
+    """
+    daily_masks проекта, загружаемые при первом обращении
+
+    Команды, которым нужны только названия, статусы и итоги (list, tree, смена статуса),
+    не разбирают маски. Любое обращение (чтение, запись, len, итерация) загружает
+    маски проекта целиком, включая историю.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._masks = None
+
+    @property
+    def is_loaded(self):
+        return self._masks is not None
+
+    def _get_masks(self):
+        if self._masks is None:
+            self._masks = dict(self._loader())
+            self._loader = None
+        return self._masks
+
+    def __getitem__(self, date):
+        return self._get_masks()[date]
+
+    def __setitem__(self, date, value):
+        self._get_masks()[date] = value
+
+    def __delitem__(self, date):
+        del self._get_masks()[date]
+
+    def __iter__(self):
+        return iter(self._get_masks())
+
+    def __len__(self):
+        return len(self._get_masks())
+
+    def __repr__(self):
+        return repr(self._masks) if self.is_loaded else '<LazyMasks: не загружены>'
+
+
+def materialize_masks(data):
+    """
+    Заменяет LazyMasks обычными словарями (перед сериализацией)
+
+    Args:
+        data (dict): Данные БД (изменяются in-place)
+    """
+    for project in data.get('projects', []):
+        if isinstance(project.get('daily_masks'), LazyMasks):
+            project['daily_masks'] = dict(project['daily_masks'])
+
+
+def _get_file_size(path):
+    """Размер файла в байтах (0 если файла нет)"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def find_storage_path(base_dir):
+    """
+    Определяет путь к файлу БД
+
+    Args:
+        base_dir (str): Директория трекера
+
+    Returns:
+        str: Путь к файлу БД
+    """
+    env_path = os.environ.get('TRACKER_DB')
+    if env_path:
+        return env_path
+
+    sqlite_path = os.path.join(base_dir, 'db.sqlite')
+    if os.path.exists(sqlite_path):
+        return sqlite_path
+
+    return os.path.join(base_dir, 'db.json')
+
+
+def open_storage(path):
+    """
+    Открывает хранилище по пути к файлу (тип определяется по расширению)
+
+    Args:
+        path (str): Путь к файлу БД
+
+    Returns:
+        JsonStorage|SqliteStorage: Хранилище
+    """
+    if path.lower().endswith(SQLITE_EXTENSIONS):
+        return SqliteStorage(path)
+    return JsonStorage(path)
+
+
+def get_storage(base_dir):
+    """Открывает хранилище, выбранное для директории трекера (см. find_storage_path)"""
+    return open_storage(find_storage_path(base_dir))
+
+
+def find_project_in_list(projects, identifier):
+    """
+    Ищет проект по ID, затем по path, затем по title (без учета регистра)
+
+    Args:
+        projects (list): Список проектов
+        identifier (str): ID, path или title
+
+    Returns:
+        dict|None: Найденный проект или None
+    """
+    return (find_project_by_id(identifier, projects)
+            or find_project_by_path(identifier, projects)
+            or legacy_find_project_by_title(projects, identifier))
+
+
+def migrate_storage(source, target):
+    """
+    Переносит все данные из одного хранилища в другое
+
+    Args:
+        source: Исходное хранилище
+        target: Целевое хранилище
+
+    Returns:
+        dict: Перенесенные данные
+    """
+    data = source.load()
+    target.save(data)
+    return data
+
+
+class JsonStorage:
+    """
+    Хранилище в db.json с журналом тиков db.journal
+
+    Маски прошлых месяцев вынесены в шарды history/YYYY-MM.json: db.json содержит
+    метаданные проектов и текущий месяц, поэтому стоимость загрузки для трекера
+    и веб-сервера не растет с накоплением истории
+    """
+
+    backend = 'json'
+
+    def __init__(self, path):
+        self.path = path
+        self._data = None
+        self._lock = FileLock(get_lock_path(path))
+        self.history_dir = get_history_dir(path)
+        # Шарды, прочитанные для LazyMasks (общие для всех проектов одной загрузки)
+        self._shard_cache = {}
+        # (сигнатура, версия) последнего прочитанного или записанного файла
+        self._known_version = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def lock(self):
+        """Блокировка писателей db.json (реентерабельная, см. core.locking.FileLock)"""
+        return self._lock
+
+    def get_signature(self):
+        """
+        Возвращает сигнатуру для обнаружения внешних изменений
+
+        Returns:
+            tuple: (mtime, size) db.json, (mtime, size) журнала (0, 0 если журнала нет)
+                и mtime директории истории (0 если ее нет) - шарды записываются
+                атомарной заменой, поэтому их перезапись меняет mtime директории
+        """
+        stat = os.stat(self.path)
+        try:
+            journal_stat = os.stat(get_journal_path(self.path))
+            journal_signature = (journal_stat.st_mtime_ns, journal_stat.st_size)
+        except OSError:
+            journal_signature = (0, 0)
+        try:
+            history_signature = (os.stat(self.history_dir).st_mtime_ns,)
+        except OSError:
+            history_signature = (0,)
+        return (stat.st_mtime_ns, stat.st_size) + journal_signature + history_signature
+
+    def get_disk_usage(self):
+        """
+        Размер файлов хранилища на диске
+
+        Returns:
+            dict: Байты по файлам {'db', 'journal', 'history'} (отсутствующие файлы - 0)
+        """
+        history = 0
+        for month in list_history_months(self.history_dir):
+            try:
+                history += os.path.getsize(get_shard_path(self.history_dir, month))
+            except OSError:
+                pass
+        return {
+            'db': _get_file_size(self.path),
+            'journal': get_journal_size(self.path),
+            'history': history
+        }
+
+    def close(self):
+        pass
+
+    def _read(self):
+        signature = self._stat_signature()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self._known_version = (signature, get_data_version(data))
+        return data
+
+    def _stat_signature(self):
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _get_disk_version(self):
+        """Версия db.json на диске (None если файла нет); файл читается только если изменился"""
+        try:
+            signature = self._stat_signature()
+        except OSError:
+            return None
+        if self._known_version and self._known_version[0] == signature:
+            return self._known_version[1]
+        return get_data_version(self._read())
+
+    def load(self, compact=True, history=True, masks=True):
+        """
+        Загружает данные вместе с журналом тиков
+
+        Чтение не берет блокировку (db.json заменяется атомарно); блокировка нужна
+        только если есть журнал для сворачивания
+
+        Args:
+            compact (bool): Свернуть журнал в db.json; False - применить журнал только в памяти
+                (трекер при холодном старте не должен перезаписывать весь файл)
+            history (bool): Загрузить маски прошлых месяцев из шардов;
+                False - только db.json (текущий месяц) и шарды месяцев записей журнала, см. load_history
+            masks (bool): False - маски проектов загружаются при первом обращении (LazyMasks,
+                всегда вместе с историей), шарды не читаются до обращения
+
+        Returns:
+            dict: Данные БД
+        """
+        data = self._read()
+
+        if compact and has_pending_journal(self.path):
+            with self._lock:
+                # Перечитываем под блокировкой: другой писатель мог успеть свернуть журнал
+                data = self._read()
+                compact_journal(data, self.path, self._save_to, self.load_history)
+        else:
+            load_journal(data, self.path, self.load_history)
+
+        if not masks:
+            self._shard_cache = {}
+            for project in data.get('projects', []):
+                project['daily_masks'] = LazyMasks(partial(
+                    self._load_project_masks, get_project_id_compat(project), project.get('daily_masks', {})
+                ))
+        elif history:
+            self.load_history(data)
+
+        self._data = data
+        return data
+
+    def _load_project_masks(self, project_id, hot_masks):
+        """Маски проекта: текущий месяц из db.json + все шарды истории (для LazyMasks)"""
+        masks = dict(hot_masks)
+        for month in self.get_history_months():
+            if month not in self._shard_cache:
+                self._shard_cache[month] = read_shard(self.history_dir, month) or make_shard(month)
+            merge_masks(masks, self._shard_cache[month]['projects'].get(project_id, {}))
+        return masks
+
+    def get_history_months(self):
+        """Возвращает отсортированный список месяцев, вынесенных в шарды"""
+        return list_history_months(self.history_dir)
+
+    def load_history(self, data, months=None):
+        """
+        Добавляет в данные маски прошлых месяцев из шардов
+
+        Args:
+            data (dict): Данные, загруженные с history=False (изменяются in-place)
+            months (list): Месяцы YYYY-MM (по умолчанию - все шарды); отсутствующие пропускаются
+
+        Returns:
+            list: Загруженные месяцы
+        """
+        loaded = []
+        for month in (self.get_history_months() if months is None else months):
+            shard = read_shard(self.history_dir, month)
+            if shard is not None:
+                merge_shard_into_data(data, shard)
+                loaded.append(month)
+        return loaded
+
+    def save(self, data):
+        """
+        Сохраняет данные целиком (маски - в компактном формате) атомарной заменой файла
+
+        Raises:
+            ConflictError: db.json изменен другим процессом после загрузки data
+        """
+        with self._lock:
+            disk_version = self._get_disk_version()
+            if disk_version is not None and disk_version != get_data_version(data):
+                raise ConflictError(
+                    f"БД изменена другим процессом: версия на диске {disk_version}, "
+                    f"в загруженных данных {get_data_version(data)}"
+                )
+            self._write(data)
+
+    def _write(self, data):
+        materialize_masks(data)
+        compact_daily_masks(data)
+        previous_meta_version = data.get('meta', {}).get('version')
+        bump_data_version(data)
+        try:
+            document, shards = split_history(data, get_hot_month())
+            # Сначала шарды: если запись прервется, маски останутся и в db.json,
+            # а повторное объединение по OR ничего не испортит
+            for month, shard in sorted(shards.items()):
+                self._write_shard(month, shard)
+            atomic_write_text(self.path, json.dumps(document, ensure_ascii=False, indent=2))
+        except BaseException:
+            if previous_meta_version is not None:
+                data['meta']['version'] = previous_meta_version
+            elif 'meta' in data:
+                data['meta'].pop('version', None)
+            raise
+        self._known_version = (self._stat_signature(), get_data_version(data))
+        self._data = data
+
+    def _write_shard(self, month, shard):
+        """Объединяет маски месяца с шардом на диске; файл пишется только если что-то изменилось"""
+        existing = read_shard(self.history_dir, month)
+        if existing is None:
+            os.makedirs(self.history_dir, exist_ok=True)
+        elif merge_shard_into_shard(existing, shard):
+            shard = existing
+        else:
+            return
+        atomic_write_text(get_shard_path(self.history_dir, month), json.dumps(shard, ensure_ascii=False))
+
+    def _save_to(self, data, db_path):
+        self.save(data)
+
+    def update(self, mutator, history=True):
+        """
+        Читает свежие данные, изменяет и сохраняет их под блокировкой писателей
+
+        Журнал сворачивается в те же данные, поэтому параллельные тики не теряются
+
+        Args:
+            mutator (callable): mutator(data) -> результат; None - данные не изменены, запись не нужна
+            history (bool): Загрузить маски прошлых месяцев (не нужны для смены статуса и т.п.)
+
+        Returns:
+            Результат mutator
+        """
+        with self._lock:
+            data = self._read()
+            compact_journal(data, self.path, self._save_to, self.load_history)
+            if history:
+                self.load_history(data)
+            result = mutator(data)
+            if result is not None:
+                self.save(data)
+            self._data = data
+            return result
+
+    def _get_data(self):
+        # В пределах одного экземпляра повторно используем уже загруженные данные
+        # Точечным операциям нужны только метаданные: маски - по обращению
+        if self._data is None:
+            self.load(compact=False, history=False, masks=False)
+        return self._data
+
+    def load_projects(self):
+        return self._get_data().get('projects', [])
+
+    def find_project(self, identifier):
+        return find_project_in_list(self.load_projects(), identifier)
+
+    def get_active_project(self):
+        for project in self.load_projects():
+            if project.get('status') == 'active':
+                return project
+        return None
+
+    def set_project_status(self, project_id, status):
+        """
+        Устанавливает статус проекта (активным может быть только один проект)
+
+        Args:
+            project_id (str): ID проекта
+            status (str): Новый статус
+
+        Returns:
+            dict|None: Обновленный проект или None если не найден
+        """
+        def apply_status(data):
+            target_project = None
+            for project in data.get('projects', []):
+                if get_project_id_compat(project) == project_id:
+                    target_project = project
+
+            if not target_project:
+                return None
+
+            if status == 'active':
+                for project in data.get('projects', []):
+                    if project is not target_project and project.get('status') == 'active':
+                        project['status'] = 'paused'
+
+            target_project['status'] = status
+            ensure_project_fields(target_project)
+            return target_project
+
+        return self.update(apply_status, history=False)
+
+    def get_passive_masks(self, date):
+        passive = self._get_data().get('meta', {}).get('passive_tracking', {})
+        masks = passive.get('daily_masks', {}).get(date)
+        if masks is None and get_month(date) < get_hot_month():
+            shard = read_shard(self.history_dir, get_month(date))
+            masks = shard['passive'].get(date) if shard else None
+        return masks
+
+    def count_projects(self):
+        return len(self.load_projects())
+
+    def commit_tick(self, data, record):
+        """
+        Фиксирует тик: запись в журнал (O(1)), при превышении порога - сворачивание в db.json
+
+        Запись идет под блокировкой писателей: сворачивание в другом процессе не может
+        переименовать журнал между открытием файла и записью строки
+
+        Args:
+            data (dict): Данные БД с уже примененным тиком
+            record (dict): Запись журнала
+        """
+        with self._lock:
+            append_record(get_journal_path(self.path), record)
+
+            if get_journal_size(self.path) >= get_compact_threshold(data):
+                if self._get_disk_version() != get_data_version(data):
+                    # Данные в памяти устарели (db.json записал другой процесс):
+                    # сворачиваем журнал в свежую копию, тики из журнала применятся к ней
+                    fresh = self._read()
+                    data.clear()
+                    data.update(fresh)
+                compact_journal(data, self.path, self._save_to, self.load_history)
+
+
+class SqliteStorage:
+    """
+    Хранилище в SQLite
+
+    Таблицы:
+        meta          - секции meta (JSON), passive_tracking без daily_masks/daily_windows
+        projects      - проекты (основные поля колонками, остальные - JSON)
+        project_masks - маски проектов по дням (project_id, date) -> 18 байт
+        passive_masks - пассивные маски по дням (date, mask_name) -> 18 байт
+        passive_windows - ID заголовков активных окон по слотам дня (date) -> 144/288 байт
+
+    Точечные операции (активный проект, смена статуса, тик) читают и пишут
+    только нужные строки, поэтому их стоимость не зависит от объема истории
+
+    Запись идет в транзакциях BEGIN IMMEDIATE (писатели сериализуются, чтение-изменение
+    внутри транзакции не теряет чужие обновления), режим WAL - читатели не ждут писателей.
+    Каждая запись увеличивает версию в meta (ключ version)
+    """
+
+    backend = 'sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS projects (
+            id TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            title TEXT NOT NULL,
+            status TEXT NOT NULL,
+            total_minutes INTEGER NOT NULL DEFAULT 0,
+            aggregated_minutes INTEGER NOT NULL DEFAULT 0,
+            position INTEGER NOT NULL DEFAULT 0,
+            extra TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE INDEX IF NOT EXISTS idx_projects_path ON projects(path);
+        CREATE INDEX IF NOT EXISTS idx_projects_status ON projects(status);
+        CREATE TABLE IF NOT EXISTS project_masks (
+            project_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            mask BLOB NOT NULL,
+            PRIMARY KEY (project_id, date)
+        );
+        CREATE TABLE IF NOT EXISTS passive_masks (
+            date TEXT NOT NULL,
+            mask_name TEXT NOT NULL,
+            mask BLOB NOT NULL,
+            PRIMARY KEY (date, mask_name)
+        );
+        CREATE TABLE IF NOT EXISTS passive_windows (
+            date TEXT PRIMARY KEY,
+            slots BLOB NOT NULL
+        );
+    """
+
+    # Ключи верхнего уровня, кроме meta/projects, хранятся в таблице meta с префиксом
+    ROOT_KEY_PREFIX = '@'
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def get_signature(self):
+        """
+        Возвращает сигнатуру для обнаружения внешних изменений
+
+        Returns:
+            tuple: (mtime, size) файла БД и (mtime, size) WAL файла (0, 0 если его нет) -
+                в режиме WAL записи попадают в основной файл только при checkpoint
+        """
+        stat = os.stat(self.path)
+        try:
+            wal_stat = os.stat(self.path + '-wal')
+            wal_signature = (wal_stat.st_mtime_ns, wal_stat.st_size)
+        except OSError:
+            wal_signature = (0, 0)
+        return (stat.st_mtime_ns, stat.st_size) + wal_signature
+
+    def get_disk_usage(self):
+        """
+        Размер файлов хранилища на диске
+
+        Returns:
+            dict: Байты по файлам {'db', 'wal'} (отсутствующие файлы - 0)
+        """
+        return {'db': _get_file_size(self.path), 'wal': _get_file_size(self.path + '-wal')}
+
+    def _connect(self):
+        if self._conn is None:
+            # sqlite3 импортируется только для SQLite-хранилища (CLI с db.json его не загружает)
+            import sqlite3
+
+            conn = sqlite3.connect(self.path, timeout=DEFAULT_LOCK_TIMEOUT)
+            # SQLite lower() не работает с кириллицей
+            conn.create_function('py_lower', 1, lambda value: value.lower() if value else value)
+            # Объединение масок по OR при сохранении (см. core.history)
+            conn.create_function('mask_or', 2, lambda a, b: mask_to_bytes(mask_from_bytes(a) | mask_from_bytes(b)))
+            # Объединение слотов заголовков окон: заполненные слоты не перезаписываются (см. core.windows)
+            conn.create_function('window_merge', 2, merge_slot_bytes)
+            # WAL: читатели не блокируются писателем; FULL - закоммиченный тик переживает сбой питания
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def _write_transaction(self):
+        """Транзакция записи: блокировка писателей берется сразу, до первого чтения"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def _bump_version(self):
+        self._connect().execute(
+            "INSERT INTO meta (key, value) VALUES ('version', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ---------- Преобразование строк ----------
+
+    def _row_to_project(self, row, include_masks=True, since_month=None, lazy_masks=False):
+        project_id, path, title, status, total_minutes, aggregated_minutes, extra = row
+        project = {
+            'id': project_id,
+            'path': path,
+            'title': title,
+            'status': status,
+            'total_minutes': total_minutes,
+            'aggregated_minutes': aggregated_minutes
+        }
+        project.update(json.loads(extra))
+        if lazy_masks:
+            project['daily_masks'] = LazyMasks(partial(self._load_project_masks, project_id))
+        elif include_masks:
+            project['daily_masks'] = self._load_project_masks(project_id, since_month)
+        return project
+
+    def _load_project_masks(self, project_id, since_month=None):
+        # Даты в формате YYYY-MM-DD сравниваются как строки: 'YYYY-MM' <= любой даты месяца
+        rows = self._connect().execute(
+            "SELECT date, mask FROM project_masks WHERE project_id = ? AND date >= ? ORDER BY date",
+            (project_id, since_month or '')
+        )
+        return {date: format_mask(mask_from_bytes(mask)) for date, mask in rows}
+
+    def _select_projects(self, where="", params=()):
+        return self._connect().execute(
+            "SELECT id, path, title, status, total_minutes, aggregated_minutes, extra "
+            f"FROM projects {where} ORDER BY position", params
+        ).fetchall()
+
+    def _get_meta_value(self, key, default=None):
+        row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta_value(self, key, value):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (key, json.dumps(value, ensure_ascii=False))
+        )
+
+    # ---------- Полная загрузка / сохранение ----------
+
+    def load(self, compact=True, history=True, masks=True):
+        """
+        Загружает данные целиком в формате db.json
+
+        Args:
+            compact (bool): Не используется (журнал тиков для SQLite не нужен)
+            history (bool): Загрузить маски прошлых месяцев; False - только текущий месяц
+            masks (bool): False - маски проектов загружаются при первом обращении (LazyMasks)
+
+        Returns:
+            dict: Данные БД
+        """
+        since_month = None if history and masks else get_hot_month()
+        conn = self._connect()
+        data = {'meta': {}}
+
+        for key, value in conn.execute("SELECT key, value FROM meta"):
+            if key.startswith(self.ROOT_KEY_PREFIX):
+                data[key[len(self.ROOT_KEY_PREFIX):]] = json.loads(value)
+            else:
+                data['meta'][key] = json.loads(value)
+
+        passive_masks = {}
+        rows = conn.execute(
+            "SELECT date, mask_name, mask FROM passive_masks WHERE date >= ? ORDER BY date", (since_month or '',)
+        )
+        for date, mask_name, mask in rows:
+            passive_masks.setdefault(date, {})[mask_name] = format_mask(mask_from_bytes(mask))
+        if 'passive_tracking' in data['meta']:
+            data['meta']['passive_tracking']['daily_masks'] = passive_masks
+            rows = conn.execute(
+                "SELECT date, slots FROM passive_windows WHERE date >= ? ORDER BY date", (since_month or '',)
+            )
+            daily_windows = {date: format_window_slots(slots_from_bytes(slots)) for date, slots in rows}
+            if daily_windows:
+                data['meta']['passive_tracking']['daily_windows'] = daily_windows
+
+        data['projects'] = [
+            self._row_to_project(row, since_month=since_month, lazy_masks=not masks) for row in self._select_projects()
+        ]
+        return data
+
+    def get_history_months(self):
+        """Возвращает отсортированный список прошлых месяцев, по которым есть маски"""
+        rows = self._connect().execute(
+            "SELECT DISTINCT substr(date, 1, 7) AS month FROM project_masks WHERE date < ? "
+            "UNION SELECT DISTINCT substr(date, 1, 7) FROM passive_masks WHERE date < ? ORDER BY month",
+            (get_hot_month(), get_hot_month())
+        )
+        return [row[0] for row in rows]
+
+    def load_history(self, data, months=None):
+        """
+        Добавляет в данные маски прошлых месяцев
+
+        Args:
+            data (dict): Данные, загруженные с history=False (изменяются in-place)
+            months (list): Месяцы YYYY-MM (по умолчанию - все прошлые месяцы)
+
+        Returns:
+            list: Месяцы, по которым нашлись маски
+        """
+        conn = self._connect()
+        hot_month = get_hot_month()
+        if months is None:
+            where, params = "WHERE date < ?", (hot_month,)
+        else:
+            months = list(months)
+            where = f"WHERE substr(date, 1, 7) IN ({', '.join('?' * len(months))})"
+            params = tuple(months)
+
+        shards = {}
+        for project_id, date, mask in conn.execute(f"SELECT project_id, date, mask FROM project_masks {where}", params):
+            shard = shards.setdefault(get_month(date), make_shard(get_month(date)))
+            shard['projects'].setdefault(project_id, {})[date] = format_mask(mask_from_bytes(mask))
+        for date, mask_name, mask in conn.execute(f"SELECT date, mask_name, mask FROM passive_masks {where}", params):
+            shard = shards.setdefault(get_month(date), make_shard(get_month(date)))
+            shard['passive'].setdefault(date, {})[mask_name] = format_mask(mask_from_bytes(mask))
+        for date, slots in conn.execute(f"SELECT date, slots FROM passive_windows {where}", params):
+            shard = shards.setdefault(get_month(date), make_shard(get_month(date)))
+            shard['windows'][date] = format_window_slots(slots_from_bytes(slots))
+
+        for month in sorted(shards):
+            merge_shard_into_data(data, shards[month])
+        return sorted(shards)
+
+    def save(self, data):
+        """
+        Сохраняет данные целиком (meta и проекты заменяются, маски объединяются по OR)
+
+        Raises:
+            ConflictError: БД изменена другим процессом после загрузки data
+        """
+        with self._write_transaction():
+            disk_version = self._get_meta_value('version')
+            if disk_version is not None and disk_version != get_data_version(data):
+                raise ConflictError(
+                    f"БД изменена другим процессом: версия на диске {disk_version}, "
+                    f"в загруженных данных {get_data_version(data)}"
+                )
+            self._write_all(data)
+
+    def update(self, mutator, history=True):
+        """
+        Читает, изменяет и сохраняет данные в одной транзакции записи
+
+        Args:
+            mutator (callable): mutator(data) -> результат; None - данные не изменены, запись не нужна
+            history (bool): Загрузить маски прошлых месяцев
+
+        Returns:
+            Результат mutator
+        """
+        with self._write_transaction():
+            data = self.load(history=history)
+            result = mutator(data)
+            if result is not None:
+                self._write_all(data)
+            return result
+
+    def _write_all(self, data):
+        conn = self._connect()
+        materialize_masks(data)
+        bump_data_version(data)
+        conn.execute("DELETE FROM meta")
+        conn.execute("DELETE FROM projects")
+
+        for key, value in data.items():
+            if key not in ('meta', 'projects'):
+                self._set_meta_value(self.ROOT_KEY_PREFIX + key, value)
+
+        for key, value in data.get('meta', {}).items():
+            if key == 'passive_tracking':
+                value = {k: v for k, v in value.items() if k not in ('daily_masks', 'daily_windows')}
+            self._set_meta_value(key, value)
+
+        passive = data.get('meta', {}).get('passive_tracking', {})
+        for date, masks in passive.get('daily_masks', {}).items():
+            conn.executemany(
+                "INSERT INTO passive_masks (date, mask_name, mask) VALUES (?, ?, ?) "
+                "ON CONFLICT(date, mask_name) DO UPDATE SET mask = mask_or(mask, excluded.mask)",
+                [(date, mask_name, mask_to_bytes(mask)) for mask_name, mask in masks.items()]
+            )
+        conn.executemany(
+            "INSERT INTO passive_windows (date, slots) VALUES (?, ?) "
+            "ON CONFLICT(date) DO UPDATE SET slots = window_merge(slots, excluded.slots)",
+            [(date, slots_to_bytes(parse_window_slots(slots))) for date, slots in passive.get('daily_windows', {}).items()]
+        )
+
+        for position, project in enumerate(data.get('projects', [])):
+            project_id = get_project_id_compat(project)
+            extra = {k: v for k, v in project.items() if k not in PROJECT_COLUMNS and k != 'daily_masks'}
+            conn.execute(
+                "INSERT INTO projects (id, path, title, status, total_minutes, aggregated_minutes, position, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (project_id, get_project_path_compat(project), project['title'],
+                 project.get('status', 'paused'), project.get('total_minutes', 0),
+                 project.get('aggregated_minutes', project.get('total_minutes', 0)),
+                 position, json.dumps(extra, ensure_ascii=False))
+            )
+            conn.executemany(
+                "INSERT INTO project_masks (project_id, date, mask) VALUES (?, ?, ?) "
+                "ON CONFLICT(project_id, date) DO UPDATE SET mask = mask_or(mask, excluded.mask)",
+                [(project_id, date, mask_to_bytes(mask)) for date, mask in project.get('daily_masks', {}).items()]
+            )
+
+        # Маски объединяются с сохраненными по OR (данные могут быть загружены без истории),
+        # удаляются только маски проектов, которых больше нет
+        conn.execute("DELETE FROM project_masks WHERE project_id NOT IN (SELECT id FROM projects)")
+
+    # ---------- Точечные операции ----------
+
+    def load_projects(self):
+        return [self._row_to_project(row) for row in self._select_projects()]
+
+    def find_project(self, identifier):
+        """Ищет проект по ID, затем по path, затем по title - без загрузки остальных проектов"""
+        for where, value in (("WHERE id = ?", identifier),
+                             ("WHERE path = ?", identifier),
+                             ("WHERE py_lower(title) = ?", identifier.lower())):
+            rows = self._select_projects(where, (value,))
+            if rows:
+                return self._row_to_project(rows[0], lazy_masks=True)
+        return None
+
+    def get_active_project(self):
+        rows = self._select_projects("WHERE status = 'active'")
+        return self._row_to_project(rows[0], lazy_masks=True) if rows else None
+
+    def set_project_status(self, project_id, status):
+        """
+        Устанавливает статус проекта (активным может быть только один проект)
+
+        Args:
+            project_id (str): ID проекта
+            status (str): Новый статус
+
+        Returns:
+            dict|None: Обновленный проект или None если не найден
+        """
+        with self._write_transaction() as conn:
+            if not conn.execute("SELECT 1 FROM projects WHERE id = ?", (project_id,)).fetchone():
+                return None
+            if status == 'active':
+                conn.execute("UPDATE projects SET status = 'paused' WHERE status = 'active' AND id != ?", (project_id,))
+            conn.execute("UPDATE projects SET status = ? WHERE id = ?", (status, project_id))
+            self._bump_version()
+
+        return self._row_to_project(self._select_projects("WHERE id = ?", (project_id,))[0], lazy_masks=True)
+
+    def get_passive_masks(self, date):
+        rows = self._connect().execute(
+            "SELECT mask_name, mask FROM passive_masks WHERE date = ?", (date,)
+        ).fetchall()
+        if not rows:
+            return None
+        return {mask_name: format_mask(mask_from_bytes(mask)) for mask_name, mask in rows}
+
+    def count_projects(self):
+        return self._connect().execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+
+    def commit_tick(self, data, record):
+        """Фиксирует тик прямо в таблицах (журнал не нужен: запись затрагивает несколько строк)"""
+        self.apply_records([record])
+
+    def apply_records(self, records):
+        """
+        Применяет записи тиков (см. core.journal.make_record) к таблицам
+
+        Args:
+            records (list): Записи тиков
+
+        Returns:
+            int: Количество записей, изменивших время проекта
+        """
+        changed = 0
+
+        with self._write_transaction():
+            passive_tracking = self._get_meta_value('passive_tracking')
+            if passive_tracking is None:
+                passive_tracking = ensure_passive_tracking({'meta': {}})
+                passive_tracking.pop('daily_masks')
+
+            for record in records:
+                date, slot, project_id, flags = record['d'], record['s'], record.get('p'), record.get('f', 0)
+
+                if project_id and self._set_project_bit(project_id, date, slot):
+                    changed += 1
+
+                if passive_tracking.get('enabled', True):
+                    self._set_passive_bits(passive_tracking, date, slot, flags)
+                    if record.get('w') and flags & FLAG_COMPUTER_ACTIVITY:
+                        self._set_window_slot(passive_tracking, date, slot, record['w'])
+
+            self._set_meta_value('passive_tracking', passive_tracking)
+            self._bump_version()
+
+        return changed
+
+    def _set_project_bit(self, project_id, date, slot):
+        conn = self._connect()
+        project_row = conn.execute("SELECT path FROM projects WHERE id = ?", (project_id,)).fetchone()
+        if not project_row:
+            return False
+
+        mask_row = conn.execute(
+            "SELECT mask FROM project_masks WHERE project_id = ? AND date = ?", (project_id, date)
+        ).fetchone()
+        bits = mask_from_bytes(mask_row[0] if mask_row else None)
+        if bits >> slot & 1:
+            return False
+
+        conn.execute(
+            "INSERT OR REPLACE INTO project_masks (project_id, date, mask) VALUES (?, ?, ?)",
+            (project_id, date, mask_to_bytes(bits | 1 << slot))
+        )
+        conn.execute(
+            "UPDATE projects SET total_minutes = total_minutes + ? WHERE id = ?", (SLOT_MINUTES, project_id)
+        )
+
+        # Дельта поднимается по цепочке предков без пересчета поддеревьев
+        paths = [project_row[0]] + get_all_parent_paths(project_row[0])
+        conn.execute(
+            f"UPDATE projects SET aggregated_minutes = aggregated_minutes + ? "
+            f"WHERE path IN ({', '.join('?' * len(paths))})",
+            [SLOT_MINUTES] + paths
+        )
+        return True
+
+    def _set_passive_bits(self, passive_tracking, date, slot, flags):
+        conn = self._connect()
+        masks = {mask_name: 0 for mask_name in PASSIVE_MASK_FLAGS}
+        for mask_name, mask in conn.execute("SELECT mask_name, mask FROM passive_masks WHERE date = ?", (date,)):
+            masks[mask_name] = mask_from_bytes(mask)
+
+        for mask_name, flag in PASSIVE_MASK_FLAGS.items():
+            if flags & flag:
+                masks[mask_name] |= 1 << slot
+
+        conn.executemany(
+            "INSERT OR REPLACE INTO passive_masks (date, mask_name, mask) VALUES (?, ?, ?)",
+            [(date, mask_name, mask_to_bytes(bits)) for mask_name, bits in masks.items()]
+        )
+
+        # Аналитика считается по маскам дня так же, как для db.json
+        update_daily_analysis({'daily_masks': {date: masks}, 'analysis': passive_tracking.setdefault('analysis', {})}, date)
+
+    def _set_window_slot(self, passive_tracking, date, slot, window):
+        conn = self._connect()
+        row = conn.execute("SELECT slots FROM passive_windows WHERE date = ?", (date,)).fetchone()
+        slots = slots_from_bytes(row[0] if row else None)
+        if slots[slot] or not window.strip():
+            return False
+
+        # Таблица заголовков хранится в meta.passive_tracking и сохраняется вместе с ней
+        slots[slot] = intern_window_title(passive_tracking, window)
+        conn.execute(
+            "INSERT OR REPLACE INTO passive_windows (date, slots) VALUES (?, ?)", (date, slots_to_bytes(slots))
+        )
+        return True
@@ -0,0 +1,238 @@
+"""
+Модуль замеров времени тика по этапам
+
+Тик трекера делится на этапы:
+    load       - загрузка БД (в демоне - проверка и перечитывание изменившейся БД)
+    activity   - монитор активности пользователя
+    mask       - установка бита проекта и total_minutes
+    hierarchy  - aggregated_minutes предков
+    passive    - пассивные маски и заголовок окна
+    save       - фиксация тика в хранилище (журнал или SQLite)
+    log        - запись буфера tracker.log
+    break      - проверка и запуск напоминания о перерыве
+
+Время этапов в миллисекундах пишется строкой JSON в tracker.perf рядом с tracker.log:
+    {"t":"2025-06-09 10:05:00","total":4.12,"load":1.8,"activity":0.31,...}
+Этапы, до которых тик не дошел (пользователь неактивен, нет активного проекта),
+в строке отсутствуют. Файл хранит последние max_records тиков: после превышения
+размера он переписывается с конца. `tracker perf` сводит p50/p95 по этапам.
+
+Настройки в meta.tick_metrics БД:
+    {"enabled": true, "max_records": 2000}
+"""
+import json
+import math
+import os
+import time
+from collections import deque
+
+
+STAGES = ('load', 'activity', 'mask', 'hierarchy', 'passive', 'save', 'log', 'break')
+
+METRICS_FILE = 'tracker.perf'
+
+# Сколько последних тиков хранить (~1 неделя тиков по 5 минут в рабочее время)
+DEFAULT_MAX_RECORDS = 2000
+
+# Примерный размер строки тика: файл переписывается, когда он больше max_records таких строк
+RECORD_BYTES_ESTIMATE = 160
+
+
+class _Stage:
+    """Контекстный менеджер одного этапа StageTimer"""
+
+    __slots__ = ('timer', 'name', 'started')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = (time.perf_counter() - self.started) * 1000
+        stages = self.timer.stages
+        stages[self.name] = stages.get(self.name, 0.0) + elapsed
+
+
+class StageTimer:
+    """
+    Таймер этапов тика (повторный вход в этап суммирует время)
+
+    Использование:
+        timer = StageTimer()
+        with timer.stage('load'):
+            data = storage.load()
+        record = timer.to_record(now)
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.started = time.perf_counter()
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def total_ms(self):
+        """Время с создания таймера в миллисекундах"""
+        return (time.perf_counter() - self.started) * 1000
+
+    def to_record(self, now):
+        """
+        Формирует запись tracker.perf
+
+        Args:
+            now (datetime): Время тика
+
+        Returns:
+            dict: {"t": время тика, "total": мс, <этап>: мс}
+        """
+        record = {'t': now.strftime('%Y-%m-%d %H:%M:%S'), 'total': round(self.total_ms(), 3)}
+        for name, elapsed in self.stages.items():
+            record[name] = round(elapsed, 3)
+        return record
+
+
+class _NullStage:
+    """Этап без замера (тик без таймера)"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class NullTimer:
+    """Таймер-заглушка: этапы не замеряются"""
+
+    _stage = _NullStage()
+    stages = {}
+
+    def stage(self, name):
+        return self._stage
+
+
+NULL_TIMER = NullTimer()
+
+
+def get_metrics_config(data):
+    """
+    Получает настройки замеров из meta.tick_metrics
+
+    Returns:
+        dict: {'enabled': bool, 'max_records': int}
+    """
+    config = (data or {}).get('meta', {}).get('tick_metrics', {})
+    return {
+        'enabled': config.get('enabled', True),
+        'max_records': config.get('max_records', DEFAULT_MAX_RECORDS)
+    }
+
+
+def get_metrics_path(log_path):
+    """Возвращает путь к tracker.perf рядом с tracker.log"""
+    return os.path.join(os.path.dirname(os.path.abspath(log_path)), METRICS_FILE)
+
+
+def read_metrics(path, limit=None):
+    """
+    Читает последние записи tracker.perf (поврежденные строки пропускаются)
+
+    Args:
+        path (str): Путь к tracker.perf
+        limit (int): Сколько последних записей вернуть (None - все)
+
+    Returns:
+        list: Записи от старых к новым
+    """
+    records = deque(maxlen=limit)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict):
+                    records.append(record)
+    except OSError:
+        return []
+    return list(records)
+
+
+def append_metrics(path, record, max_records=DEFAULT_MAX_RECORDS):
+    """
+    Дописывает запись тика в tracker.perf и обрезает файл до max_records последних записей
+
+    Args:
+        path (str): Путь к tracker.perf
+        record (dict): Запись StageTimer.to_record
+        max_records (int): Сколько записей хранить
+    """
+    line = json.dumps(record, separators=(',', ':')) + '\n'
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line)
+        size = f.tell()
+
+    # Обрезка раз в ~max_records тиков: файл дорастает до двойного размера и переписывается
+    if size > max_records * RECORD_BYTES_ESTIMATE * 2:
+        from .locking import atomic_write_text
+        records = read_metrics(path, max_records)
+        atomic_write_text(path, ''.join(json.dumps(r, separators=(',', ':')) + '\n' for r in records))
+
+
+def percentile(values, fraction):
+    """
+    Перцентиль по ближайшему рангу
+
+    Examples:
+        >>> percentile([1, 2, 3, 4], 0.5)
+        2
+        >>> percentile([1, 2, 3, 4], 0.95)
+        4
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(len(ordered) * fraction))
+    return ordered[rank - 1]
+
+
+def summarize_metrics(records):
+    """
+    Сводка времени по этапам
+
+    Args:
+        records (list): Записи tracker.perf
+
+    Returns:
+        dict: {'ticks', 'from', 'to', 'stages': [{'stage', 'count', 'p50', 'p95', 'max'}]}
+            этапы в порядке STAGES, последним - total
+    """
+    stages = []
+    known = set(STAGES) | {'total', 't'}
+    extra = sorted({key for record in records for key in record} - known)
+    for name in list(STAGES) + extra + ['total']:
+        values = [record[name] for record in records if isinstance(record.get(name), (int, float))]
+        if not values:
+            continue
+        stages.append({
+            'stage': name,
+            'count': len(values),
+            'p50': percentile(values, 0.5),
+            'p95': percentile(values, 0.95),
+            'max': max(values)
+        })
+
+    return {
+        'ticks': len(records),
+        'from': records[0].get('t') if records else None,
+        'to': records[-1].get('t') if records else None,
+        'stages': stages
+    }
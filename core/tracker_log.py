@@ -0,0 +1,336 @@
+"""
+Модуль лога трекера (tracker.log)
+Буферизованная запись с ротацией и чтение лога вместе с архивными сегментами
+
+Формат строк не меняется - одна запись на строку, поля через " | ":
+    2025-06-09 10:05:00 | ACTIVITY | Active: True | Idle: 12.0s | Level: active
+    2025-06-09 10:05:00 | ExLibrus | BIT_SET | Position: 25 | ...
+
+Записи одного тика копятся в TickLog и пишутся одной операцией при выходе
+из внешнего блока with. Перед записью лог ротируется по размеру (и по смене
+дня, если включено): текущий файл переименовывается в tracker.log.YYYYMMDD-HHMMSS
+и при необходимости сжимается в .gz, старые сегменты сверх backup_count удаляются.
+
+Настройки в meta.logging БД:
+    {"max_bytes": 5242880, "backup_count": 20, "compress": true, "rotate_daily": false}
+"""
+import os
+import re
+from collections import deque
+from datetime import datetime
+
+
+# Размер tracker.log, после которого он ротируется (~5 МБ - несколько месяцев тиков)
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+
+# Сколько архивных сегментов хранить (None - все)
+DEFAULT_BACKUP_COUNT = 20
+
+# Размер блока при чтении файла с конца (tail)
+TAIL_BLOCK_SIZE = 8192
+
+# Суффикс сегмента: .YYYYMMDD-HHMMSS[.N][.gz]
+SEGMENT_SUFFIX_RE = re.compile(r'^\.(\d{8}-\d{6})(?:\.(\d+))?(\.gz)?$')
+
+
+def get_log_config(data):
+    """
+    Получает настройки ротации лога из meta.logging
+
+    Args:
+        data (dict|None): Данные БД
+
+    Returns:
+        dict: Аргументы для TickLog (max_bytes, backup_count, compress, rotate_daily)
+    """
+    config = (data or {}).get('meta', {}).get('logging', {})
+    return {
+        'max_bytes': config.get('max_bytes', DEFAULT_MAX_BYTES),
+        'backup_count': config.get('backup_count', DEFAULT_BACKUP_COUNT),
+        'compress': config.get('compress', True),
+        'rotate_daily': config.get('rotate_daily', False)
+    }
+
+
+def format_log_line(now, *fields):
+    """
+    Форматирует строку лога
+
+    Examples:
+        >>> format_log_line(datetime(2025, 6, 9, 10, 5), 'ERROR', 'boom')
+        '2025-06-09 10:05:00 | ERROR | boom\\n'
+    """
+    return ' | '.join([now.strftime('%Y-%m-%d %H:%M:%S')] + [str(field) for field in fields]) + '\n'
+
+
+def _find_segments(log_path):
+    """Возвращает отсортированный список ((время, номер), путь) архивных сегментов"""
+    directory = os.path.dirname(os.path.abspath(log_path))
+    prefix = os.path.basename(log_path)
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+
+    segments = []
+    for name in names:
+        if not name.startswith(prefix):
+            continue
+        match = SEGMENT_SUFFIX_RE.match(name[len(prefix):])
+        if match:
+            segments.append(((match.group(1), int(match.group(2) or 0)), os.path.join(directory, name)))
+    return sorted(segments)
+
+
+def list_log_segments(log_path):
+    """
+    Возвращает архивные сегменты лога от старых к новым (без текущего файла)
+
+    Args:
+        log_path (str): Путь к tracker.log
+    """
+    return [path for _, path in _find_segments(log_path)]
+
+
+def open_log_segment(path):
+    """Открывает сегмент лога на чтение как текст (.gz распаковывается на лету)"""
+    if path.endswith('.gz'):
+        import gzip
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def iter_log_lines(log_path, include_rotated=True):
+    """
+    Построчно читает лог в хронологическом порядке, не загружая его в память целиком
+
+    Args:
+        log_path (str): Путь к tracker.log
+        include_rotated (bool): Читать и архивные сегменты (в т.ч. .gz)
+
+    Yields:
+        str: Строки лога без перевода строки
+    """
+    paths = list_log_segments(log_path) if include_rotated else []
+    if os.path.exists(log_path):
+        paths.append(log_path)
+
+    for path in paths:
+        try:
+            f = open_log_segment(path)
+        except OSError:
+            continue
+        with f:
+            for line in f:
+                yield line.rstrip('\n')
+
+
+def _read_tail(path, count):
+    """Читает последние count строк файла блоками с конца"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        while position > 0 and data.count(b'\n') <= count:
+            step = min(TAIL_BLOCK_SIZE, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    lines = data.decode('utf-8', errors='replace').splitlines()
+    return lines[-count:] if count else []
+
+
+def tail_lines(log_path, count=20):
+    """
+    Возвращает последние строки лога
+
+    Текущий файл читается с конца; если в нем меньше count строк, недостающие
+    берутся из архивных сегментов
+
+    Args:
+        log_path (str): Путь к tracker.log
+        count (int): Количество строк
+
+    Returns:
+        list: Строки от старых к новым
+    """
+    lines = _read_tail(log_path, count) if os.path.exists(log_path) else []
+
+    for segment in reversed(list_log_segments(log_path)):
+        if len(lines) >= count:
+            break
+        try:
+            f = open_log_segment(segment)
+        except OSError:
+            continue
+        with f:
+            previous = deque((line.rstrip('\n') for line in f), maxlen=count - len(lines))
+        lines = list(previous) + lines
+
+    return lines
+
+
+def grep_lines(log_path, pattern, ignore_case=False, include_rotated=True):
+    """
+    Ищет строки лога по регулярному выражению
+
+    Args:
+        log_path (str): Путь к tracker.log
+        pattern (str): Регулярное выражение
+        ignore_case (bool): Без учета регистра
+        include_rotated (bool): Искать и в архивных сегментах
+
+    Yields:
+        str: Совпавшие строки в хронологическом порядке
+
+    Raises:
+        re.error: Некорректное выражение
+    """
+    regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+    for line in iter_log_lines(log_path, include_rotated):
+        if regex.search(line):
+            yield line
+
+
+def _compress_segment(path):
+    """Сжимает сегмент в path.gz и удаляет исходный файл"""
+    import gzip
+    import shutil
+
+    temp_path = path + '.gz.tmp'
+    with open(path, 'rb') as source, gzip.open(temp_path, 'wb') as target:
+        shutil.copyfileobj(source, target)
+    os.replace(temp_path, path + '.gz')
+    os.remove(path)
+
+
+class TickLog:
+    """
+    Буферизованный sink tracker.log
+
+    Записи копятся в памяти и пишутся одним open/write при выходе из внешнего
+    блока with (или явном flush). Вложенные блоки with не сбрасывают буфер,
+    поэтому функции тика могут принимать как путь к логу, так и открытый TickLog
+    (см. open_tick_log).
+
+    Использование:
+        with open_tick_log(log_path, data) as log:
+            log.event(now, 'ACTIVITY', 'Active: True')
+            ...
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT,
+                 compress=True, rotate_daily=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.rotate_daily = rotate_daily
+        self._lines = []
+        self._depth = 0
+
+    def write(self, line):
+        """Добавляет готовую строку в буфер"""
+        self._lines.append(line if line.endswith('\n') else line + '\n')
+
+    def event(self, now, *fields):
+        """Добавляет запись 'время | поле | поле ...' в буфер"""
+        self._lines.append(format_log_line(now, *fields))
+
+    def should_rotate(self, pending_bytes, now=None):
+        """
+        Проверяет нужна ли ротация перед записью pending_bytes байт
+
+        Args:
+            pending_bytes (int): Размер записываемых данных
+            now (datetime): Текущее время (для ротации по дням)
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        if stat.st_size == 0:
+            return False
+        if self.max_bytes and stat.st_size + pending_bytes > self.max_bytes:
+            return True
+        if self.rotate_daily:
+            now = now or datetime.now()
+            return datetime.fromtimestamp(stat.st_mtime).date() != now.date()
+        return False
+
+    def rotate(self):
+        """
+        Переносит текущий лог в архивный сегмент и удаляет лишние старые сегменты
+
+        Returns:
+            str|None: Путь к новому сегменту
+        """
+        try:
+            modified = datetime.fromtimestamp(os.path.getmtime(self.path))
+        except OSError:
+            return None
+
+        # Несколько ротаций за секунду различаются номером, который только растет:
+        # порядок сегментов сохраняется и после удаления старых
+        stamp = modified.strftime('%Y%m%d-%H%M%S')
+        indexes = [index for (segment_stamp, index), _ in _find_segments(self.path) if segment_stamp == stamp]
+        segment = f'{self.path}.{stamp}'
+        if indexes:
+            segment += f'.{max(indexes) + 1}'
+
+        os.replace(self.path, segment)
+        if self.compress:
+            try:
+                _compress_segment(segment)
+                segment += '.gz'
+            except OSError:
+                # Несжатый сегмент тоже читается - сожмем не в этот раз
+                pass
+
+        if self.backup_count is not None:
+            segments = list_log_segments(self.path)
+            for old_segment in segments[:max(0, len(segments) - self.backup_count)]:
+                try:
+                    os.remove(old_segment)
+                except OSError:
+                    pass
+        return segment
+
+    def flush(self, now=None):
+        """Записывает накопленные записи одной операцией (с ротацией при необходимости)"""
+        if not self._lines:
+            return
+        text = ''.join(self._lines)
+        self._lines = []
+
+        try:
+            if self.should_rotate(len(text.encode('utf-8')), now):
+                self.rotate()
+        except OSError:
+            # Ротация не должна стоить записей лога
+            pass
+
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(text)
+
+    def __enter__(self):
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._depth -= 1
+        if self._depth == 0:
+            self.flush()
+
+
+def open_tick_log(log, data=None):
+    """
+    Возвращает TickLog для пути к логу или уже открытый TickLog без изменений
+
+    Args:
+        log (str|TickLog): Путь к tracker.log или TickLog
+        data (dict): Данные БД для настроек meta.logging (опционально)
+    """
+    if isinstance(log, TickLog):
+        return log
+    return TickLog(log, **get_log_config(data))
@@ -0,0 +1,304 @@
+"""
+Модуль записи тиков трекера в данные БД
+Единая логика установки битов для трекера и для воспроизведения журнала
+"""
+from .compatibility import get_project_id_compat
+from .hierarchy import update_aggregated_minutes
+from .masks import SLOTS_PER_DAY, SLOT_MINUTES, format_mask, set_bit, is_bit_set, count_minutes
+from .windows import set_window_slot
+
+
+# Флаги пассивного отслеживания (битовая маска в записи журнала)
+FLAG_COMPUTER_ACTIVITY = 1
+FLAG_PROJECT_ACTIVITY = 2
+FLAG_IDLE_PERIODS = 4
+FLAG_UNTRACKED_WORK = 8
+
+PASSIVE_MASK_FLAGS = {
+    'computer_activity': FLAG_COMPUTER_ACTIVITY,
+    'project_activity': FLAG_PROJECT_ACTIVITY,
+    'idle_periods': FLAG_IDLE_PERIODS,
+    'untracked_work': FLAG_UNTRACKED_WORK
+}
+
+
+def get_passive_flags(is_user_active, has_active_project, should_track):
+    """
+    Вычисляет флаги пассивного отслеживания для слота
+
+    Args:
+        is_user_active (bool): Пользователь активен
+        has_active_project (bool): Есть ли активный проект
+        should_track (bool): Записывается ли время проекта
+
+    Returns:
+        int: Комбинация флагов FLAG_*
+    """
+    flags = 0
+
+    # 1. computer_activity - любая активность пользователя
+    if is_user_active:
+        flags |= FLAG_COMPUTER_ACTIVITY
+
+    # 2. project_activity - активность + есть активный проект + записываем время
+    if is_user_active and has_active_project and should_track:
+        flags |= FLAG_PROJECT_ACTIVITY
+
+    # 3. idle_periods - когда пользователь неактивен
+    if not is_user_active:
+        flags |= FLAG_IDLE_PERIODS
+
+    # 4. untracked_work - активен но нет проекта ИЛИ проект есть но время не записывается
+    if is_user_active and (not has_active_project or not should_track):
+        flags |= FLAG_UNTRACKED_WORK
+
+    return flags
+
+
+def is_project_bit_set(project, date, slot):
+    """
+    Проверяет установлен ли бит проекта
+
+    Args:
+        project (dict): Проект
+        date (str): Дата в формате YYYY-MM-DD
+        slot (int): Позиция бита (0-143)
+
+    Returns:
+        bool: True если бит уже установлен
+    """
+    return is_bit_set(project.get('daily_masks', {}).get(date), slot)
+
+
+def set_project_bit(project, date, slot):
+    """
+    Устанавливает бит проекта за дату
+
+    Args:
+        project (dict): Проект (изменяется in-place)
+        date (str): Дата в формате YYYY-MM-DD
+        slot (int): Позиция бита (0-143)
+
+    Returns:
+        bool: True если бит был изменен 0 -> 1
+    """
+    if 'daily_masks' not in project:
+        project['daily_masks'] = {}
+
+    new_mask, changed = set_bit(project['daily_masks'].get(date), slot)
+    if changed:
+        project['daily_masks'][date] = new_mask
+    return changed
+
+
+def increment_total_minutes(project, minutes=SLOT_MINUTES):
+    """
+    Увеличивает total_minutes проекта после установки нового бита
+
+    Стоимость не зависит от количества дней в истории проекта;
+    расхождения с масками исправляет команда verify-totals
+
+    Args:
+        project (dict): Проект (изменяется in-place)
+        minutes (int): Прирост в минутах (по умолчанию один слот)
+
+    Returns:
+        int: Новое значение total_minutes
+    """
+    if 'total_minutes' not in project:
+        # TODO: LEGACY_SUPPORT - счетчика еще нет, считаем по маскам один раз
+        return recalculate_total_minutes(project)
+
+    project['total_minutes'] += minutes
+    return project['total_minutes']
+
+
+def recalculate_total_minutes(project):
+    """
+    Пересчитывает total_minutes проекта по всем маскам (полный проход, см. verify-totals)
+
+    Args:
+        project (dict): Проект (изменяется in-place)
+
+    Returns:
+        int: Новое значение total_minutes
+    """
+    total_minutes = 0
+    for mask in project.get('daily_masks', {}).values():
+        total_minutes += count_minutes(mask)
+    project['total_minutes'] = total_minutes
+    return total_minutes
+
+
+def ensure_passive_tracking(data):
+    """
+    Инициализирует секцию passive_tracking если она отсутствует
+
+    Args:
+        data (dict): Данные БД (изменяются in-place)
+
+    Returns:
+        dict: Секция meta.passive_tracking
+    """
+    meta = data.setdefault('meta', {})
+    if 'passive_tracking' not in meta:
+        meta['passive_tracking'] = {
+            'enabled': True,
+            'track_idle_periods': True,
+            'track_non_project_activity': True,
+            'description': 'Track periods when user is active but no project is selected',
+            'daily_masks': {},
+            'analysis': {
+                'total_computer_time_minutes': 0,
+                'total_project_time_minutes': 0,
+                'total_idle_time_minutes': 0,
+                'total_untracked_work_minutes': 0,
+                'productivity_ratio': 0.0,
+                'description': 'Calculated daily from bit masks'
+            }
+        }
+    return meta['passive_tracking']
+
+
+def set_passive_bits(data, date, slot, flags):
+    """
+    Устанавливает биты пассивных масок по флагам и обновляет дневную аналитику
+
+    Args:
+        data (dict): Данные БД (изменяются in-place)
+        date (str): Дата в формате YYYY-MM-DD
+        slot (int): Позиция бита (0-143)
+        flags (int): Комбинация флагов FLAG_*
+
+    Returns:
+        bool: True если пассивное отслеживание включено и биты обработаны
+    """
+    passive_tracking = ensure_passive_tracking(data)
+
+    # Проверяем что функция включена
+    if not passive_tracking.get('enabled', True):
+        return False
+
+    # Инициализируем маски для дня
+    if date not in passive_tracking['daily_masks']:
+        passive_tracking['daily_masks'][date] = {
+            mask_name: format_mask(0) for mask_name in PASSIVE_MASK_FLAGS
+        }
+
+    masks = passive_tracking['daily_masks'][date]
+
+    for mask_name, flag in PASSIVE_MASK_FLAGS.items():
+        if flags & flag and slot < SLOTS_PER_DAY:
+            masks[mask_name], _ = set_bit(masks.get(mask_name), slot)
+
+    update_daily_analysis(passive_tracking, date)
+    return True
+
+
+def set_passive_window(data, date, slot, flags, window):
+    """
+    Записывает заголовок активного окна в слот дня (только для слотов активности компьютера)
+
+    Args:
+        data (dict): Данные БД (изменяются in-place)
+        date (str): Дата в формате YYYY-MM-DD
+        slot (int): Позиция слота (0-143)
+        flags (int): Комбинация флагов FLAG_*
+        window (str|None): Заголовок активного окна
+
+    Returns:
+        bool: True если слот был заполнен
+    """
+    if not window or not flags & FLAG_COMPUTER_ACTIVITY:
+        return False
+
+    passive_tracking = ensure_passive_tracking(data)
+    if not passive_tracking.get('enabled', True):
+        return False
+
+    return set_window_slot(passive_tracking, date, slot, window)
+
+
+def update_daily_analysis(passive_tracking, date):
+    """
+    Обновляет ежедневную аналитику пассивного отслеживания
+
+    Args:
+        passive_tracking (dict): Секция passive_tracking из meta
+        date (str): Дата для анализа
+    """
+    if date not in passive_tracking['daily_masks']:
+        return
+
+    masks = passive_tracking['daily_masks'][date]
+
+    # Считаем минуты по маскам (каждый бит = 5 минут)
+    computer_minutes = count_minutes(masks.get('computer_activity'))
+    project_minutes = count_minutes(masks.get('project_activity'))
+    idle_minutes = count_minutes(masks.get('idle_periods'))
+    untracked_minutes = count_minutes(masks.get('untracked_work'))
+
+    # Обновляем аналитику
+    analysis = passive_tracking.setdefault('analysis', {})
+    analysis['total_computer_time_minutes'] = computer_minutes
+    analysis['total_project_time_minutes'] = project_minutes
+    analysis['total_idle_time_minutes'] = idle_minutes
+    analysis['total_untracked_work_minutes'] = untracked_minutes
+
+    # Вычисляем коэффициент продуктивности
+    if computer_minutes > 0:
+        analysis['productivity_ratio'] = round(project_minutes / computer_minutes, 3)
+    else:
+        analysis['productivity_ratio'] = 0.0
+
+
+def find_project_for_record(data, project_id):
+    """
+    Находит проект по ID из записи журнала
+    TODO: LEGACY_SUPPORT - для старого формата ID генерируется из title
+
+    Args:
+        data (dict): Данные БД
+        project_id (str): ID проекта
+
+    Returns:
+        dict|None: Найденный проект или None
+    """
+    for project in data.get('projects', []):
+        if get_project_id_compat(project) == project_id:
+            return project
+    return None
+
+
+def apply_tick(data, date, slot, project_id, flags, window=None):
+    """
+    Применяет результат одного тика к данным БД
+
+    Операция идемпотентна: повторное применение того же тика ничего не меняет,
+    поэтому журнал можно безопасно воспроизводить повторно
+
+    Args:
+        data (dict): Данные БД (изменяются in-place)
+        date (str): Дата в формате YYYY-MM-DD
+        slot (int): Позиция бита (0-143)
+        project_id (str|None): ID проекта, которому засчитан слот
+        flags (int): Флаги пассивного отслеживания
+        window (str|None): Заголовок активного окна
+
+    Returns:
+        list: Список path проектов, у которых обновилось aggregated_minutes
+    """
+    updated_paths = []
+
+    if project_id:
+        project = find_project_for_record(data, project_id)
+        if project and set_project_bit(project, date, slot):
+            old_total_minutes = project.get('total_minutes', 0)
+            delta = increment_total_minutes(project) - old_total_minutes
+
+            if project.get('path'):
+                updated_paths = update_aggregated_minutes(project['path'], data['projects'], delta=delta)
+
+    set_passive_bits(data, date, slot, flags)
+    set_passive_window(data, date, slot, flags, window)
+    return updated_paths
@@ -0,0 +1,170 @@
+"""
+Модуль заголовков активных окон по слотам
+
+Заголовок активного окна каждого тика хранится рядом с пассивными масками:
+    meta.passive_tracking.window_titles  - таблица заголовков (ID = индекс + 1)
+    meta.passive_tracking.daily_windows  - {дата: "b64:..."} ID заголовка на каждый слот дня
+
+Массив слотов дня - 144 байта (0 - нет данных), пока заголовков не больше 255;
+дальше ID пишутся по 2 байта little-endian. Разрядность определяется по длине массива.
+
+Слот получает заголовок первого тика, попавшего в него; повторный тик не меняет
+значение, поэтому применение журнала идемпотентно, а объединение массивов
+(шарды истории, сохранение поверх чужой записи) берет уже заполненные слоты
+"""
+import base64
+
+from .masks import SLOTS_PER_DAY, COMPACT_PREFIX
+
+
+# Максимальная длина заголовка в таблице (длинные заголовки браузеров обрезаются)
+MAX_TITLE_LENGTH = 120
+
+# Разделители "документ - приложение" в заголовках окон
+APPLICATION_SEPARATORS = (' - ', ' — ', ' – ')
+
+
+def normalize_title(title):
+    """Приводит заголовок к виду, в котором он хранится в таблице"""
+    return ' '.join(title.split())[:MAX_TITLE_LENGTH]
+
+
+def get_application_name(title):
+    """
+    Выделяет название приложения из заголовка окна (последняя часть после " - ")
+
+    Examples:
+        >>> get_application_name("app.py - simple-tracker - Visual Studio Code")
+        'Visual Studio Code'
+        >>> get_application_name("Telegram")
+        'Telegram'
+    """
+    for separator in APPLICATION_SEPARATORS:
+        if separator in title:
+            application = title.rsplit(separator, 1)[1].strip()
+            if application:
+                return application
+    return title
+
+
+def slots_from_bytes(raw):
+    """
+    Преобразует байты массива слотов в список ID
+
+    Args:
+        raw (bytes|None): 144 байта (1 байт на слот) или 288 (2 байта)
+
+    Returns:
+        list: 144 ID заголовков (0 - нет данных)
+    """
+    if not raw:
+        return [0] * SLOTS_PER_DAY
+    if len(raw) >= SLOTS_PER_DAY * 2:
+        return [int.from_bytes(raw[i:i + 2], 'little') for i in range(0, SLOTS_PER_DAY * 2, 2)]
+    return list(raw[:SLOTS_PER_DAY]) + [0] * (SLOTS_PER_DAY - len(raw))
+
+
+def slots_to_bytes(slots):
+    """Сериализует список ID слотов: 1 байт на слот, если все ID < 256, иначе 2"""
+    if max(slots, default=0) < 256:
+        return bytes(slots)
+    return b''.join(value.to_bytes(2, 'little') for value in slots)
+
+
+def merge_slot_bytes(target, source):
+    """Объединяет два массива слотов в байтах: пустые слоты target берутся из source"""
+    merged = [current or incoming for current, incoming in zip(slots_from_bytes(target), slots_from_bytes(source))]
+    return slots_to_bytes(merged)
+
+
+def parse_window_slots(value):
+    """
+    Разбирает значение daily_windows за день
+
+    Examples:
+        >>> parse_window_slots(format_window_slots([1] + [0] * 143))[:2]
+        [1, 0]
+    """
+    if not value:
+        return [0] * SLOTS_PER_DAY
+    return slots_from_bytes(base64.b64decode(value[len(COMPACT_PREFIX):]))
+
+
+def format_window_slots(slots):
+    """Сериализует список ID слотов дня для db.json"""
+    return COMPACT_PREFIX + base64.b64encode(slots_to_bytes(slots)).decode('ascii')
+
+
+def intern_window_title(passive_tracking, title):
+    """
+    Возвращает ID заголовка, добавляя его в таблицу window_titles при первом появлении
+
+    Args:
+        passive_tracking (dict): Секция meta.passive_tracking (изменяется in-place)
+        title (str): Заголовок окна
+
+    Returns:
+        int: ID заголовка (>= 1)
+    """
+    titles = passive_tracking.setdefault('window_titles', [])
+    title = normalize_title(title)
+    # Таблица небольшая (сотни заголовков), поиск по списку дешевле поддержки словаря в данных
+    try:
+        return titles.index(title) + 1
+    except ValueError:
+        titles.append(title)
+        return len(titles)
+
+
+def set_window_slot(passive_tracking, date, slot, title):
+    """
+    Записывает заголовок окна в слот дня (если слот еще пуст)
+
+    Args:
+        passive_tracking (dict): Секция meta.passive_tracking (изменяется in-place)
+        date (str): Дата в формате YYYY-MM-DD
+        slot (int): Позиция слота (0-143)
+        title (str): Заголовок активного окна
+
+    Returns:
+        bool: True если слот был заполнен
+    """
+    if not title or not title.strip() or not 0 <= slot < SLOTS_PER_DAY:
+        return False
+
+    daily_windows = passive_tracking.setdefault('daily_windows', {})
+    slots = parse_window_slots(daily_windows.get(date))
+    if slots[slot]:
+        return False
+
+    slots[slot] = intern_window_title(passive_tracking, title)
+    daily_windows[date] = format_window_slots(slots)
+    return True
+
+
+def merge_window_slots(target, source):
+    """
+    Объединяет словарь {дата: массив слотов} source в target: пустые слоты target
+    заполняются значениями source
+
+    Args:
+        target (dict): {дата: значение daily_windows} (изменяется in-place)
+        source (dict): {дата: значение daily_windows}
+
+    Returns:
+        bool: Изменился ли target
+    """
+    changed = False
+    for date, value in source.items():
+        existing = target.get(date)
+        if existing is None:
+            target[date] = value
+            changed = True
+            continue
+
+        slots = parse_window_slots(existing)
+        merged = [current or incoming for current, incoming in zip(slots, parse_window_slots(value))]
+        if merged != slots:
+            target[date] = format_window_slots(merged)
+            changed = True
+    return changed
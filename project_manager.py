@@ -5,47 +5,103 @@
 """
 import json
 import os
+import re
 import sys
-import shutil
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Импорт core модулей для работы с иерархией
+# На уровне модуля - только то, что нужно `tracker list`; аналитика, лог, индекс лога,
+# замеры тиков, транслитерация и перенос хранилища импортируются в своих командах
 try:
     from core.compatibility import (
         detect_db_format, ensure_project_fields, check_migration_status,
-        legacy_find_project_by_title, format_project_display_compat
+        legacy_find_project_by_title, format_project_display_compat, get_project_id_compat
     )
     from core.hierarchy import (
         find_project_by_path, find_project_by_id, get_projects_tree_structure,
-        update_aggregated_minutes, validate_hierarchy_integrity
-    )
-    from core.transliteration import (
-        generate_id_from_title, generate_path_from_title, validate_path
+        update_aggregated_minutes, validate_hierarchy_integrity, recompute_all_aggregates
     )
+    from core.storage import get_storage, open_storage
     HIERARCHY_SUPPORT = True
 except ImportError:
     # Fallback если core модули недоступны
     HIERARCHY_SUPPORT = False
 
 
-def load_db():
-    """Загружает базу данных"""
+def get_db_storage():
+    """Открывает хранилище БД (db.json, db.sqlite или TRACKER_DB)"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return get_storage(script_dir)
+
+
+def load_db(masks=True):
+    """
+    Загружает базу данных, сворачивая в нее накопленный журнал тиков
+    
+    Args:
+        masks (bool): False - только метаданные проектов (list, tree, info): маски
+            загружаются при первом обращении, журнал применяется только в памяти
+    """
+    if HIERARCHY_SUPPORT:
+        storage = get_db_storage()
+        try:
+            if not masks:
+                return storage.load(compact=False, history=False, masks=False), storage.path
+            return storage.load(), storage.path
+        finally:
+            storage.close()
+    
     script_dir = os.path.dirname(os.path.abspath(__file__))
     db_path = os.path.join(script_dir, 'db.json')
     
     with open(db_path, 'r', encoding='utf-8') as f:
-        return json.load(f), db_path
+        data = json.load(f)
+    
+    return data, db_path
 
 
 def save_db(data, db_path):
-    """Сохраняет базу данных"""
+    """
+    Сохраняет базу данных (маски - в компактном формате)
+    
+    Raises:
+        ConflictError: БД изменена другим процессом после load_db (только с core модулями)
+    """
+    if HIERARCHY_SUPPORT:
+        storage = open_storage(db_path)
+        try:
+            storage.save(data)
+        finally:
+            storage.close()
+        return
+    
     with open(db_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
 
+def update_db(mutator):
+    """
+    Читает, изменяет и сохраняет БД под блокировкой писателей
+    
+    В отличие от load_db + save_db изменения трекера и дашборда, сделанные
+    между загрузкой и сохранением, не теряются
+    
+    Args:
+        mutator (callable): mutator(data) -> результат; None - ничего не сохранять
+        
+    Returns:
+        Результат mutator
+    """
+    storage = get_db_storage()
+    try:
+        return storage.update(mutator)
+    finally:
+        storage.close()
+
+
 def show_db_info():
     """Показывает информацию о формате БД"""
-    data, _ = load_db()
+    data, _ = load_db(masks=False)
     
     print("=== Информация о базе данных ===")
     print(f"Проектов: {len(data.get('projects', []))}")
@@ -79,7 +135,7 @@ def show_db_info():
 
 def list_projects():
     """Показывает все проекты и их статусы"""
-    data, _ = load_db()
+    data, _ = load_db(masks=False)
     
     if HIERARCHY_SUPPORT:
         db_format = detect_db_format(data)
@@ -167,7 +223,7 @@ def list_projects_legacy(data):
 
 def show_tree():
     """Показывает древовидную структуру проектов"""
-    data, _ = load_db()
+    data, _ = load_db(masks=False)
     
     if not HIERARCHY_SUPPORT:
         print("ОШИБКА: Поддержка иерархии отключена")
@@ -251,24 +307,23 @@ def find_project_universal(data, identifier):
 
 def set_active_project(project_identifier):
     """Делает проект активным (поиск по title, id или path)"""
-    data, db_path = load_db()
-    
-    # Сначала все проекты делаем неактивными
-    for project in data['projects']:
-        if project['status'] == 'active':
-            project['status'] = 'paused'
-    
-    # Находим проект универсальным поиском
-    target_project = find_project_universal(data, project_identifier)
-    
-    if target_project:
-        target_project['status'] = 'active'
+    if HIERARCHY_SUPPORT:
+        target_project = set_project_status_in_storage(project_identifier, 'active')
+    else:
+        data, db_path = load_db()
         
-        # Обеспечиваем наличие полей иерархии
-        if HIERARCHY_SUPPORT:
-            ensure_project_fields(target_project)
+        # Сначала все проекты делаем неактивными
+        for project in data['projects']:
+            if project['status'] == 'active':
+                project['status'] = 'paused'
         
-        save_db(data, db_path)
+        # Находим проект универсальным поиском
+        target_project = find_project_universal(data, project_identifier)
+        if target_project:
+            target_project['status'] = 'active'
+            save_db(data, db_path)
+    
+    if target_project:
         print(f"OK Проект '{target_project['title']}' теперь активный")
         
         # Показываем дополнительную информацию
@@ -283,6 +338,25 @@ def set_active_project(project_identifier):
     return False
 
 
+def set_project_status_in_storage(project_identifier, new_status):
+    """
+    Меняет статус проекта точечной операцией хранилища (без перезаписи всей БД в SQLite)
+    
+    Returns:
+        dict|None: Проект до изменения статуса (title, status, path, id) или None если не найден
+    """
+    storage = get_db_storage()
+    try:
+        target_project = storage.find_project(project_identifier)
+        if not target_project:
+            return None
+        
+        storage.set_project_status(get_project_id_compat(target_project), new_status)
+        return target_project
+    finally:
+        storage.close()
+
+
 def set_project_status(project_identifier, new_status):
     """Устанавливает статус проекта"""
     valid_statuses = ['active', 'paused', 'completed', 'archived']
@@ -291,26 +365,27 @@ def set_project_status(project_identifier, new_status):
         print(f"ОШИБКА Неверный статус. Доступны: {', '.join(valid_statuses)}")
         return False
     
-    data, db_path = load_db()
-    
-    # Если устанавливаем active, сначала убираем active у других
-    if new_status == 'active':
-        for project in data['projects']:
-            if project['status'] == 'active':
-                project['status'] = 'paused'
-    
-    # Находим проект универсальным поиском
-    target_project = find_project_universal(data, project_identifier)
+    if HIERARCHY_SUPPORT:
+        target_project = set_project_status_in_storage(project_identifier, new_status)
+    else:
+        data, db_path = load_db()
+        
+        # Если устанавливаем active, сначала убираем active у других
+        if new_status == 'active':
+            for project in data['projects']:
+                if project['status'] == 'active':
+                    project['status'] = 'paused'
+        
+        # Находим проект универсальным поиском
+        target_project = find_project_universal(data, project_identifier)
+        if target_project:
+            old_status = target_project['status']
+            target_project['status'] = new_status
+            save_db(data, db_path)
     
     if target_project:
-        old_status = target_project['status']
-        target_project['status'] = new_status
-        
-        # Обеспечиваем наличие полей иерархии
         if HIERARCHY_SUPPORT:
-            ensure_project_fields(target_project)
-        
-        save_db(data, db_path)
+            old_status = target_project['status']
         print(f"OK Статус проекта '{target_project['title']}': {old_status} -> {new_status}")
         return True
     
@@ -324,6 +399,8 @@ def create_project(title, parent_path=None):
         print("ОШИБКА: Создание проектов требует поддержки иерархии")
         return False
     
+    from core.transliteration import generate_id_from_title, generate_path_from_title, validate_path
+    
     data, db_path = load_db()
     
     try:
@@ -360,13 +437,21 @@ def create_project(title, parent_path=None):
             'daily_masks': {}
         }
         
-        data['projects'].append(new_project)
-        
-        # Обновляем aggregated_minutes родителей если есть
-        if parent_path:
-            update_aggregated_minutes(project_path, data['projects'])
+        def add_project(data):
+            # Уникальность проверяем повторно: проект мог создать другой процесс
+            if find_project_by_path(project_path, data['projects']):
+                return None
+            
+            data['projects'].append(new_project)
+            
+            # Обновляем aggregated_minutes родителей если есть
+            if parent_path:
+                update_aggregated_minutes(project_path, data['projects'])
+            return new_project
         
-        save_db(data, db_path)
+        if update_db(add_project) is None:
+            print(f"ОШИБКА: Проект с path '{project_path}' уже существует")
+            return False
         
         print(f"OK Проект '{title}' создан")
         print(f"   ID: {new_project['id']}")
@@ -387,6 +472,9 @@ def migrate_to_new_format():
         print("ОШИБКА: Миграция требует поддержки core модулей")
         return False
     
+    # shutil нужен только для backup, остальные команды его не импортируют
+    import shutil
+    
     data, db_path = load_db()
     
     db_format = detect_db_format(data)
@@ -419,10 +507,7 @@ def migrate_to_new_format():
         
         # Пересчитываем aggregated_minutes для всех проектов
         print("Пересчет aggregated_minutes...")
-        for project in data['projects']:
-            path = project['path']
-            from core.hierarchy import calculate_aggregated_minutes
-            project['aggregated_minutes'] = calculate_aggregated_minutes(path, data['projects'])
+        recompute_all_aggregates(data['projects'])
         
         # Проверяем целостность
         is_valid, errors = validate_hierarchy_integrity(data['projects'])
@@ -465,141 +550,361 @@ def migrate_to_new_format():
         return False
 
 
+def verify_totals(fix=False):
+    """
+    Сверяет total_minutes проектов с битовыми масками
+    
+    Трекер увеличивает total_minutes на 5 минут за каждый новый бит, не пересчитывая
+    всю историю; команда пересчитывает время по маскам и показывает расхождения
+    
+    Args:
+        fix (bool): Исправить расхождения и пересчитать aggregated_minutes
+    """
+    if not HIERARCHY_SUPPORT:
+        print("ОШИБКА: Проверка требует поддержки core модулей")
+        return False
+    
+    data, _ = load_db()
+    projects = data.get('projects', [])
+    
+    print("=== Проверка total_minutes ===")
+    
+    drifted = find_total_minutes_drift(projects)
+    
+    print(f"Проверено проектов: {len(projects)}")
+    
+    if not drifted:
+        print("OK Расхождений нет")
+        return True
+    
+    print(f"Расхождений: {len(drifted)}")
+    for project, stored_minutes, actual_minutes in drifted:
+        print(f"  {project['title']}: в БД {stored_minutes} мин, по маскам {actual_minutes} мин "
+              f"({actual_minutes - stored_minutes:+d})")
+    
+    if not fix:
+        print("Для исправления запустите: verify-totals --fix")
+        return False
+    
+    def fix_totals(data):
+        # Расхождения ищем заново в свежих данных: трекер мог добавить тики после проверки
+        fresh_drifted = find_total_minutes_drift(data.get('projects', []))
+        for project, _, actual_minutes in fresh_drifted:
+            project['total_minutes'] = actual_minutes
+        
+        # aggregated_minutes зависят от total_minutes всех потомков
+        recompute_all_aggregates(data.get('projects', []))
+        return fresh_drifted
+    
+    fixed = update_db(fix_totals)
+    print(f"OK Исправлено проектов: {len(fixed)}")
+    return True
+
+
+def find_total_minutes_drift(projects):
+    """
+    Находит проекты, у которых total_minutes не совпадает с суммой масок
+    
+    Returns:
+        list: [(project, минут в БД, минут по маскам), ...]
+    """
+    from core.masks import count_minutes
+    
+    drifted = []
+    for project in projects:
+        stored_minutes = project.get('total_minutes', 0)
+        actual_minutes = sum(count_minutes(mask) for mask in project.get('daily_masks', {}).values())
+        if stored_minutes != actual_minutes:
+            drifted.append((project, stored_minutes, actual_minutes))
+    return drifted
+
+
+def migrate_storage_backend(target_format):
+    """
+    Переносит БД в другое хранилище (json <-> sqlite)
+    
+    Args:
+        target_format (str): 'json' или 'sqlite'
+    """
+    if not HIERARCHY_SUPPORT:
+        print("ОШИБКА: Смена хранилища требует поддержки core модулей")
+        return False
+    
+    if target_format not in ('json', 'sqlite'):
+        print("ОШИБКА: Доступные хранилища: json, sqlite")
+        return False
+    
+    from core.storage import migrate_storage
+    
+    source = get_db_storage()
+    if source.backend == target_format:
+        print(f"БД уже хранится в {target_format}: {source.path}")
+        return True
+    
+    script_dir = os.path.dirname(source.path)
+    target_path = os.path.join(script_dir, 'db.json' if target_format == 'json' else 'db.sqlite')
+    if os.path.exists(target_path):
+        print(f"ОШИБКА: Файл {target_path} уже существует")
+        return False
+    
+    print(f"=== Перенос БД: {source.backend} -> {target_format} ===")
+    
+    target = open_storage(target_path)
+    try:
+        data = migrate_storage(source, target)
+    except Exception as e:
+        target.close()
+        source.close()
+        if os.path.exists(target_path):
+            os.remove(target_path)
+        print(f"ОШИБКА при переносе: {e}")
+        return False
+    
+    target.close()
+    source.close()
+    
+    # Исходный файл убираем в backup, чтобы автоматический выбор хранилища нашел новый
+    backup_path = source.path + f".backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    os.replace(source.path, backup_path)
+    
+    print(f"Проектов перенесено: {len(data.get('projects', []))}")
+    print(f"Новая БД: {target_path}")
+    print(f"Backup сохранен: {backup_path}")
+    if os.environ.get('TRACKER_DB'):
+        print("ВНИМАНИЕ: задана переменная TRACKER_DB - обновите ее на новый путь")
+    return True
+
+
 def show_passive_stats(date=None):
     """Показывает статистику пассивного отслеживания"""
+    from core.analytics import (
+        calculate_passive_stats, ERROR_NOT_CONFIGURED as ANALYTICS_NOT_CONFIGURED,
+        ERROR_DISABLED as ANALYTICS_DISABLED, ERROR_NO_DATA as ANALYTICS_NO_DATA,
+        ERROR_NO_DATE as ANALYTICS_NO_DATE
+    )
+    
     data, _ = load_db()
+    stats = calculate_passive_stats(data, date)
     
-    if 'passive_tracking' not in data.get('meta', {}):
+    if stats['error'] == ANALYTICS_NOT_CONFIGURED:
         print("ОШИБКА: Пассивное отслеживание не настроено")
         print("Запустите трекер несколько раз для инициализации")
         return False
     
-    passive = data['meta']['passive_tracking']
-    
-    if not passive.get('enabled', True):
+    if stats['error'] == ANALYTICS_DISABLED:
         print("Пассивное отслеживание отключено")
         return False
     
-    # Если дата не указана, берем последнюю доступную
-    if not date:
-        available_dates = list(passive.get('daily_masks', {}).keys())
-        if not available_dates:
-            print("Нет данных пассивного отслеживания")
-            return False
-        date = max(available_dates)  # Последняя дата
+    if stats['error'] == ANALYTICS_NO_DATA:
+        print("Нет данных пассивного отслеживания")
+        return False
     
-    print(f"=== Пассивная статистика за {date} ===")
+    print(f"=== Пассивная статистика за {stats['date']} ===")
     print()
     
     # Проверяем наличие данных за указанную дату
-    if date not in passive.get('daily_masks', {}):
-        print(f"Нет данных за {date}")
-        available = list(passive['daily_masks'].keys())
-        if available:
-            print(f"Доступные даты: {', '.join(sorted(available))}")
+    if stats['error'] == ANALYTICS_NO_DATE:
+        print(f"Нет данных за {stats['date']}")
+        if stats['available_dates']:
+            print(f"Доступные даты: {', '.join(stats['available_dates'])}")
         return False
     
-    masks = passive['daily_masks'][date]
-    
-    # Вычисляем статистику
-    computer_minutes = masks['computer_activity'].count('1') * 5
-    project_minutes = masks['project_activity'].count('1') * 5
-    idle_minutes = masks['idle_periods'].count('1') * 5
-    untracked_minutes = masks['untracked_work'].count('1') * 5
-    
     # Переводим в часы и минуты
     def format_time(minutes):
         hours = minutes // 60
         mins = minutes % 60
         return f"{hours}ч {mins}м"
     
-    # Вычисляем проценты
-    total_work_time = 12 * 60  # 08:00-20:00 = 12 часов
-    computer_pct = round(computer_minutes / total_work_time * 100, 1) if total_work_time > 0 else 0
-    project_pct = round(project_minutes / computer_minutes * 100, 1) if computer_minutes > 0 else 0
-    untracked_pct = round(untracked_minutes / computer_minutes * 100, 1) if computer_minutes > 0 else 0
-    idle_pct = round(idle_minutes / total_work_time * 100, 1) if total_work_time > 0 else 0
-    
-    print(f"Время за компьютером:       {format_time(computer_minutes)} ({computer_pct}% от рабочего дня)")
-    print(f"Проектная работа:           {format_time(project_minutes)} ({project_pct}% от времени за ПК)")
-    print(f"Непроектная активность:     {format_time(untracked_minutes)} ({untracked_pct}% от времени за ПК)")
-    print(f"Простой/перерывы:           {format_time(idle_minutes)} ({idle_pct}% от рабочего дня)")
+    print(f"Время за компьютером:       {format_time(stats['computer_minutes'])} ({stats['computer_pct']}% от рабочего дня)")
+    print(f"Проектная работа:           {format_time(stats['project_minutes'])} ({stats['project_pct']}% от времени за ПК)")
+    print(f"Непроектная активность:     {format_time(stats['untracked_minutes'])} ({stats['untracked_pct']}% от времени за ПК)")
+    print(f"Простой/перерывы:           {format_time(stats['idle_minutes'])} ({stats['idle_pct']}% от рабочего дня)")
     print()
     
     # Общая продуктивность
-    productivity = round(project_minutes / computer_minutes * 100, 1) if computer_minutes > 0 else 0
-    print(f"Продуктивность: {productivity}% (проектная работа / общее время за ПК)")
+    print(f"Продуктивность: {stats['productivity']}% (проектная работа / общее время за ПК)")
     print()
     
     # Рекомендации
-    if productivity < 30:
-        print("Низкая продуктивность. Возможно, много времени на администрирование?")
-    elif productivity > 70:
-        print("Отличная продуктивность! Много времени на проектную работу.")
-    else:
-        print("Нормальная продуктивность. Баланс между проектами и другими задачами.")
-    
-    if untracked_minutes > project_minutes:
-        print("Непроектного времени больше чем проектного. Рассмотрите создание проектов для рутинных задач.")
+    for recommendation in stats['recommendations']:
+        print(recommendation)
     
     return True
 
 
 def show_passive_timeline(date=None):
     """Показывает временную шкалу активности за день"""
+    from core.analytics import (
+        calculate_passive_timeline, ERROR_NOT_CONFIGURED as ANALYTICS_NOT_CONFIGURED,
+        ERROR_NO_DATA as ANALYTICS_NO_DATA, ERROR_NO_DATE as ANALYTICS_NO_DATE
+    )
+    
     data, _ = load_db()
+    timeline = calculate_passive_timeline(data, date)
     
-    if 'passive_tracking' not in data.get('meta', {}):
+    if timeline['error'] == ANALYTICS_NOT_CONFIGURED:
         print("ОШИБКА: Пассивное отслеживание не настроено")
         return False
     
-    passive = data['meta']['passive_tracking']
-    
-    # Если дата не указана, берем последнюю
-    if not date:
-        available_dates = list(passive.get('daily_masks', {}).keys())
-        if not available_dates:
-            print("Нет данных пассивного отслеживания")
-            return False
-        date = max(available_dates)
-    
-    if date not in passive.get('daily_masks', {}):
-        print(f"Нет данных за {date}")
+    if timeline['error'] == ANALYTICS_NO_DATA:
+        print("Нет данных пассивного отслеживания")
         return False
     
-    masks = passive['daily_masks'][date]
+    if timeline['error'] == ANALYTICS_NO_DATE:
+        print(f"Нет данных за {timeline['date']}")
+        return False
     
-    print(f"=== Временная шкала активности {date} ===")
+    print(f"=== Временная шкала активности {timeline['date']} ===")
     print("Легенда: [P] Проект | [A] Активность | [I] Простой | [-] Нет данных")
     print()
     
     # Показываем по часам
-    for hour in range(8, 20):  # 08:00-19:59
-        hour_start = (hour - 8) * 12  # 12 слотов по 5 минут в часе
-        hour_end = hour_start + 12
-        
-        print(f"{hour:02d}:00 ", end="")
-        
-        for slot in range(hour_start, min(hour_end, 144)):
-            computer = masks['computer_activity'][slot] == '1'
-            project = masks['project_activity'][slot] == '1'
-            idle = masks['idle_periods'][slot] == '1'
-            
-            if project:
-                print("P", end="")
-            elif computer:
-                print("A", end="")
-            elif idle:
-                print("I", end="")
-            else:
-                print("-", end="")
-        
-        print()  # Новая строка после каждого часа
+    for hour in timeline['hours']:
+        print(f"{hour['hour']} {hour['slots']}")
     
     print()
     return True
 
 
+def get_log_path():
+    """Возвращает путь к tracker.log (рядом со скриптами трекера)"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tracker.log')
+
+
+def show_log_tail(count=20):
+    """Показывает последние записи tracker.log (с учетом архивных сегментов)"""
+    from core.tracker_log import tail_lines, list_log_segments
+    
+    log_path = get_log_path()
+    if not os.path.exists(log_path) and not list_log_segments(log_path):
+        print(f"Лог не найден: {log_path}")
+        return False
+    
+    for line in tail_lines(log_path, count):
+        print(line)
+    return True
+
+
+def grep_log(pattern, ignore_case=False, include_rotated=True):
+    """
+    Ищет записи tracker.log по регулярному выражению
+    
+    Args:
+        pattern (str): Регулярное выражение
+        ignore_case (bool): Без учета регистра
+        include_rotated (bool): Искать и в архивных сегментах (в т.ч. .gz)
+        
+    Returns:
+        bool: Найдена ли хотя бы одна запись
+    """
+    from core.tracker_log import grep_lines
+    
+    try:
+        found = 0
+        for line in grep_lines(get_log_path(), pattern, ignore_case, include_rotated):
+            print(line)
+            found += 1
+    except re.error as e:
+        print(f"ОШИБКА: Некорректное выражение '{pattern}': {e}")
+        return False
+    
+    return found > 0
+
+
+def resolve_log_project_title(project_identifier):
+    """Возвращает название проекта для запросов к логу (в логе проекты записаны по title)"""
+    storage = get_db_storage()
+    try:
+        project = storage.find_project(project_identifier)
+    finally:
+        storage.close()
+    return project['title'] if project else project_identifier
+
+
+def build_log_index(rebuild=True):
+    """Строит колоночный индекс tracker.log и показывает его размер"""
+    from core.tracker_log import list_log_segments
+    from core.log_index import load_or_build_index
+    
+    log_path = get_log_path()
+    if not os.path.exists(log_path) and not list_log_segments(log_path):
+        print(f"Лог не найден: {log_path}")
+        return None
+    
+    started = datetime.now()
+    index, rebuilt = load_or_build_index(log_path, rebuild=rebuild)
+    if rebuilt:
+        elapsed = (datetime.now() - started).total_seconds()
+        print(f"Индекс лога построен за {elapsed:.2f} с: {len(index)} записей, "
+              f"{len(index.days)} дней, {len(index.windows)} уникальных окон, {len(index.projects)} проектов")
+    return index
+
+
+def show_log_top_windows(project_identifier=None, date_from=None, date_to=None, limit=10):
+    """
+    Показывает самые частые окна за период (по умолчанию - последние 7 дней)
+    
+    Args:
+        project_identifier (str): Проект (название, ID или path) - только его тики
+        date_from (str): Начальная дата YYYY-MM-DD
+        date_to (str): Конечная дата YYYY-MM-DD
+        limit (int): Количество окон
+    """
+    index = build_log_index(rebuild=False)
+    if index is None:
+        return False
+    
+    if date_to is None:
+        date_to = datetime.now().strftime('%Y-%m-%d')
+    if date_from is None:
+        date_from = (datetime.strptime(date_to, '%Y-%m-%d') - timedelta(days=6)).strftime('%Y-%m-%d')
+    
+    project_title = resolve_log_project_title(project_identifier) if project_identifier else None
+    top = index.top_windows(date_from, date_to, project=project_title, limit=limit)
+    
+    scope = f" | проект {project_title}" if project_title else ""
+    print(f"=== Топ окон {date_from} - {date_to}{scope} ===")
+    if not top:
+        print("Нет данных об окнах за период")
+        return False
+    
+    for i, item in enumerate(top, 1):
+        hours, minutes = divmod(item['minutes'], 60)
+        print(f"{i:3}. {hours}ч {minutes:02d}м  (простой {item['avg_idle_seconds']}s)  {item['window']}")
+    
+    skipped = index.reasons_summary(date_from, date_to, project=project_title)['BIT_SKIP']
+    if skipped:
+        print()
+        print("Пропущенные слоты: " + ", ".join(f"{reason} - {count}" for reason, count in skipped.items()))
+    return True
+
+
+def show_tick_perf(count=288):
+    """
+    Показывает p50/p95 времени этапов тика по последним записям tracker.perf
+    
+    Args:
+        count (int): Сколько последних тиков учитывать (288 - сутки тиков по 5 минут)
+    """
+    from core.tick_metrics import read_metrics, summarize_metrics, get_metrics_path
+    
+    metrics_path = get_metrics_path(get_log_path())
+    records = read_metrics(metrics_path, count)
+    if not records:
+        print(f"Нет замеров тиков: {metrics_path}")
+        print("Замеры пишет трекер в рабочее время (meta.tick_metrics.enabled)")
+        return False
+    
+    summary = summarize_metrics(records)
+    print(f"=== Время тика по этапам: {summary['ticks']} тиков, {summary['from']} - {summary['to']} ===")
+    print(f"{'Этап':<12}{'p50 мс':>10}{'p95 мс':>10}{'макс мс':>10}{'тиков':>8}")
+    for item in summary['stages']:
+        if item['stage'] == 'total':
+            print("-" * 50)
+        print(f"{item['stage']:<12}{item['p50']:>10.2f}{item['p95']:>10.2f}{item['max']:>10.2f}{item['count']:>8}")
+    return True
+
+
 def show_help():
     """Показывает справку по командам"""
     print("=== Управление проектами Simple Time Tracker ===")
@@ -623,11 +928,20 @@ def show_help():
         print("  create <название>             - создать корневой проект")
         print("  create <название> --parent <path> - создать дочерний проект")
         print("  migrate                       - миграция в новый формат")
+        print("  migrate-storage sqlite|json   - перенос БД в SQLite или обратно в db.json")
+        print("  verify-totals [--fix]         - сверить total_minutes с масками")
         print()
         print("Пассивное отслеживание:")
         print("  passive                       - статистика пассивного отслеживания")
         print("  timeline [дата]               - временная шкала активности")
         print()
+        print("Лог трекера:")
+        print("  log tail [-n 50]              - последние записи tracker.log")
+        print("  log grep <выражение> [-i] [--current] - поиск по логу и архивным сегментам")
+        print("  log-index                     - построить индекс лога (окна, простой, причины)")
+        print("  log-index top [--project X] [--from дата] [--to дата] [-n 10] - топ окон (по умолчанию за 7 дней)")
+        print("  perf [-n 288]                 - p50/p95 времени этапов тика (tracker.perf)")
+        print()
         print("Поиск проектов:")
         print("  По названию: 'ExLibrus'")
         print("  По ID:       'exlibrus'")
@@ -708,6 +1022,17 @@ def main():
         if not migrate_to_new_format():
             sys.exit(1)
     
+    elif command == 'verify-totals':
+        if not verify_totals(fix='--fix' in sys.argv[2:]):
+            sys.exit(1)
+    
+    elif command == 'migrate-storage':
+        if len(sys.argv) < 3:
+            print("ОШИБКА: Укажите хранилище: migrate-storage sqlite|json")
+            sys.exit(1)
+        if not migrate_storage_backend(sys.argv[2].lower()):
+            sys.exit(1)
+    
     elif command == 'help' or command == '--help':
         show_help()
     
@@ -723,6 +1048,87 @@ def main():
         if not show_passive_timeline(date):
             sys.exit(1)
     
+    elif command == 'log':
+        # Просмотр tracker.log: log tail [-n N] | log grep <выражение> [-i] [--current]
+        args = sys.argv[2:]
+        subcommand = args[0].lower() if args else 'tail'
+        
+        if subcommand == 'tail':
+            count = 20
+            if '-n' in args:
+                try:
+                    count = int(args[args.index('-n') + 1])
+                except (IndexError, ValueError):
+                    print("ОШИБКА: После -n должно быть указано число строк")
+                    sys.exit(1)
+            if not show_log_tail(count):
+                sys.exit(1)
+        
+        elif subcommand == 'grep':
+            options = {'-i', '--current'}
+            pattern_parts = [arg for arg in args[1:] if arg not in options]
+            if not pattern_parts:
+                print("ОШИБКА: Укажите выражение: log grep <выражение>")
+                sys.exit(1)
+            if not grep_log(' '.join(pattern_parts), ignore_case='-i' in args,
+                            include_rotated='--current' not in args):
+                sys.exit(1)
+        
+        else:
+            print(f"ОШИБКА: Неизвестная команда лога '{subcommand}'")
+            print("Используйте: log tail [-n N] | log grep <выражение> [-i] [--current]")
+            sys.exit(1)
+    
+    elif command == 'log-index':
+        # Индекс лога: log-index | log-index top [--project X] [--from D] [--to D] [-n N]
+        args = sys.argv[2:]
+        if not args:
+            if build_log_index() is None:
+                sys.exit(1)
+            return
+        
+        if args[0].lower() != 'top':
+            print(f"ОШИБКА: Неизвестная команда индекса '{args[0]}'")
+            print("Используйте: log-index | log-index top [--project X] [--from дата] [--to дата] [-n N]")
+            sys.exit(1)
+        
+        options = {'--project': None, '--from': None, '--to': None, '-n': '10'}
+        i = 1
+        while i < len(args):
+            if args[i] in options and i + 1 < len(args):
+                options[args[i]] = args[i + 1]
+                i += 2
+            else:
+                print(f"ОШИБКА: Неизвестный параметр '{args[i]}'")
+                sys.exit(1)
+        
+        try:
+            limit = int(options['-n'])
+            for date in (options['--from'], options['--to']):
+                if date:
+                    datetime.strptime(date, '%Y-%m-%d')
+        except ValueError:
+            print("ОШИБКА: -n должно быть числом, даты - в формате YYYY-MM-DD")
+            sys.exit(1)
+        
+        if not show_log_top_windows(options['--project'], options['--from'], options['--to'], limit):
+            sys.exit(1)
+    
+    elif command == 'perf':
+        # Время этапов тика: perf [-n N]
+        args = sys.argv[2:]
+        count = 288
+        if args:
+            try:
+                if args[0] != '-n':
+                    raise ValueError
+                count = int(args[1])
+            except (IndexError, ValueError):
+                print("ОШИБКА: Используйте: perf [-n число тиков]")
+                sys.exit(1)
+        if not show_tick_perf(count):
+            sys.exit(1)
+    
     elif command == 'web':
         # Запуск веб-дашборда
         import subprocess
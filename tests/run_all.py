@@ -12,6 +12,8 @@ from tests.test_core import main as test_core_main
 from tests.test_tracker_new import main as test_tracker_new_main
 from tests.test_project_manager_simple import main as test_project_manager_main
 from tests.test_integration_final import main as test_integration_main
+from tests.test_startup import main as test_startup_main
+from tests.test_web_server import main as test_web_server_main
 
 
 def run_all_tests():
@@ -38,6 +40,16 @@ def run_all_tests():
         # Тесты интеграции уведомлений
         print("4. Тестирование интеграции уведомлений...")
         test_integration_main()
+        print()
+        
+        # Время холодного старта
+        print("5. Тестирование времени старта...")
+        test_startup_main()
+        print()
+        
+        # Веб-сервер (тестовый клиент Flask, без Flask - пропуск)
+        print("6. Тестирование веб-сервера...")
+        test_web_server_main()
         
         print("=" * 60)
         print("Все тесты завершены успешно!")
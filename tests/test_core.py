@@ -4,13 +4,37 @@
 """
 import sys
 import os
+import json
+import shutil
+import tempfile
 
 # Добавляем путь к проекту для импорта (поднимаемся на уровень выше)
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.transliteration import transliterate, generate_id_from_title, validate_path
 from core.compatibility import detect_db_format, ensure_project_fields
-from core.hierarchy import calculate_aggregated_minutes, is_direct_child, get_all_parent_paths
+from core.hierarchy import (
+    calculate_aggregated_minutes, is_direct_child, get_all_parent_paths,
+    ProjectIndex, find_project_by_path, find_project_by_id, get_all_descendants,
+    recompute_all_aggregates, update_aggregated_minutes
+)
+from core.journal import make_record, append_record, get_journal_path, load_journal, compact_journal
+from core.tracking import (
+    FLAG_COMPUTER_ACTIVITY, FLAG_PROJECT_ACTIVITY, FLAG_IDLE_PERIODS, set_project_bit, increment_total_minutes
+)
+from core.masks import (
+    parse_mask, format_mask, to_legacy, set_bit, count_minutes, count_minutes_in_range,
+    compact_daily_masks
+)
+from core.storage import JsonStorage, SqliteStorage, ConflictError, LazyMasks, migrate_storage
+from core.history import get_hot_month, get_months_in_range, list_history_months, read_shard
+from core.windows import format_window_slots, parse_window_slots, get_application_name
+from core.tracker_log import TickLog, open_tick_log, list_log_segments, tail_lines, grep_lines
+from core.log_index import LogIndex, load_or_build_index, get_index_path
+from core.analytics import (
+    calculate_passive_stats, calculate_passive_timeline, calculate_range_timeline, calculate_window_usage,
+    ERROR_NO_DATE
+)
 
 
 def test_transliteration():
@@ -123,6 +147,1045 @@ def test_hierarchy():
         path = project['path']
         aggregated = calculate_aggregated_minutes(path, projects)
         print(f"  {path}: {project['total_minutes']} собственных -> {aggregated} общих")
+    
+    # Индекс дает те же результаты, что и линейный поиск
+    index = ProjectIndex(projects)
+    checks = [
+        ("поиск по path", find_project_by_path("exlibrus/frontend", projects, index) is find_project_by_path("exlibrus/frontend", projects)),
+        ("поиск по id", find_project_by_id("exlibrus", projects, index) is projects[0]),
+        ("поиск по title", index.find_by_title("exlibrus") is projects[0]),
+        ("все потомки", len(get_all_descendants("exlibrus", projects, index)) == len(get_all_descendants("exlibrus", projects))),
+        ("aggregated_minutes", all(
+            calculate_aggregated_minutes(p['path'], projects, index) == calculate_aggregated_minutes(p['path'], projects)
+            for p in projects
+        )),
+    ]
+    for name, ok in checks:
+        print(f"  Индекс, {name}: {'OK' if ok else 'FAIL'}")
+        assert ok
+    
+    # Пересчет всего дерева за один проход и дельта вверх по цепочке
+    expected = [calculate_aggregated_minutes(p['path'], projects) for p in projects]
+    recompute_all_aggregates(projects)
+    all_ok = [p['aggregated_minutes'] for p in projects] == expected
+    print(f"  recompute_all_aggregates: {'OK' if all_ok else 'FAIL'}")
+    assert all_ok
+    
+    # Дубль path (устаревшая копия проекта) не учитывается в родителе дважды
+    duplicated = [
+        {'id': 'root', 'path': 'root', 'total_minutes': 10},
+        {'id': 'child', 'path': 'root/child', 'total_minutes': 5},
+        {'id': 'child-copy', 'path': 'root/child', 'total_minutes': 7},
+    ]
+    recompute_all_aggregates(duplicated)
+    dup_ok = (
+        [p['aggregated_minutes'] for p in duplicated] == [15, 5, 5]
+        and calculate_aggregated_minutes('root', duplicated) == 15
+    )
+    print(f"  Дубли path в recompute_all_aggregates: {'OK' if dup_ok else 'FAIL'}")
+    assert dup_ok
+    
+    projects[2]['total_minutes'] += 5
+    updated = update_aggregated_minutes(projects[2]['path'], projects, delta=5)
+    delta_ok = updated == [p['path'] for p in reversed(projects)] and projects[0]['aggregated_minutes'] == expected[0] + 5
+    print(f"  Дельта вверх по цепочке: {'OK' if delta_ok else 'FAIL'}")
+    assert delta_ok
+
+
+def test_masks():
+    """Тест компактного представления масок"""
+    print("\n=== Тест масок ===")
+    
+    legacy = "110010000100010000000000" + "0" * 88 + "111" + "0" * 29
+    bits = parse_mask(legacy)
+    compact = format_mask(bits)
+    
+    checks = [
+        ("legacy -> int -> legacy", to_legacy(bits) == legacy),
+        ("компактный формат обратим", parse_mask(compact) == bits),
+        ("размер компактной маски", len(compact) == 28),
+        ("короткая legacy маска", parse_mask("000001100000000010000000") == parse_mask("000001100000000010000000" + "0" * 120)),
+        ("подсчет минут", count_minutes(compact) == count_minutes(legacy) == 40),
+        ("минуты в диапазоне", count_minutes_in_range(bits, 0, 12) == 20),
+        ("пустая маска", count_minutes(None) == 0 and count_minutes("") == 0),
+    ]
+    
+    new_mask, changed = set_bit(legacy, 2)
+    checks.append(("установка бита", changed and to_legacy(new_mask)[:3] == "111"))
+    _, changed_again = set_bit(new_mask, 2)
+    checks.append(("повторная установка", not changed_again))
+    
+    data = {
+        'meta': {'passive_tracking': {'daily_masks': {'2025-06-09': {'computer_activity': legacy}}}},
+        'projects': [{'daily_masks': {'2025-06-09': legacy, '2025-06-10': compact}}]
+    }
+    converted = compact_daily_masks(data)
+    checks.append(("конвертация БД", converted == 2 and data['projects'][0]['daily_masks']['2025-06-09'] == compact))
+    
+    for name, ok in checks:
+        print(f"  {name}: {'OK' if ok else 'FAIL'}")
+        assert ok
+
+
+def test_incremental_totals():
+    """Тест инкрементального обновления total_minutes"""
+    print("\n=== Тест инкрементального total_minutes ===")
+    
+    # Проект с историей: счетчик не пересчитывается по всем дням
+    project = {'total_minutes': 100, 'daily_masks': {'2025-06-0%d' % day: '1' for day in range(1, 10)}}
+    if set_project_bit(project, '2025-06-10', 0):
+        increment_total_minutes(project)
+    print(f"  +5 к счетчику: {'OK' if project['total_minutes'] == 105 else 'FAIL'}")
+    assert project['total_minutes'] == 105
+    
+    # Повторный бит не меняет время
+    changed = set_project_bit(project, '2025-06-10', 0)
+    print(f"  Повторный бит: {'OK' if not changed else 'FAIL'}")
+    assert not changed
+    
+    # TODO: LEGACY_SUPPORT - без счетчика время считается по маскам
+    legacy = {'daily_masks': {'2025-06-09': '11'}}
+    set_project_bit(legacy, '2025-06-09', 2)
+    total = increment_total_minutes(legacy)
+    print(f"  Legacy проект без total_minutes: {'OK' if total == 15 else 'FAIL'}")
+    assert total == 15
+
+
+def test_journal():
+    """Тест журнала тиков и его сворачивания в db.json"""
+    print("\n=== Тест журнала тиков ===")
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(temp_dir, 'db.json')
+        data = {
+            'meta': {},
+            'projects': [
+                {'id': 'exlibrus', 'path': 'exlibrus', 'title': 'ExLibrus',
+                 'total_minutes': 0, 'aggregated_minutes': 0, 'daily_masks': {}},
+                {'id': 'exlibrus-frontend', 'path': 'exlibrus/frontend', 'title': 'Frontend',
+                 'total_minutes': 0, 'aggregated_minutes': 0, 'daily_masks': {}}
+            ]
+        }
+        
+        def save(data, path):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+        
+        save(data, db_path)
+        
+        journal_path = get_journal_path(db_path)
+        flags = FLAG_COMPUTER_ACTIVITY | FLAG_PROJECT_ACTIVITY
+        append_record(journal_path, make_record('2025-06-09', 0, 'exlibrus-frontend', flags))
+        append_record(journal_path, make_record('2025-06-09', 1, 'exlibrus-frontend', flags))
+        append_record(journal_path, make_record('2025-06-09', 1, 'exlibrus-frontend', flags))  # Повтор
+        append_record(journal_path, make_record('2025-06-09', 2, None, FLAG_COMPUTER_ACTIVITY))
+        
+        # Недописанная строка после сбоя не ломает чтение
+        with open(journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"d":"2025-06-09","s":')
+        
+        # Чтение без записи на диск
+        in_memory = json.loads(json.dumps(data))
+        applied = load_journal(in_memory, db_path)
+        print(f"  Применено записей: {applied} [{'OK' if applied == 4 else 'FAIL'}]")
+        assert applied == 4
+        
+        # Сворачивание
+        compacted = compact_journal(data, db_path, save)
+        with open(db_path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        
+        frontend, root = saved['projects'][1], saved['projects'][0]
+        passive = {name: to_legacy(mask) for name, mask in saved['meta']['passive_tracking']['daily_masks']['2025-06-09'].items()}
+        
+        checks = [
+            ("total_minutes", frontend['total_minutes'] == 10),
+            ("aggregated_minutes родителя", root['aggregated_minutes'] == 10),
+            ("пассивные маски", passive['computer_activity'][:3] == '111' and passive['project_activity'][:3] == '110'),
+            ("журнал удален", not os.path.exists(journal_path))
+        ]
+        for name, ok in checks:
+            print(f"  {name}: {'OK' if ok else 'FAIL'}")
+            assert ok
+        
+        print(f"  Свернуто записей: {compacted}")
+        
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_sqlite_storage():
+    """Тест SQLite хранилища: перенос из db.json и точечные операции"""
+    print("\n=== Тест SQLite хранилища ===")
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        json_storage = JsonStorage(os.path.join(temp_dir, 'db.json'))
+        json_storage.save({
+            'meta': {'work_hours': {'start': '08:00', 'end': '20:00'}},
+            'projects': [
+                {'id': 'exlibrus', 'path': 'exlibrus', 'title': 'ExLibrus', 'status': 'active',
+                 'fill_color': '#4CAF50', 'total_minutes': 5, 'aggregated_minutes': 5,
+                 'daily_masks': {'2025-06-09': '1'}},
+                {'id': 'exlibrus-frontend', 'path': 'exlibrus/frontend', 'title': 'Фронтенд', 'status': 'paused',
+                 'total_minutes': 0, 'aggregated_minutes': 0, 'daily_masks': {}}
+            ]
+        })
+        
+        # Запись в журнал меняет сигнатуру db.json (кеш веб-сервера и демон перечитают данные)
+        signature = json_storage.get_signature()
+        json_storage.commit_tick(json_storage.load(), make_record('2025-06-09', 5, None, FLAG_COMPUTER_ACTIVITY))
+        signature_ok = json_storage.get_signature() != signature
+        print(f"  Сигнатура учитывает журнал: {'OK' if signature_ok else 'FAIL'}")
+        assert signature_ok
+        
+        storage = SqliteStorage(os.path.join(temp_dir, 'db.sqlite'))
+        original = migrate_storage(json_storage, storage)
+        
+        # Полная загрузка возвращает те же данные
+        loaded = storage.load()
+        print(f"  Перенос без потерь: {'OK' if loaded == original else 'FAIL'}")
+        assert loaded == original
+        
+        # Точечные операции
+        found = storage.find_project('фронтенд')
+        print(f"  Поиск по title без учета регистра: {'OK' if found and found['id'] == 'exlibrus-frontend' else 'FAIL'}")
+        assert found and found['id'] == 'exlibrus-frontend'
+        
+        storage.set_project_status('exlibrus-frontend', 'active')
+        active = storage.get_active_project()
+        statuses = [p['status'] for p in storage.load_projects()]
+        print(f"  Единственный активный проект: {'OK' if active['id'] == 'exlibrus-frontend' and statuses.count('active') == 1 else 'FAIL'}")
+        assert active['id'] == 'exlibrus-frontend' and statuses.count('active') == 1
+        
+        # Тик: бит, total_minutes, aggregated_minutes предков, пассивные маски
+        flags = FLAG_COMPUTER_ACTIVITY | FLAG_PROJECT_ACTIVITY
+        storage.commit_tick(None, make_record('2025-06-09', 3, 'exlibrus-frontend', flags))
+        storage.commit_tick(None, make_record('2025-06-09', 3, 'exlibrus-frontend', flags))  # Повтор
+        
+        projects = {p['id']: p for p in storage.load_projects()}
+        passive = storage.get_passive_masks('2025-06-09')
+        checks = [
+            ("total_minutes", projects['exlibrus-frontend']['total_minutes'] == 5),
+            ("aggregated_minutes родителя", projects['exlibrus']['aggregated_minutes'] == 10),
+            ("маска проекта", to_legacy(projects['exlibrus-frontend']['daily_masks']['2025-06-09'])[:4] == '0001'),
+            ("пассивные маски", count_minutes(passive['project_activity']) == 5),
+            ("количество проектов", storage.count_projects() == 2)
+        ]
+        for name, ok in checks:
+            print(f"  {name}: {'OK' if ok else 'FAIL'}")
+            assert ok
+        
+        storage.close()
+        
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_concurrent_writes():
+    """Тест конкурентной записи: блокировка писателей, атомарная замена, счетчик версий"""
+    print("\n=== Тест конкурентной записи ===")
+    
+    import threading
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(temp_dir, 'db.json')
+        JsonStorage(db_path).save({
+            # Маленький порог: журнал сворачивается почти на каждом тике
+            'meta': {'counter': 0, 'journal': {'compact_threshold_bytes': 100}},
+            'projects': [
+                {'id': 'exlibrus', 'path': 'exlibrus', 'title': 'ExLibrus', 'status': 'active',
+                 'total_minutes': 0, 'aggregated_minutes': 0, 'daily_masks': {}}
+            ]
+        })
+        
+        def increment(data):
+            data['meta']['counter'] += 1
+            return data['meta']['counter']
+        
+        def writer():
+            storage = JsonStorage(db_path)
+            for _ in range(20):
+                storage.update(increment)
+        
+        def ticker():
+            # Трекер держит данные в памяти и не перечитывает их между тиками
+            storage = JsonStorage(db_path)
+            data = storage.load(compact=False)
+            for slot in range(40):
+                storage.commit_tick(data, make_record('2025-06-09', slot, 'exlibrus', FLAG_COMPUTER_ACTIVITY))
+        
+        threads = [threading.Thread(target=writer) for _ in range(3)] + [threading.Thread(target=ticker)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        data = JsonStorage(db_path).load()
+        project = data['projects'][0]
+        leftovers = [name for name in os.listdir(temp_dir) if name.endswith('.tmp')]
+        checks = [
+            ("нет потерянных обновлений", data['meta']['counter'] == 60),
+            ("нет потерянных тиков", count_minutes(project['daily_masks']['2025-06-09']) == 200),
+            ("total_minutes", project['total_minutes'] == 200),
+            ("временные файлы удалены", not leftovers)
+        ]
+        for name, ok in checks:
+            print(f"  {name}: {'OK' if ok else 'FAIL'}")
+            assert ok
+        
+        # Сохранение устаревших данных отклоняется
+        for storage in (JsonStorage(db_path), SqliteStorage(os.path.join(temp_dir, 'db.sqlite'))):
+            if storage.backend == 'sqlite':
+                storage.save(JsonStorage(db_path).load())
+            stale = storage.load()
+            fresh = storage.load()
+            fresh['meta']['counter'] += 1
+            storage.save(fresh)
+            try:
+                storage.save(stale)
+                conflict = False
+            except ConflictError:
+                conflict = True
+            print(f"  ConflictError для устаревших данных ({storage.backend}): {'OK' if conflict else 'FAIL'}")
+            assert conflict
+            storage.close()
+        
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_history_shards():
+    """Тест помесячных шардов истории: db.json хранит только текущий месяц"""
+    print("\n=== Тест шардов истории ===")
+    
+    from datetime import date, timedelta
+    
+    hot_month = get_hot_month()
+    today = date.today().isoformat()
+    last_month_day = (date.today().replace(day=1) - timedelta(days=1)).isoformat()
+    old_day = (date.today().replace(day=1) - timedelta(days=40)).isoformat()
+    
+    checks_months = get_months_in_range('2024-11-30', '2025-02-01') == ['2024-11', '2024-12', '2025-01', '2025-02']
+    print(f"  Месяцы диапазона: {'OK' if checks_months else 'FAIL'}")
+    assert checks_months
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        data = {
+            'meta': {'passive_tracking': {'enabled': True, 'daily_masks': {
+                old_day: {'computer_activity': format_mask(0b11)},
+                today: {'computer_activity': format_mask(0b1)}
+            }}},
+            'projects': [
+                {'id': 'exlibrus', 'path': 'exlibrus', 'title': 'ExLibrus', 'status': 'active',
+                 'total_minutes': 20, 'aggregated_minutes': 20,
+                 'daily_masks': {old_day: format_mask(0b1), last_month_day: format_mask(0b10),
+                                 today: format_mask(0b11)}}
+            ]
+        }
+        
+        for storage in (JsonStorage(os.path.join(temp_dir, 'db.json')),
+                        SqliteStorage(os.path.join(temp_dir, 'db.sqlite'))):
+            storage.save(json.loads(json.dumps(data)))
+            
+            hot = storage.load(history=False)
+            full = storage.load()
+            hot_dates = set(hot['projects'][0]['daily_masks'])
+            checks = [
+                ("без истории - только текущий месяц", all(d[:7] >= hot_month for d in hot_dates)),
+                ("полная загрузка без потерь", full['projects'][0]['daily_masks'] == data['projects'][0]['daily_masks']),
+                ("пассивные маски истории", old_day in full['meta']['passive_tracking']['daily_masks']),
+                ("месяцы истории", storage.get_history_months() == sorted({old_day[:7], last_month_day[:7]}))
+            ]
+            
+            # Сохранение данных без истории не теряет архивные месяцы
+            storage.save(hot)
+            loaded = storage.load(history=False)
+            storage.load_history(loaded, [old_day[:7]])
+            checks.append(("сохранение без истории", storage.load()['projects'][0]['daily_masks'] == data['projects'][0]['daily_masks']))
+            checks.append(("догрузка одного месяца", set(loaded['projects'][0]['daily_masks']) == hot_dates | {old_day}))
+            
+            for name, ok in checks:
+                print(f"  {name} ({storage.backend}): {'OK' if ok else 'FAIL'}")
+                assert ok
+            storage.close()
+        
+        # db.json не содержит прошлых месяцев, шарды лежат в history/
+        with open(os.path.join(temp_dir, 'db.json'), 'r', encoding='utf-8') as f:
+            document = json.load(f)
+        shards = list_history_months(os.path.join(temp_dir, 'history'))
+        ok = old_day not in document['projects'][0]['daily_masks'] and old_day[:7] in shards
+        print(f"  Файлы history/YYYY-MM.json: {'OK' if ok else 'FAIL'}")
+        assert ok
+        
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_journal_history():
+    """Тест журнала с записями прошлого месяца: уже учтенный слот не увеличивает время повторно"""
+    print("\n=== Тест журнала за прошлый месяц ===")
+    
+    from datetime import date, timedelta
+    
+    today = date.today().isoformat()
+    last_month_day = (date.today().replace(day=1) - timedelta(days=1)).isoformat()
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(temp_dir, 'db.json')
+        storage = JsonStorage(db_path)
+        # Слот 0 прошлого месяца уже учтен в total_minutes и лежит в шарде истории
+        storage.save({
+            'meta': {},
+            'projects': [
+                {'id': 'exlibrus', 'path': 'exlibrus', 'title': 'ExLibrus', 'status': 'active',
+                 'total_minutes': 5, 'aggregated_minutes': 5,
+                 'daily_masks': {last_month_day: format_mask(0b1)}}
+            ]
+        })
+        
+        # Остаток прерванного сворачивания (db.json уже сохранен) и новые тики:
+        # слот 1 прошлого месяца и слот 0 сегодня
+        journal_path = get_journal_path(db_path)
+        append_record(journal_path + '.compacting', make_record(last_month_day, 0, 'exlibrus', 0))
+        append_record(journal_path, make_record(last_month_day, 1, 'exlibrus', 0))
+        append_record(journal_path, make_record(today, 0, 'exlibrus', 0))
+        
+        hot = storage.load(compact=False, history=False)['projects'][0]
+        lazy = storage.load(compact=False, masks=False)['projects'][0]
+        compacted = storage.load()['projects'][0]
+        reloaded = storage.load(history=False)['projects'][0]
+        shard = read_shard(os.path.join(temp_dir, 'history'), last_month_day[:7])
+        
+        checks = [
+            ("без истории", hot['total_minutes'] == 15),
+            ("ленивые маски", lazy['total_minutes'] == 15 and parse_mask(lazy['daily_masks'][last_month_day]) == 0b11),
+            ("сворачивание", compacted['total_minutes'] == 15 and compacted['aggregated_minutes'] == 15),
+            ("после сворачивания", reloaded['total_minutes'] == 15 and last_month_day not in reloaded['daily_masks']),
+            ("маска в шарде", parse_mask(shard['projects']['exlibrus'][last_month_day]) == 0b11),
+            ("журнал свернут", not os.path.exists(journal_path) and not os.path.exists(journal_path + '.compacting')),
+        ]
+        for name, ok in checks:
+            print(f"  {name}: {'OK' if ok else 'FAIL'}")
+            assert ok
+        
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_lazy_masks():
+    """Тест загрузки только метаданных: маски проекта загружаются при первом обращении"""
+    print("\n=== Тест ленивой загрузки масок ===")
+    
+    from datetime import date, timedelta
+    
+    today = date.today().isoformat()
+    old_day = (date.today().replace(day=1) - timedelta(days=40)).isoformat()
+    masks = {old_day: format_mask(0b1), today: format_mask(0b11)}
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        for storage in (JsonStorage(os.path.join(temp_dir, 'db.json')),
+                        SqliteStorage(os.path.join(temp_dir, 'db.sqlite'))):
+            storage.save({
+                'meta': {},
+                'projects': [
+                    {'id': 'exlibrus', 'path': 'exlibrus', 'title': 'ExLibrus', 'status': 'active',
+                     'total_minutes': 15, 'aggregated_minutes': 15, 'daily_masks': dict(masks)}
+                ]
+            })
+            
+            data = storage.load(compact=False, history=False, masks=False)
+            project = data['projects'][0]
+            lazy = project['daily_masks']
+            checks = [
+                ("маски не загружены", isinstance(lazy, LazyMasks) and not lazy.is_loaded),
+                ("метаданные доступны", project['title'] == 'ExLibrus' and project['total_minutes'] == 15),
+                ("первое обращение загружает маски с историей", dict(lazy) == masks and lazy.is_loaded),
+                ("точечный поиск без масок", not type(storage)(storage.path).find_project('exlibrus')['daily_masks'].is_loaded)
+            ]
+            
+            # Сохранение данных с ленивыми масками не теряет маски
+            unloaded = storage.load(compact=False, history=False, masks=False)
+            unloaded['projects'][0]['status'] = 'paused'
+            storage.save(unloaded)
+            saved = storage.load()['projects'][0]
+            checks.append(("сохранение", saved['daily_masks'] == masks and saved['status'] == 'paused'))
+            
+            for name, ok in checks:
+                print(f"  {name} ({storage.backend}): {'OK' if ok else 'FAIL'}")
+                assert ok
+            storage.close()
+        
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_analytics():
+    """Тест структурированной аналитики пассивного отслеживания"""
+    print("\n=== Тест аналитики ===")
+    
+    data = {'meta': {'passive_tracking': {'enabled': True, 'daily_masks': {
+        '2025-06-09': {
+            'computer_activity': '1111',
+            'project_activity': '1100',
+            'idle_periods': '0000' + '1' * 12,
+            'untracked_work': '0011'
+        }
+    }}}}
+    
+    stats = calculate_passive_stats(data)
+    timeline = calculate_passive_timeline(data, '2025-06-09')
+    missing = calculate_passive_stats(data, '2025-06-10')
+    
+    checks = [
+        ("последняя дата по умолчанию", stats['date'] == '2025-06-09'),
+        ("минуты", (stats['computer_minutes'], stats['project_minutes'], stats['idle_minutes']) == (20, 10, 60)),
+        ("продуктивность", stats['productivity'] == 50.0 and stats['productivity_level'] == 'normal'),
+        ("рекомендации", len(stats['recommendations']) == 1),
+        ("временная шкала", timeline['hours'][0] == {'hour': '08:00', 'slots': 'PPAAIIIIIIII'} and len(timeline['hours']) == 12),
+        ("нет данных за дату", missing['error'] == ERROR_NO_DATE and missing['available_dates'] == ['2025-06-09']),
+    ]
+    
+    # Диапазон дат: 2025-06-09 - понедельник, 2025-06-16 - следующая неделя
+    data['projects'] = [{'id': 'exlibrus', 'title': 'ExLibrus', 'daily_masks': {'2025-06-09': '11', '2025-06-16': '1' + '0' * 12 + '1'}}]
+    by_hour = calculate_range_timeline(data, '2025-06-09', '2025-06-09', 'hour')
+    by_week = calculate_range_timeline(data, '2025-06-08', '2025-06-16', 'week')
+    checks += [
+        ("диапазон по часам", len(by_hour['buckets']) == 12 and by_hour['buckets'][0]['active_minutes'] == 20),
+        ("диапазон по неделям", [b['start'] for b in by_week['buckets']] == ['2025-06-02', '2025-06-09', '2025-06-16']),
+        ("проекты в диапазоне", by_week['totals']['projects'][0]['minutes'] == 20 and by_week['buckets'][2]['projects'][0]['minutes'] == 10),
+    ]
+    
+    # Старый формат: проекты без id не сливаются в один
+    legacy = {'projects': [
+        {'title': 'ExLibrus', 'daily_masks': {'2025-06-09': '111'}},
+        {'title': 'Б24-активити', 'daily_masks': {'2025-06-09': '1'}},
+    ]}
+    legacy_totals = calculate_range_timeline(legacy, '2025-06-09', '2025-06-09', 'day')['totals']['projects']
+    checks += [
+        ("проекты без id в диапазоне", [(p['id'], p['title'], p['minutes']) for p in legacy_totals] == [
+            ('exlibrus', 'ExLibrus', 15), ('b24-aktiviti', 'Б24-активити', 5)
+        ]),
+    ]
+    
+    for name, ok in checks:
+        print(f"  {name}: {'OK' if ok else 'FAIL'}")
+        assert ok
+    
+    try:
+        calculate_range_timeline(data, '2025-06-10', '2025-06-09')
+        assert False, "Ожидалась ошибка для обратного диапазона"
+    except ValueError:
+        print("  Обратный диапазон: OK")
+
+
+def test_window_titles():
+    """Тест заголовков активных окон по слотам: журнал, шарды истории, SQLite, время по приложениям"""
+    print("\n=== Тест заголовков окон ===")
+    
+    from datetime import date, timedelta
+    
+    today = date.today().isoformat()
+    old_day = (date.today().replace(day=1) - timedelta(days=40)).isoformat()
+    
+    # Больше 255 заголовков - 2 байта на слот
+    wide_slots = [0] * 143 + [300]
+    checks = [
+        ("массив слотов 2 байта", parse_window_slots(format_window_slots(wide_slots)) == wide_slots),
+        ("название приложения", get_application_name('main.py - tracker - Visual Studio Code') == 'Visual Studio Code'),
+    ]
+    
+    editor = 'main.py - tracker - Visual Studio Code'
+    records = [
+        make_record(old_day, 0, None, FLAG_COMPUTER_ACTIVITY, editor),
+        # Повторный тик в занятый слот не меняет заголовок
+        make_record(old_day, 0, None, FLAG_COMPUTER_ACTIVITY, 'Telegram'),
+        make_record(old_day, 1, None, FLAG_COMPUTER_ACTIVITY, 'Telegram'),
+        make_record(today, 2, None, FLAG_COMPUTER_ACTIVITY, 'Telegram'),
+        # Простой: заголовок не засчитывается
+        make_record(today, 3, None, FLAG_IDLE_PERIODS, 'Screensaver')
+    ]
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        for storage in (JsonStorage(os.path.join(temp_dir, 'db.json')),
+                        SqliteStorage(os.path.join(temp_dir, 'db.sqlite'))):
+            storage.save({'meta': {'passive_tracking': {'enabled': True, 'daily_masks': {}}}, 'projects': []})
+            
+            data = storage.load()
+            for record in records + records:
+                storage.commit_tick(data, record)
+            
+            full = storage.load()
+            passive = full['meta']['passive_tracking']
+            old_usage = calculate_window_usage(full, old_day)
+            today_usage = calculate_window_usage(full, today)
+            checks += [
+                (f"таблица заголовков ({storage.backend})", passive['window_titles'] == [editor, 'Telegram']),
+                (f"время по приложениям ({storage.backend})",
+                 [(a['application'], a['minutes']) for a in old_usage['applications']] == [('Telegram', 5), ('Visual Studio Code', 5)]),
+                (f"простой не засчитан ({storage.backend})", today_usage['total_minutes'] == 5),
+                (f"без истории ({storage.backend})",
+                 old_day not in storage.load(history=False)['meta']['passive_tracking'].get('daily_windows', {})),
+            ]
+            
+            # Сохранение данных без истории не теряет заголовки прошлых месяцев
+            storage.save(storage.load(history=False))
+            checks.append((f"сохранение без истории ({storage.backend})",
+                           calculate_window_usage(storage.load(), old_day)['total_minutes'] == 10))
+            storage.close()
+        
+        shard = read_shard(os.path.join(temp_dir, 'history'), old_day[:7])
+        checks.append(("заголовки в шарде", old_day in shard['windows']))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    for name, ok in checks:
+        print(f"  {name}: {'OK' if ok else 'FAIL'}")
+        assert ok
+
+
+def test_activity_sampler():
+    """Тест кольцевого буфера замеров активности: слот по доле активных замеров"""
+    print("\n=== Тест замеров активности ===")
+    
+    import time
+    from core.active import ActivitySampler, UserActivityMonitor, create_activity_sampler_from_config
+    
+    sampler = ActivitySampler(interval_seconds=10)
+    # 30 замеров за 5 минут: активны первые 9 (бездействие 2с), дальше простой
+    for i in range(30):
+        sampler.add(2.0 if i < 9 else 15.0 + i, timestamp=1000.0 + i * 10)
+    fraction, samples = sampler.get_active_fraction(now=1295.0)
+    
+    # Буфер фиксированного размера: старые замеры перезаписываются
+    for i in range(100):
+        sampler.add(0.0, timestamp=2000.0 + i * 10)
+    wrapped_fraction, wrapped_samples = sampler.get_active_fraction(now=2995.0)
+    
+    class FakeMonitor(UserActivityMonitor):
+        idle = 0.0
+        
+        def get_idle_time(self):
+            return self.idle
+        
+        def get_active_window_title(self):
+            return ''
+    
+    no_samples = FakeMonitor(sampler=ActivitySampler(interval_seconds=10)).get_full_activity_report()
+    
+    monitor = FakeMonitor(sampler=ActivitySampler(interval_seconds=10), active_fraction_threshold=0.5)
+    start = time.monotonic() - 290
+    for i in range(29):
+        monitor.sampler.add(100.0, timestamp=start + i * 10)
+    # Мгновенный замер - активен, но большую часть слота пользователь отсутствовал
+    report = monitor.get_full_activity_report()
+    
+    checks = [
+        ("доля активных замеров", (round(fraction, 2), samples) == (0.3, 30)),
+        ("кольцевой буфер", len(sampler) == sampler.size and (wrapped_fraction, wrapped_samples) == (1.0, 30)),
+        ("мало замеров - мгновенный замер", no_samples['is_active'] and 'active_fraction' not in no_samples),
+        ("слот по доле замеров", not report['is_active'] and report['samples'] == 30),
+        ("замеры выключены", create_activity_sampler_from_config(
+            {'meta': {'activity_monitoring': {'sample_interval_seconds': 0}}}) is None),
+    ]
+    
+    for name, ok in checks:
+        print(f"  {name}: {'OK' if ok else 'FAIL'}")
+        assert ok
+
+
+def test_activity_backends():
+    """Тест источников активности: файл замеров, /proc/interrupts, выбор по настройкам"""
+    print("\n=== Тест источников активности ===")
+    
+    from core.active import create_activity_monitor_from_config
+    from core.activity_backends import ProcInterruptsBackend, create_activity_backend, REPLAY_ENV_VAR
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        replay_path = os.path.join(temp_dir, 'idle.txt')
+        with open(replay_path, 'w', encoding='utf-8') as f:
+            f.write("# секунды бездействия | заголовок окна\n1.5 | main.py - Visual Studio Code\n400\n")
+        
+        config = {'meta': {'activity_monitoring': {'backend': 'replay', 'replay_file': replay_path}}}
+        monitor = create_activity_monitor_from_config(config)
+        reports = [monitor.get_full_activity_report() for _ in range(3)]
+        
+        os.environ[REPLAY_ENV_VAR] = replay_path
+        try:
+            env_backend = create_activity_backend({'backend': 'windows'}).name
+        finally:
+            del os.environ[REPLAY_ENV_VAR]
+        
+        # Счетчики прерываний: "IRQ: CPU0 CPU1 ... описание"
+        interrupts_path = os.path.join(temp_dir, 'interrupts')
+        
+        def write_interrupts(count):
+            with open(interrupts_path, 'w', encoding='utf-8') as f:
+                f.write(f"           CPU0       CPU1\n  1:  {count}  3  IO-APIC  1-edge  i8042\n 26:  99  0  IO-APIC  4-edge  ttyS0\n")
+        
+        write_interrupts(10)
+        backend = ProcInterruptsBackend(path=interrupts_path)
+        input_total = backend.read_input_interrupts()
+        first = backend.get_idle_time(now=100.0)
+        unchanged = backend.get_idle_time(now=160.0)
+        write_interrupts(11)
+        changed = backend.get_idle_time(now=170.0)
+        
+        # Разовые запуски: каждый тик - новый источник, состояние в файле
+        state_path = os.path.join(temp_dir, 'activity_state.json')
+        cold_idle = []
+        for now, count in ((1000.0, 11), (1300.0, 11), (1600.0, 12), (1900.0, 12)):
+            write_interrupts(count)
+            cold_idle.append(ProcInterruptsBackend(path=interrupts_path, state_path=state_path).get_idle_time(now=now))
+        
+        replay_config = {'backend': 'replay', 'replay_file': replay_path, 'replay_loop': False}
+        cold_replay = [create_activity_backend(replay_config, state_path).get_idle_time() for _ in range(4)]
+        with open(state_path, 'r', encoding='utf-8') as f:
+            saved_sections = sorted(json.load(f))
+        
+        checks = [
+            ("замеры из файла", [r['is_active'] for r in reports] == [True, False, True]),
+            ("заголовок окна из файла", reports[0]['active_window'] == 'main.py - Visual Studio Code' and reports[1]['active_window'] == ''),
+            ("источник в отчете", reports[0]['backend'] == 'replay'),
+            ("переменная окружения", env_backend == 'replay'),
+            ("счетчики устройств ввода", input_total == 13),
+            ("бездействие по прерываниям", (first, unchanged, changed) == (0.0, 60.0, 0.0)),
+            ("прерывания между запусками", cold_idle == [0.0, 300.0, 0.0, 300.0]),
+            ("позиция replay между запусками", cold_replay == [1.5, 400.0, 400.0, 400.0]),
+            ("общий файл состояния", saved_sections == ['proc_interrupts', 'replay']),
+        ]
+        
+        try:
+            create_activity_backend({'backend': 'unknown'})
+            checks.append(("неизвестный источник", False))
+        except ValueError:
+            checks.append(("неизвестный источник", True))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    for name, ok in checks:
+        print(f"  {name}: {'OK' if ok else 'FAIL'}")
+        assert ok
+
+
+def test_benchmarks():
+    """Тест генератора синтетической БД и прогона бенчмарков"""
+    print("\n=== Тест бенчмарков ===")
+    
+    from datetime import date
+    from benchmarks.generate_db import generate_db
+    from benchmarks.run_benchmarks import run_benchmarks
+    
+    data = generate_db(projects=12, depth=3, years=0.2, windows=True, seed=7, end_date=date(2024, 3, 29))
+    again = generate_db(projects=12, depth=3, years=0.2, windows=True, seed=7, end_date=date(2024, 3, 29))
+    projects = data['projects']
+    passive = data['meta']['passive_tracking']
+    roots = [p for p in projects if '/' not in p['path']]
+    
+    env_before = os.environ.get('TRACKER_DB')
+    report = run_benchmarks(projects=8, depth=2, years=0.1, repeat=2, only=['load_db', 'quick_track'])
+    names = [result['name'] for result in report['results']]
+    
+    checks = [
+        ("детерминированность по seed", data == again),
+        ("глубина иерархии", max(p['path'].count('/') for p in projects) <= 2),
+        ("total_minutes по маскам", all(p['total_minutes'] == sum(count_minutes(m) for m in p['daily_masks'].values()) for p in projects)),
+        ("агрегаты корней", sum(p['aggregated_minutes'] for p in roots) == sum(p['total_minutes'] for p in projects)),
+        ("пассивные маски и окна", set(passive['daily_windows']) <= set(passive['daily_masks']) and passive['window_titles']),
+        ("сценарии отчета", names == ['load_db', 'load_db(meta)', 'quick_track']),
+        ("статистика замеров", all(r['runs'] == 2 and r['min_ms'] <= r['median_ms'] <= r['max_ms'] for r in report['results'])),
+        ("размер БД", report['environment']['db_size_bytes'] > 0),
+        ("переменные окружения восстановлены", os.environ.get('TRACKER_DB') == env_before),
+    ]
+    
+    for name, ok in checks:
+        print(f"  {name}: {'OK' if ok else 'FAIL'}")
+        assert ok
+
+
+def test_metrics():
+    """Тест метрик /metrics: текстовый формат, размер хранилища, последний слот"""
+    print("\n=== Тест метрик ===")
+    
+    from core.metrics import MetricsRegistry
+    from core.analytics import find_last_tracked_slot
+    
+    registry = MetricsRegistry()
+    requests_total = registry.counter('test_requests_total', 'Запросы', ('route', 'status'))
+    duration = registry.histogram('test_duration_seconds', 'Время', ('route',), buckets=(0.01, 0.1))
+    registry.gauge('test_projects', 'Проекты', ('status',), lambda: {('active',): 1, ('paused',): 2})
+    registry.gauge('test_unknown', 'Нет значения', function=lambda: None)
+    registry.gauge('test_broken', 'Ошибка', function=lambda: 1 / 0)
+    
+    requests_total.inc(route='/api/projects', status='200')
+    requests_total.inc(route='/api/projects', status='200')
+    requests_total.inc(route='say "hi"', status='404')
+    for value in (0.005, 0.05, 0.5):
+        duration.observe(value, route='/api/projects')
+    text = registry.render()
+    
+    try:
+        requests_total.inc(route='/api/projects')
+        labels_checked = False
+    except ValueError:
+        labels_checked = True
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(temp_dir, 'db.json')
+        storage = JsonStorage(db_path)
+        storage.save({'meta': {}, 'projects': [{'id': 'a', 'path': 'a', 'title': 'A', 'status': 'active',
+                                                'daily_masks': {'2020-01-15': format_mask(1 << 3)}}]})
+        usage = storage.get_disk_usage()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    data = {'projects': [
+        {'id': 'a', 'daily_masks': {'2025-06-09': format_mask(1 << 30), '2025-06-10': format_mask(0)}},
+        {'id': 'b', 'daily_masks': {'2025-06-09': format_mask(1 << 40 | 1)}},
+        {'id': 'c', 'daily_masks': {}}
+    ]}
+    last = find_last_tracked_slot(data)
+    
+    checks = [
+        ("заголовки", '# TYPE test_requests_total counter' in text and '# TYPE test_duration_seconds histogram' in text),
+        ("счетчик", 'test_requests_total{route="/api/projects",status="200"} 2' in text),
+        ("экранирование меток", 'route="say \\"hi\\""' in text),
+        ("накопительные бакеты", 'test_duration_seconds_bucket{route="/api/projects",le="0.01"} 1' in text
+            and 'le="0.1"} 2' in text and 'le="+Inf"} 3' in text),
+        ("сумма и количество", 'test_duration_seconds_count{route="/api/projects"} 3' in text
+            and 'test_duration_seconds_sum{route="/api/projects"} 0.555' in text),
+        ("gauge с метками", 'test_projects{status="paused"} 2' in text),
+        ("gauge без значения и с ошибкой", '\ntest_unknown ' not in text and '# TYPE test_broken gauge' in text),
+        ("проверка меток", labels_checked),
+        ("размер хранилища", usage['db'] > 0 and usage['journal'] == 0 and usage['history'] > 0),
+        ("последний слот", last == {'date': '2025-06-09', 'slot': 40, 'project_id': 'b', 'minutes_of_day': 8 * 60 + 200}),
+        ("нет записей", find_last_tracked_slot({'projects': []}) is None),
+        ("последний слот проекта без id", find_last_tracked_slot({'projects': [
+            {'title': 'ExLibrus', 'daily_masks': {'2025-06-09': format_mask(1)}},
+            {'title': 'Б24-активити', 'daily_masks': {'2025-06-09': format_mask(1 << 5)}}
+        ]})['project_id'] == 'b24-aktiviti'),
+    ]
+    
+    for name, ok in checks:
+        print(f"  {name}: {'OK' if ok else 'FAIL'}")
+        assert ok
+
+
+def test_http_cache():
+    """Тест HTTP кеширования: ETag, If-None-Match, выбор и сжатие gzip"""
+    print("\n=== Тест HTTP кеширования ===")
+    
+    import gzip
+    from core.http_cache import make_etag, etag_matches, accepts_gzip, should_compress, gzip_body
+    
+    etag = make_etag('db.json', (1, 2, 0, 0), '/api/projects?', '2025-06-09')
+    body = json.dumps({'projects': [{'title': 'Проект', 'daily_masks': {}}] * 100}, ensure_ascii=False).encode('utf-8')
+    
+    checks = [
+        ("ETag стабилен", etag == make_etag('db.json', (1, 2, 0, 0), '/api/projects?', '2025-06-09')),
+        ("ETag меняется с БД", etag != make_etag('db.json', (1, 3, 0, 0), '/api/projects?', '2025-06-09')),
+        ("ETag меняется с датой", etag != make_etag('db.json', (1, 2, 0, 0), '/api/projects?', '2025-06-10')),
+        ("If-None-Match совпадает", etag_matches(f'"other", {etag}', etag) and etag_matches('*', etag)),
+        ("слабое сравнение", etag_matches(etag[2:], etag)),
+        ("If-None-Match не совпадает", not etag_matches('W/"other"', etag) and not etag_matches('', etag)),
+        ("Accept-Encoding", accepts_gzip('gzip, deflate, br') and accepts_gzip('br;q=1.0, *;q=0.5')),
+        ("gzip запрещен", not accepts_gzip('gzip;q=0') and not accepts_gzip('identity') and not accepts_gzip(None)),
+        ("сжимать крупный JSON", should_compress(len(body), 'application/json', 'gzip')),
+        ("не сжимать", not should_compress(100, 'application/json', 'gzip')
+            and not should_compress(len(body), 'image/png', 'gzip')
+            and not should_compress(len(body), 'application/json', 'gzip', content_encoding='gzip')),
+        ("gzip детерминирован", gzip_body(body) == gzip_body(body) and gzip.decompress(gzip_body(body)) == body),
+        ("gzip уменьшает ответ", len(gzip_body(body)) < len(body) / 5),
+    ]
+    
+    for name, ok in checks:
+        print(f"  {name}: {'OK' if ok else 'FAIL'}")
+        assert ok
+
+
+def test_project_query():
+    """Тест параметров /api/projects: поля, маски, фильтры и страницы"""
+    print("\n=== Тест параметров списка проектов ===")
+    
+    from core.project_query import parse_project_query, apply_project_query, select_daily_masks
+    
+    today = '2025-06-09'
+    projects = [
+        {'id': 'a', 'path': 'exlibrus', 'title': 'A', 'status': 'active', 'daily_masks': {}},
+        {'id': 'b', 'path': 'exlibrus/frontend', 'title': 'B', 'status': 'paused', 'daily_masks': {}},
+        {'id': 'c', 'path': 'exlibrus-old', 'title': 'C', 'status': 'paused', 'daily_masks': {}},
+        {'id': 'd', 'path': 'home', 'title': 'D', 'status': 'completed', 'daily_masks': {}},
+    ]
+    
+    default = parse_project_query({}, today)
+    today_masks = parse_project_query({'include_masks': 'today'}, today)
+    ranged = parse_project_query({'include_masks': 'range', 'from': '2025-06-03', 'to': '2025-06-09'}, today)
+    no_masks = parse_project_query({'fields': 'id,title', 'include_masks': 'range', 'from': '2025-06-01', 'to': '2025-06-09'}, today)
+    
+    page = apply_project_query(projects, parse_project_query({'status': 'paused,active', 'limit': '2', 'offset': '1'}, today))
+    subtree = apply_project_query(projects, parse_project_query({'path': 'exlibrus/', 'fields': 'id,daily_masks'}, today))
+    
+    errors = 0
+    for args in ({'fields': 'id,secret'}, {'include_masks': 'week'}, {'include_masks': 'range', 'from': '2025-06-09'},
+                 {'include_masks': 'range', 'from': '2025-06-09', 'to': '2025-06-01'},
+                 {'include_masks': 'range', 'from': '2025-01-01', 'to': '2025-06-01'},
+                 {'status': 'deleted'}, {'limit': '0'}, {'offset': '-1'}, {'limit': 'many'}):
+        try:
+            parse_project_query(args, today)
+        except ValueError:
+            errors += 1
+    
+    masks = {'2025-06-01': 'x', '2025-06-05': 'y', '2025-06-09': 'z'}
+    
+    checks = [
+        ("по умолчанию - все маски", (default['include_masks'], default['date_from'], default['date_to']) == ('all', None, None)),
+        ("маски за сегодня", (today_masks['date_from'], today_masks['date_to']) == (today, today)),
+        ("диапазон масок", (ranged['date_from'], ranged['date_to']) == ('2025-06-03', '2025-06-09')),
+        ("без поля daily_masks маски не строятся", no_masks['include_masks'] == 'none' and no_masks['fields'] == ('id', 'title')),
+        ("фильтр статусов и страница", [p['id'] for p in page['projects']] == ['b', 'c'] and page['total'] == 3 and not page['has_more']),
+        ("поддерево по path", [p['id'] for p in subtree['projects']] == ['a', 'b'] and subtree['has_more'] is False),
+        ("выбор полей", subtree['projects'][0] == {'id': 'a', 'daily_masks': {}}),
+        ("исходный список не изменен", 'title' in projects[0]),
+        ("ошибки параметров", errors == 9),
+        ("маски диапазона", sorted(select_daily_masks(masks, '2025-06-02', '2025-06-09')) == ['2025-06-05', '2025-06-09']),
+        ("маска дня", select_daily_masks(masks, '2025-06-05', '2025-06-05') == {'2025-06-05': 'y'}),
+    ]
+    
+    for name, ok in checks:
+        print(f"  {name}: {'OK' if ok else 'FAIL'}")
+        assert ok
+
+
+def test_tracker_log():
+    """Тест буферизованного лога трекера и его ротации"""
+    print("\n=== Тест лога трекера ===")
+    
+    from datetime import datetime
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        log_path = os.path.join(temp_dir, 'tracker.log')
+        now = datetime(2025, 6, 9, 10, 5)
+        
+        # Записи тика копятся в буфере, вложенный блок (функция тика) не сбрасывает его
+        log = TickLog(log_path, max_bytes=400, backup_count=2)
+        with log:
+            log.event(now, 'ACTIVITY', 'Active: True')
+            with open_tick_log(log) as nested:
+                nested.write("2025-06-09 10:05:00 | ExLibrus | BIT_SET | Position: 25")
+            buffered = not os.path.exists(log_path)
+        
+        with open(log_path, 'r', encoding='utf-8') as f:
+            written = f.read().splitlines()
+        
+        checks = [
+            ("запись одной операцией при выходе из блока", buffered and len(written) == 2),
+            ("формат строки", written[0] == "2025-06-09 10:05:00 | ACTIVITY | Active: True")
+        ]
+        for name, ok in checks:
+            print(f"  {name}: {'OK' if ok else 'FAIL'}")
+            assert ok
+        
+        # Ротация по размеру: каждый тик ~120 байт, сегменты сжимаются, хранится не больше 2
+        for tick in range(20):
+            with log:
+                log.event(now, 'TICK', f'N: {tick:03d}', 'x' * 80)
+        
+        segments = list_log_segments(log_path)
+        last = tail_lines(log_path, 5)
+        found = list(grep_lines(log_path, r'N: 01[0-9]'))
+        
+        checks = [
+            ("текущий лог не больше max_bytes", os.path.getsize(log_path) <= 400),
+            ("архивные сегменты сжаты", len(segments) == 2 and all(path.endswith('.gz') for path in segments)),
+            ("tail читает через границу сегментов", len(last) == 5 and last[-1].split(' | ')[2] == 'N: 019'),
+            ("grep по .gz сегментам", [line.split(' | ')[2] for line in found] == [f'N: 0{n}' for n in range(11, 20)])
+        ]
+        for name, ok in checks:
+            print(f"  {name}: {'OK' if ok else 'FAIL'}")
+            assert ok
+        
+        print(f"  Сегментов: {len(segments)}, найдено grep: {len(found)}")
+        
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_log_index():
+    """Тест колоночного индекса tracker.log"""
+    print("\n=== Тест индекса лога ===")
+    
+    from datetime import datetime
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        log_path = os.path.join(temp_dir, 'tracker.log')
+        log = TickLog(log_path, max_bytes=600, backup_count=None)
+        
+        # Два дня тиков: окна чередуются, один тик - простой
+        ticks = [
+            ('2025-06-09', 10, 0, 'ExLibrus', "Code - app.py | ExLibrus", True),
+            ('2025-06-09', 10, 5, 'ExLibrus', "Code - app.py | ExLibrus", True),
+            ('2025-06-09', 10, 10, 'ExLibrus', 'Firefox', True),
+            ('2025-06-09', 10, 15, 'ExLibrus', 'Firefox', False),
+            ('2025-06-10', 11, 0, 'Admin Tasks', 'Firefox', True),
+            ('2025-06-10', 11, 5, 'ExLibrus', "Code - app.py | ExLibrus", True)
+        ]
+        for date, hour, minute, project, window, active in ticks:
+            now = datetime.strptime(date, '%Y-%m-%d').replace(hour=hour, minute=minute)
+            with log:
+                log.event(now, 'ACTIVITY', f'Active: {active}', f'Idle: {0.0 if active else 400.0}s',
+                          'Level: active', f"Window: '{window}'")
+                if active:
+                    log.event(now, project, 'BIT_SET', 'Position: 0', 'REASON: user_active')
+                else:
+                    log.event(now, project, 'BIT_SKIP', 'Position: 0', 'REASON: user_idle')
+                log.event(now, 'HIERARCHY_UPDATE', 'Updated paths: exlibrus')
+        
+        index, rebuilt = load_or_build_index(log_path)
+        top = index.top_windows(project='exlibrus')
+        week = index.top_windows('2025-06-09', '2025-06-10', limit=1)
+        day = index.day_summary('2025-06-09')
+        reasons = index.reasons_summary(project='ExLibrus')
+        
+        checks = [
+            ("архивные сегменты проиндексированы", len(list_log_segments(log_path)) > 0 and len(index.days) == 2),
+            ("окна проекта (заголовок с ' | ')", [(item['window'], item['minutes']) for item in top] ==
+             [("Code - app.py | ExLibrus", 15), ('Firefox', 5)]),
+            ("окна за период", week[0]['window'] == "Code - app.py | ExLibrus" and week[0]['ticks'] == 3),
+            ("сводка дня", day['ticks'] == 4 and day['active_ticks'] == 3 and day['avg_idle_seconds'] == 100.0),
+            ("причины пропусков", reasons['BIT_SKIP'] == {'user_idle': 1} and reasons['BIT_SET'] == {'user_active': 4})
+        ]
+        for name, ok in checks:
+            print(f"  {name}: {'OK' if ok else 'FAIL'}")
+            assert ok
+        
+        # Индекс с диска используется, пока лог не изменился
+        loaded, rebuilt_again = load_or_build_index(log_path)
+        with log:
+            log.event(datetime(2025, 6, 10, 11, 10), 'ACTIVITY', 'Active: True', 'Idle: 1.0s',
+                      'Level: active', "Window: 'Terminal'")
+        updated, rebuilt_after_tick = load_or_build_index(log_path)
+        
+        checks = [
+            ("индекс загружен с диска", rebuilt and not rebuilt_again and os.path.exists(get_index_path(log_path))),
+            ("колонки после загрузки", loaded.top_windows(project='ExLibrus') == top and len(loaded) == len(index)),
+            ("перестроен после новых тиков", rebuilt_after_tick and len(updated) == len(index) + 1)
+        ]
+        for name, ok in checks:
+            print(f"  {name}: {'OK' if ok else 'FAIL'}")
+            assert ok
+        
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
 
 
 def main():
@@ -134,6 +1197,24 @@ def main():
         test_transliteration()
         test_compatibility()
         test_hierarchy()
+        test_masks()
+        test_incremental_totals()
+        test_journal()
+        test_sqlite_storage()
+        test_concurrent_writes()
+        test_history_shards()
+        test_journal_history()
+        test_lazy_masks()
+        test_tracker_log()
+        test_log_index()
+        test_analytics()
+        test_window_titles()
+        test_activity_sampler()
+        test_activity_backends()
+        test_benchmarks()
+        test_metrics()
+        test_http_cache()
+        test_project_query()
         
         print("\n" + "=" * 50)
         print("Все тесты завершены!")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Регрессионный тест времени холодного старта
+
+Запускает tracker_quick.py (тик вне рабочего времени и полный тик) и
+`project_manager.py list` в отдельных процессах с `python -X importtime` и проверяет:
+- время запуска укладывается в бюджет (README обещает <500ms для трекера);
+- тяжелые модули (tkinter, ctypes, numpy, sqlite3) не загружаются при старте.
+
+Скрипты и core/ копируются во временную директорию вместе с БД: tracker.log,
+tracker.perf и break_state.json пишутся туда, а не в репозиторий. Время тика
+задается через `--now`, активность - через TRACKER_ACTIVITY_REPLAY, напоминания
+о перерыве в тестовой БД выключены: результат не зависит от часов и машины.
+
+При прямом запуске печатает самые дорогие импорты каждой команды.
+"""
+import sys
+import os
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Бюджет холодного старта, мс (переопределяется TRACKER_STARTUP_BUDGET_MS для медленных CI)
+STARTUP_BUDGET_MS = float(os.environ.get('TRACKER_STARTUP_BUDGET_MS', 500))
+
+# Модули, которые не должны загружаться при старте CLI и трекера
+FORBIDDEN_MODULES = ('tkinter', 'ctypes', 'numpy', 'sqlite3')
+
+# (название, аргументы, пишет ли команда в tracker.log)
+COMMANDS = (
+    ('tracker_quick.py (вне рабочего времени)', ['tracker_quick.py', '--now', '2025-06-09T21:00'], False),
+    ('tracker_quick.py (тик)', ['tracker_quick.py', '--now', '2025-06-09T10:05'], True),
+    ('tracker list', ['project_manager.py', 'list'], False)
+)
+
+# Что копируется во временную директорию
+SCRIPTS = ('tracker_quick.py', 'project_manager.py')
+
+
+def prepare_sandbox(temp_dir):
+    """
+    Копирует скрипты, core/ и тестовую БД во временную директорию
+
+    Returns:
+        dict: Окружение для запуска команд
+    """
+    for script in SCRIPTS:
+        shutil.copy2(os.path.join(PROJECT_ROOT, script), temp_dir)
+    shutil.copytree(
+        os.path.join(PROJECT_ROOT, 'core'), os.path.join(temp_dir, 'core'),
+        ignore=shutil.ignore_patterns('__pycache__')
+    )
+
+    with open(os.path.join(PROJECT_ROOT, 'db.example.json'), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data.setdefault('meta', {})['break_reminders'] = {'enabled': False}
+    db_path = os.path.join(temp_dir, 'db.json')
+    with open(db_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+    replay_path = os.path.join(temp_dir, 'activity.txt')
+    with open(replay_path, 'w', encoding='utf-8') as f:
+        f.write("1.0 | main.py - simple-tracker - Visual Studio Code\n")
+
+    return dict(os.environ, TRACKER_DB=db_path, TRACKER_ACTIVITY_REPLAY=replay_path)
+
+
+def parse_importtime(stderr):
+    """
+    Разбирает вывод -X importtime
+
+    Returns:
+        list: [(модуль, собственное время мкс, суммарное время мкс)]
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def measure_startup(args, sandbox_dir, env):
+    """
+    Запускает команду в новом процессе в директории песочницы
+
+    Returns:
+        tuple: (время выполнения мс, список импортов parse_importtime)
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime'] + args,
+        cwd=sandbox_dir, env=env, capture_output=True, text=True, encoding='utf-8', errors='replace'
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    assert result.returncode == 0, f"{' '.join(args)} завершился с кодом {result.returncode}: {result.stderr[-500:]}"
+    return elapsed_ms, parse_importtime(result.stderr)
+
+
+def test_startup_budget(verbose=False):
+    """Тест времени старта и графа импортов трекера и CLI"""
+    print("=== Тест времени холодного старта ===")
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        env = prepare_sandbox(temp_dir)
+        log_path = os.path.join(temp_dir, 'tracker.log')
+
+        for name, args, writes_log in COMMANDS:
+            log_size = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+            elapsed_ms, modules = measure_startup(args, temp_dir, env)
+            loaded = {module.split('.')[0] for module, _, _ in modules}
+
+            ok = elapsed_ms < STARTUP_BUDGET_MS
+            print(f"  {name}: {elapsed_ms:.0f} мс (бюджет {STARTUP_BUDGET_MS:.0f} мс) {'OK' if ok else 'FAIL'}")
+            assert ok, f"{name}: холодный старт {elapsed_ms:.0f} мс превышает бюджет {STARTUP_BUDGET_MS:.0f} мс"
+
+            unexpected = sorted(loaded.intersection(FORBIDDEN_MODULES))
+            print(f"  {name}: лишние импорты {unexpected or 'нет'} {'OK' if not unexpected else 'FAIL'}")
+            assert not unexpected, f"{name}: при старте загружены {unexpected}"
+
+            # Полный тик должен дойти до записи в лог песочницы, остальные команды - не писать в него
+            wrote_log = os.path.exists(log_path) and os.path.getsize(log_path) > log_size
+            ok = wrote_log == writes_log
+            print(f"  {name}: запись в tracker.log {'есть' if wrote_log else 'нет'} {'OK' if ok else 'FAIL'}")
+            assert ok, f"{name}: ожидалась {'запись' if writes_log else 'отсутствие записи'} в tracker.log"
+
+            if verbose:
+                for module, self_us, cumulative_us in sorted(modules, key=lambda m: -m[2])[:15]:
+                    print(f"    {cumulative_us / 1000:7.1f} мс  (self {self_us / 1000:5.1f})  {module}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def main():
+    """Запуск теста"""
+    print("Тестирование времени старта")
+    print("=" * 50)
+
+    try:
+        test_startup_budget(verbose=True)
+
+        print("\n" + "=" * 50)
+        print("Все тесты завершены!")
+
+    except Exception as e:
+        print(f"\nОШИБКА в тестах: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
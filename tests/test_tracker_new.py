@@ -13,6 +13,7 @@ from datetime import datetime
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import tracker_quick
+from core.masks import is_bit_set
 
 
 def test_db_format_detection():
@@ -83,10 +84,6 @@ def test_hierarchy_features():
     """Тест функций иерархии"""
     print("\n=== Тест функций иерархии ===")
     
-    if not tracker_quick.HIERARCHY_SUPPORT:
-        print("  Поддержка иерархии отключена")
-        return
-    
     try:
         from core.hierarchy import calculate_aggregated_minutes, is_direct_child
         
@@ -102,6 +99,189 @@ def test_hierarchy_features():
         print(f"  ОШИБКА функций иерархии: {e}")
 
 
+def test_daemon_mode():
+    """Тест режима демона: данные держатся в памяти, внешние изменения подхватываются"""
+    print("\n=== Тест режима демона ===")
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(temp_dir, 'db.json')
+        test_data = {
+            'meta': {'break_reminders': {'enabled': False}},
+            'projects': [{
+                'id': 'exlibrus',
+                'path': 'exlibrus',
+                'title': 'ExLibrus',
+                'status': 'active',
+                'total_minutes': 0,
+                'aggregated_minutes': 0,
+                'daily_masks': {}
+            }]
+        }
+        with open(db_path, 'w', encoding='utf-8') as f:
+            json.dump(test_data, f)
+        
+        daemon = tracker_quick.TrackerDaemon(script_dir=temp_dir)
+        
+        # 10:00 = позиция 24
+        daemon.tick(datetime(2025, 6, 9, 10, 0, 30))
+        project = daemon.data['projects'][0]
+        bit_set = is_bit_set(project['daily_masks']['2025-06-09'], 24)
+        print(f"  Бит установлен в памяти: {'OK' if bit_set else 'FAIL'}")
+        assert bit_set
+        
+        # Повторный тик в том же слоте не меняет время
+        daemon.tick(datetime(2025, 6, 9, 10, 3, 0))
+        same_total = daemon.data['projects'][0]['total_minutes'] == 5
+        print(f"  Повторный тик идемпотентен: {'OK' if same_total else 'FAIL'}")
+        assert same_total
+        
+        # Тики пишутся в журнал, db.json не перезаписывается
+        with open(db_path, 'r', encoding='utf-8') as f:
+            untouched = json.load(f)['projects'][0]['daily_masks'] == {}
+        journal_exists = os.path.exists(os.path.join(temp_dir, 'db.journal'))
+        print(f"  Запись через журнал: {'OK' if untouched and journal_exists else 'FAIL'}")
+        assert untouched and journal_exists
+        
+        # Внешнее изменение (как от CLI) подхватывается на следующем тике
+        monitor = daemon.activity_monitor
+        with open(db_path, 'r', encoding='utf-8') as f:
+            on_disk = json.load(f)
+        on_disk['projects'][0]['status'] = 'paused'
+        with open(db_path, 'w', encoding='utf-8') as f:
+            json.dump(on_disk, f, indent=4)
+        
+        daemon.tick(datetime(2025, 6, 9, 10, 5, 30))
+        reloaded = daemon.data['projects'][0]['status'] == 'paused'
+        print(f"  Внешние изменения подхвачены: {'OK' if reloaded else 'FAIL'}")
+        assert reloaded
+        
+        # Монитор активности (и состояние источника) переживает перечитывание БД,
+        # пока не изменились настройки meta.activity_monitoring
+        kept = daemon.activity_monitor is monitor
+        on_disk['meta']['activity_monitoring'] = {'idle_threshold_seconds': 120}
+        with open(db_path, 'w', encoding='utf-8') as f:
+            json.dump(on_disk, f)
+        daemon.tick(datetime(2025, 6, 9, 10, 10, 30))
+        rebuilt = daemon.activity_monitor is not monitor and daemon.activity_monitor.idle_threshold == 120
+        print(f"  Монитор пересоздается только при смене настроек: {'OK' if kept and rebuilt else 'FAIL'}")
+        assert kept and rebuilt
+        
+        # Выравнивание по границам слотов
+        pause = daemon.seconds_until_next_slot(datetime(2025, 6, 9, 10, 3, 0))
+        aligned = pause == 120 + daemon.SLOT_OFFSET_SECONDS
+        print(f"  Выравнивание по слотам: {'OK' if aligned else 'FAIL'}")
+        assert aligned
+        
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_break_notification_async():
+    """Тест уведомления о перерыве: окно в отдельном процессе, тик не ждет ответа"""
+    print("\n=== Тест фоновых уведомлений о перерыве ===")
+    
+    from datetime import timedelta
+    from core.masks import format_mask
+    from core.notifications import read_break_state
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        log_path = os.path.join(temp_dir, 'tracker.log')
+        now = datetime.now()
+        # 24 слота = 120 минут работы сегодня
+        project = {'id': 'exlibrus', 'title': 'ExLibrus', 'daily_masks': {now.strftime('%Y-%m-%d'): format_mask((1 << 24) - 1)}}
+        data = {'meta': {'break_reminders': {'enabled': True, 'interval_minutes': 120}}, 'projects': [project]}
+        
+        launched = []
+        first = tracker_quick.check_break_notification(project, data, now, log_path, launcher=launched.append)
+        # Окно еще открыто - второе не показывается
+        second = tracker_quick.check_break_notification(project, data, now + timedelta(minutes=5), log_path, launcher=launched.append)
+        launched_before_choice = len(launched)
+        
+        # Процесс окна применяет выбор пользователя
+        action = tracker_quick.run_break_dialog(120, 'ExLibrus', log_path, show_dialog=lambda title, message: 'snooze')
+        state = read_break_state(tracker_quick.get_break_state_path(log_path))
+        
+        snoozed = tracker_quick.check_break_notification(project, data, datetime.now() + timedelta(minutes=5), log_path, launcher=launched.append)
+        after_snooze = tracker_quick.check_break_notification(project, data, datetime.now() + timedelta(minutes=11), log_path, launcher=launched.append)
+        
+        with open(log_path, 'r', encoding='utf-8') as f:
+            log_text = f.read()
+        
+        checks = [
+            ("окно запущено в фоне", first['action'] == 'dispatched' and '--break-dialog' in launched[0]),
+            ("повторное окно не показывается", second['action'] == 'pending' and launched_before_choice == 1),
+            ("выбор применен", action == 'snooze' and 'pending_since' not in state and state['last_action'] == 'snooze'),
+            ("отложение", snoozed['action'] == 'quiet'),
+            ("после отложения", after_snooze['action'] == 'dispatched' and len(launched) == 2),
+            ("лог", 'BREAK_DISPATCH' in log_text and 'BREAK_SNOOZE' in log_text),
+        ]
+        for name, ok in checks:
+            print(f"  {name}: {'OK' if ok else 'FAIL'}")
+            assert ok
+        
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_tick_metrics():
+    """Тест замеров этапов тика: tracker.perf, сводка p50/p95, обрезка файла"""
+    print("\n=== Тест замеров этапов тика ===")
+    
+    from core.activity_backends import REPLAY_ENV_VAR
+    from core.tick_metrics import STAGES, read_metrics, summarize_metrics, append_metrics, get_metrics_path
+    
+    temp_dir = tempfile.mkdtemp()
+    try:
+        test_data = {
+            'meta': {'break_reminders': {'enabled': False}},
+            'projects': [{
+                'id': 'exlibrus', 'path': 'exlibrus', 'title': 'ExLibrus', 'status': 'active',
+                'total_minutes': 0, 'aggregated_minutes': 0, 'daily_masks': {}
+            }]
+        }
+        with open(os.path.join(temp_dir, 'db.json'), 'w', encoding='utf-8') as f:
+            json.dump(test_data, f)
+        replay_path = os.path.join(temp_dir, 'activity.txt')
+        with open(replay_path, 'w', encoding='utf-8') as f:
+            f.write("1.0 | main.py - Visual Studio Code\n")
+        
+        os.environ[REPLAY_ENV_VAR] = replay_path
+        try:
+            for minute in (0, 5, 10):
+                tracker_quick.quick_track(temp_dir, datetime(2025, 6, 9, 10, minute))
+            # Вне рабочего времени замер не пишется
+            tracker_quick.quick_track(temp_dir, datetime(2025, 6, 9, 21, 0))
+        finally:
+            del os.environ[REPLAY_ENV_VAR]
+        
+        metrics_path = get_metrics_path(os.path.join(temp_dir, 'tracker.log'))
+        records = read_metrics(metrics_path)
+        summary = summarize_metrics(records)
+        
+        # Файл обрезается до последних max_records записей
+        trim_path = os.path.join(temp_dir, 'trim.perf')
+        for i in range(400):
+            append_metrics(trim_path, dict(records[0], t=str(i)), max_records=100)
+        trimmed = read_metrics(trim_path)
+        
+        checks = [
+            ("тики в рабочее время", [r['t'][11:16] for r in records] == ['10:00', '10:05', '10:10']),
+            ("все этапы замерены", set(STAGES) <= set(records[0])),
+            ("сумма этапов не больше total", all(sum(r[s] for s in STAGES) <= r['total'] + 0.01 for r in records)),
+            ("сводка", summary['ticks'] == 3 and summary['stages'][-1]['stage'] == 'total'),
+            ("p50 <= p95", all(item['p50'] <= item['p95'] <= item['max'] for item in summary['stages'])),
+            ("обрезка файла", len(trimmed) <= 200 and trimmed[-1]['t'] == '399'),
+        ]
+        for name, ok in checks:
+            print(f"  {name}: {'OK' if ok else 'FAIL'}")
+            assert ok
+        
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
 def main():
     """Запуск всех тестов"""
     print("Тестирование модифицированного tracker_quick.py")
@@ -111,6 +291,9 @@ def main():
     test_active_project_finding()
     test_compatibility_with_original()
     test_hierarchy_features()
+    test_daemon_mode()
+    test_break_notification_async()
+    test_tick_metrics()
     
     print("=" * 60)
     print("Тестирование tracker_quick завершено!")
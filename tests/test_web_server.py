@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Тесты веб-сервера через тестовый клиент Flask
+
+Сервер работает с временной БД (TRACKER_DB), запросы выполняются без сети.
+Без Flask тесты пропускаются: web_server при ошибке импорта пытается установить
+зависимости, поэтому он импортируется только если Flask доступен.
+"""
+import sys
+import os
+import json
+import gzip
+import shutil
+import tempfile
+import importlib.util
+import unittest
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+# Добавляем путь к проекту
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.storage import JsonStorage
+from core.masks import format_mask
+from core.journal import make_record, append_record, get_journal_path
+from core.history import get_history_dir, get_shard_path, read_shard, get_month
+from core.locking import atomic_write_text
+
+WEB_SUPPORT = all(importlib.util.find_spec(name) is not None for name in ('flask', 'flask_cors'))
+
+
+def require_flask():
+    """Пропускает тест, если Flask не установлен"""
+    if not WEB_SUPPORT:
+        raise unittest.SkipTest("Flask или Flask-CORS не установлены")
+
+
+def get_previous_month_day(today):
+    """День прошлого месяца (маски уходят в шард истории)"""
+    return (today.replace(day=1) - timedelta(days=1)).replace(day=15)
+
+
+def make_test_data(today):
+    """БД с активным проектом: маска прошлого месяца и маска за сегодня"""
+    return {
+        'meta': {'break_reminders': {'enabled': False}},
+        'projects': [
+            {
+                'id': 'exlibrus', 'path': 'exlibrus', 'title': 'ExLibrus', 'status': 'active',
+                'total_minutes': 10, 'aggregated_minutes': 10,
+                'daily_masks': {
+                    get_previous_month_day(today).isoformat(): format_mask(1),
+                    today.isoformat(): format_mask(1 << 2)
+                }
+            },
+            {
+                'id': 'frontend', 'path': 'exlibrus/frontend', 'title': 'Frontend', 'status': 'paused',
+                'total_minutes': 0, 'aggregated_minutes': 0, 'daily_masks': {}
+            },
+            {
+                'id': 'home', 'path': 'home', 'title': 'Home', 'status': 'paused',
+                'total_minutes': 0, 'aggregated_minutes': 0, 'daily_masks': {}
+            }
+        ]
+    }
+
+
+@contextmanager
+def web_client(data):
+    """
+    Тестовый клиент веб-сервера над временной БД
+
+    Yields:
+        tuple: (модуль web_server, тестовый клиент, путь к db.json)
+    """
+    require_flask()
+    import web_server
+
+    temp_dir = tempfile.mkdtemp()
+    saved_db = os.environ.get('TRACKER_DB')
+    try:
+        db_path = os.path.join(temp_dir, 'db.json')
+        JsonStorage(db_path).save(data)
+        os.environ['TRACKER_DB'] = db_path
+        web_server.db_cache.invalidate()
+        yield web_server, web_server.app.test_client(), db_path
+    finally:
+        if saved_db is None:
+            os.environ.pop('TRACKER_DB', None)
+        else:
+            os.environ['TRACKER_DB'] = saved_db
+        web_server.db_cache.invalidate()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def get_project(response, project_id):
+    """Проект из ответа /api/projects"""
+    return next(p for p in response.get_json()['data']['projects'] if p['id'] == project_id)
+
+
+def add_paused_projects(data, count):
+    """Добавляет приостановленные проекты (ответ /api/projects больше порога gzip)"""
+    for i in range(count):
+        data['projects'].append({
+            'id': f'project-{i}', 'path': f'work/project-{i}', 'title': f'Проект {i}', 'status': 'paused',
+            'total_minutes': i * 5, 'aggregated_minutes': i * 5, 'daily_masks': {}
+        })
+    return data
+
+
+def without_timestamp(payload):
+    """JSON ответа без времени формирования (отличается между запросами)"""
+    payload.pop('timestamp', None)
+    return payload
+
+
+def test_conditional_get():
+    """Тест условного GET: ETag, 304 по If-None-Match, новый ETag после изменения проекта"""
+    print("\n=== Тест ETag и 304 ===")
+
+    with web_client(make_test_data(date.today())) as (web_server, client, db_path):
+        first = client.get('/api/projects')
+        etag = first.headers.get('ETag')
+        cached = client.get('/api/projects', headers={'If-None-Match': etag})
+
+        paused = client.post('/api/pause', json={'identifier': 'exlibrus'})
+        changed = client.get('/api/projects', headers={'If-None-Match': etag})
+
+    checks = [
+        ("200 с ETag", first.status_code == 200 and bool(etag)),
+        ("Cache-Control", first.headers.get('Cache-Control') == 'no-cache'),
+        ("304 без тела", cached.status_code == 304 and cached.data == b'' and cached.headers.get('ETag') == etag),
+        ("изменение проекта", paused.status_code == 200),
+        ("новый ETag после изменения", changed.status_code == 200 and changed.headers.get('ETag') != etag),
+        ("статус в новом ответе", get_project(changed, 'exlibrus')['status'] == 'paused'),
+    ]
+
+    for name, ok in checks:
+        print(f"  {name}: {'OK' if ok else 'FAIL'}")
+        assert ok
+
+
+def test_gzip_response():
+    """Тест gzip: сжатый ответ распаковывается в тот же JSON, маленькие ответы не сжимаются"""
+    print("\n=== Тест gzip ===")
+
+    with web_client(add_paused_projects(make_test_data(date.today()), 20)) as (web_server, client, db_path):
+        plain = client.get('/api/projects')
+        compressed = client.get('/api/projects', headers={'Accept-Encoding': 'gzip'})
+        small = client.get('/api/active', headers={'Accept-Encoding': 'gzip'})
+
+    plain_json = without_timestamp(plain.get_json())
+    unpacked_json = without_timestamp(json.loads(gzip.decompress(compressed.data)))
+
+    checks = [
+        ("без Accept-Encoding не сжат", plain.headers.get('Content-Encoding') is None),
+        ("Content-Encoding: gzip", compressed.headers.get('Content-Encoding') == 'gzip'),
+        ("Vary: Accept-Encoding", 'Accept-Encoding' in compressed.headers.get('Vary', '')
+            and 'Accept-Encoding' in plain.headers.get('Vary', '')),
+        ("сжатый ответ меньше", len(compressed.data) < len(plain.data)),
+        ("тот же JSON после распаковки", unpacked_json == plain_json),
+        ("маленький ответ не сжат", small.headers.get('Content-Encoding') is None),
+    ]
+
+    for name, ok in checks:
+        print(f"  {name}: {'OK' if ok else 'FAIL'}")
+        assert ok
+
+
+def test_projects_query():
+    """Тест параметров /api/projects: поля, режимы масок, страницы и X-Total-Count"""
+    print("\n=== Тест параметров /api/projects ===")
+
+    today = date.today()
+    old_day = get_previous_month_day(today).isoformat()
+
+    with web_client(make_test_data(today)) as (web_server, client, db_path):
+        def get_masks(query):
+            response = client.get(f'/api/projects?{query}')
+            return get_project(response, 'exlibrus').get('daily_masks')
+
+        default = client.get('/api/projects')
+        all_masks = get_masks('include_masks=all')
+        today_masks = get_masks('include_masks=today')
+        range_masks = get_masks(f'include_masks=range&from={old_day}&to={today.isoformat()}')
+        no_masks = get_masks('include_masks=none')
+        fields = client.get('/api/projects?fields=id,status').get_json()['data']['projects']
+
+        page = client.get('/api/projects?limit=1&offset=1')
+        last_page = client.get('/api/projects?limit=2&offset=1')
+        paused = client.get('/api/projects?status=paused')
+        bad_mode = client.get('/api/projects?include_masks=week')
+        bad_limit = client.get('/api/projects?limit=0')
+
+    default_masks = get_project(default, 'exlibrus')['daily_masks']
+    page_data = page.get_json()['data']
+    last_page_data = last_page.get_json()['data']
+
+    checks = [
+        ("по умолчанию - все загруженные маски", default_masks == all_masks and today.isoformat() in default_masks),
+        ("маски за сегодня", list(today_masks) == [today.isoformat()]),
+        ("маски диапазона с историей", sorted(range_masks) == [old_day, today.isoformat()]),
+        ("без масок", no_masks is None),
+        ("выбор полей", bool(fields) and all(set(p) == {'id', 'status'} for p in fields)),
+        ("страница", len(page_data['projects']) == 1 and (page_data['total'], page_data['offset'],
+                                                          page_data['limit'], page_data['has_more']) == (3, 1, 1, True)),
+        ("последняя страница", len(last_page_data['projects']) == 2 and last_page_data['has_more'] is False),
+        ("X-Total-Count", default.headers.get('X-Total-Count') == '3' and page.headers.get('X-Total-Count') == '3'),
+        ("X-Total-Count после фильтра", paused.headers.get('X-Total-Count') == '2'),
+        ("неверные параметры - 400", bad_mode.status_code == 400 and bad_limit.status_code == 400),
+    ]
+
+    for name, ok in checks:
+        print(f"  {name}: {'OK' if ok else 'FAIL'}")
+        assert ok
+
+
+def test_metrics_endpoint():
+    """Тест /metrics: тип ответа Prometheus и все метрики сервера"""
+    print("\n=== Тест /metrics ===")
+
+    from core.metrics import CONTENT_TYPE
+
+    names = (
+        'tracker_http_request_duration_seconds', 'tracker_http_requests_total',
+        'tracker_db_loads_total', 'tracker_db_load_duration_seconds', 'tracker_cache_requests_total',
+        'tracker_db_size_bytes', 'tracker_projects', 'tracker_tick_lag_seconds',
+        'tracker_last_bit_set_timestamp_seconds'
+    )
+
+    with web_client(make_test_data(date.today())) as (web_server, client, db_path):
+        client.get('/api/projects')
+        response = client.get('/metrics')
+        text = response.get_data(as_text=True)
+
+    declared = {line.split()[2] for line in text.splitlines() if line.startswith('# TYPE ')}
+    missing = [name for name in names if name not in declared]
+
+    checks = [
+        ("200", response.status_code == 200),
+        ("Content-Type", response.headers.get('Content-Type') == CONTENT_TYPE
+            and CONTENT_TYPE == 'text/plain; version=0.0.4; charset=utf-8'),
+        ("все метрики", not missing),
+        ("проекты по статусам", 'tracker_projects{status="active"} 1' in text
+            and 'tracker_projects{status="paused"} 2' in text),
+        ("запрос к API учтен", 'route="/api/projects"' in text),
+    ]
+
+    for name, ok in checks:
+        print(f"  {name}: {'OK' if ok else 'FAIL'}")
+        assert ok, missing
+
+
+def test_health_storage_reuse():
+    """Тест /api/health: повторные проверки не открывают лишних хранилищ и закрывают открытые"""
+    print("\n=== Тест хранилищ /api/health ===")
+
+    probes = 5
+
+    with web_client(make_test_data(date.today())) as (web_server, client, db_path):
+        opened, closed = [], []
+        get_db_storage = web_server.project_manager.get_db_storage
+
+        def tracked_storage():
+            storage = get_db_storage()
+            close = storage.close
+
+            def tracked_close():
+                closed.append(storage)
+                close()
+
+            storage.close = tracked_close
+            opened.append(storage)
+            return storage
+
+        # Первая проверка загружает данные и тип хранилища в кеш
+        first = client.get('/api/health')
+        web_server.project_manager.get_db_storage = tracked_storage
+        try:
+            statuses = [client.get('/api/health').status_code for _ in range(probes)]
+        finally:
+            web_server.project_manager.get_db_storage = get_db_storage
+
+    checks = [
+        ("проверки успешны", first.get_json()['data']['storage'] == 'json' and statuses == [200] * probes),
+        ("одно хранилище на проверку", len(opened) == probes),
+        ("все хранилища закрыты", len(closed) == len(opened) and all(any(s is c for c in closed) for s in opened)),
+    ]
+
+    for name, ok in checks:
+        print(f"  {name}: {'OK' if ok else 'FAIL'}")
+        assert ok
+
+
+def test_db_cache_invalidation():
+    """Тест кеша БД: тик в журнале и перезапись шарда видны в следующем ответе"""
+    print("\n=== Тест сброса кеша БД ===")
+
+    today = date.today()
+    old_day = get_previous_month_day(today).isoformat()
+    range_url = f'/api/timeline/range?from={old_day}&to={old_day}&granularity=day'
+
+    with web_client(make_test_data(today)) as (web_server, client, db_path):
+        before = get_project(client.get('/api/projects'), 'exlibrus')
+
+        # Тик трекера дописывает запись в журнал, db.json не меняется
+        append_record(get_journal_path(db_path), make_record(today.isoformat(), 5, 'exlibrus', 0))
+        after = get_project(client.get('/api/projects'), 'exlibrus')
+
+        # Шард прошлого месяца перезаписан другим процессом (атомарная замена),
+        # db.json и журнал не менялись
+        old_before = client.get(range_url).get_json()['data']['totals']['projects']
+        months_before = web_server.db_cache.get_history_months()
+        history_dir = get_history_dir(db_path)
+        month = get_month(old_day)
+        shard = read_shard(history_dir, month)
+        shard['projects']['exlibrus'][old_day] = format_mask(0b111)
+        atomic_write_text(get_shard_path(history_dir, month), json.dumps(shard))
+        old_after = client.get(range_url).get_json()['data']['totals']['projects']
+
+        # Новый шард появился - список месяцев истории обновился
+        older_month = get_month((today.replace(day=1) - timedelta(days=70)).isoformat())
+        atomic_write_text(get_shard_path(history_dir, older_month), json.dumps(
+            {'month': older_month, 'projects': {}, 'passive': {}, 'windows': {}}
+        ))
+        months_after = web_server.db_cache.get_history_months()
+
+    checks = [
+        ("тик из журнала", after['total_minutes'] == before['total_minutes'] + 5),
+        ("маска дня из журнала", after['today_minutes'] == before['today_minutes'] + 5),
+        ("перезапись шарда", [p['minutes'] for p in old_before] == [5] and [p['minutes'] for p in old_after] == [15]),
+        ("новый месяц истории", months_before == [month] and months_after == sorted([older_month, month])),
+    ]
+
+    for name, ok in checks:
+        print(f"  {name}: {'OK' if ok else 'FAIL'}")
+        assert ok
+
+
+def main():
+    """Запуск всех тестов"""
+    print("Тестирование веб-сервера")
+    print("=" * 50)
+
+    if not WEB_SUPPORT:
+        print("Flask не установлен - тесты веб-сервера пропущены")
+        return
+
+    try:
+        test_conditional_get()
+        test_gzip_response()
+        test_projects_query()
+        test_metrics_endpoint()
+        test_health_storage_reuse()
+        test_db_cache_invalidation()
+
+        print("\n" + "=" * 50)
+        print("Все тесты завершены!")
+
+    except Exception as e:
+        print(f"\nОШИБКА в тестах: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,150 +4,219 @@
 Версия с поддержкой иерархических проектов
 """
 import datetime
-import json
 import os
 import sys
+import time
 
-# Импорт core модулей для работы с иерархией
-try:
-    from core.compatibility import detect_db_format, ensure_project_fields
-    from core.hierarchy import update_aggregated_minutes, find_project_by_path
-    from core.active import UserActivityMonitor, create_activity_monitor_from_config
-    from core.notifications import show_break_notification, check_break_needed
-    HIERARCHY_SUPPORT = True
-    ACTIVITY_SUPPORT = True
-    NOTIFICATION_SUPPORT = True
-except ImportError:
-    # Fallback если core модули недоступны
-    HIERARCHY_SUPPORT = False
-    ACTIVITY_SUPPORT = False
-    NOTIFICATION_SUPPORT = False
-
-
-def quick_track():
-    """Быстрый трекинг без логирования в консоль"""
+# Core модули обязательны: хранилище, журнал и маски тика живут в core.
+# core.active (ctypes) и core.notifications (tkinter) импортируются там, где нужны:
+# тик вне рабочего времени или без уведомления их не загружает
+from core.compatibility import detect_db_format, ensure_project_fields
+from core.hierarchy import update_aggregated_minutes, find_project_by_path
+from core.tracking import (
+    get_passive_flags, set_project_bit, increment_total_minutes, set_passive_bits, set_passive_window
+)
+from core.tracking import update_daily_analysis as _update_daily_analysis
+from core.masks import count_minutes
+from core.journal import make_record
+from core.tracker_log import open_tick_log
+from core.tick_metrics import StageTimer, NULL_TIMER, append_metrics, get_metrics_config, get_metrics_path
+from core.storage import get_storage
+
+
+def quick_track(script_dir=None, now=None):
+    """
+    Быстрый трекинг без логирования в консоль
+    
+    Args:
+        script_dir (str): Директория с БД и tracker.log (по умолчанию - директория скрипта)
+        now (datetime): Время тика (по умолчанию - текущее)
+    """
+    script_dir = script_dir or os.path.dirname(os.path.abspath(__file__))
+    log_path = os.path.join(script_dir, 'tracker.log')
+    now = now or datetime.datetime.now()
+    timer = StageTimer()
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        db_path = os.path.join(script_dir, 'db.json')
-        log_path = os.path.join(script_dir, 'tracker.log')
-        
-        # Загружаем данные
-        with open(db_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Проверяем рабочее время (08:00-20:00)
-        now = datetime.datetime.now()
-        if now.hour < 8 or now.hour >= 20:
-            return True  # Вне рабочих часов
-        
-        # Находим активный проект с поддержкой иерархии
-        current_project = find_active_project(data)
-        
-        # Получаем текущую дату
-        today = now.strftime("%Y-%m-%d")
-        
-        # Вычисляем позицию бита (каждые 5 минут с 08:00)
-        start_time = now.replace(hour=8, minute=0, second=0, microsecond=0)
-        time_diff = now - start_time
-        total_minutes = int(time_diff.total_seconds() / 60)
-        bit_position = total_minutes // 5
-        
-        if bit_position < 0 or bit_position >= 144:
-            return True
-        
-        # Проверяем активность пользователя (Этап 1)
-        should_track, activity_info = check_user_activity(data)
-        
-        # Если нет активного проекта, все равно записываем пассивную активность
-        if not current_project:
-            update_passive_tracking(data, today, bit_position, should_track, activity_info, has_active_project=False)
-            
-            # Сохраняем изменения пассивного трекинга
-            with open(db_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            # Логируем отсутствие активного проекта
-            activity_entry = f"{now.strftime('%Y-%m-%d %H:%M:%S')} | NO_ACTIVE_PROJECT | Active: {activity_info['is_active']} | Idle: {activity_info['idle_seconds']}s | Bit: {bit_position}\n"
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(activity_entry)
-            
-            return False
-        
-        # Логируем информацию об активности
-        activity_entry = f"{now.strftime('%Y-%m-%d %H:%M:%S')} | ACTIVITY | Active: {activity_info['is_active']} | Idle: {activity_info['idle_seconds']}s | Level: {activity_info['activity_level']}"
-        if activity_info.get('active_window'):
-            activity_entry += f" | Window: '{activity_info['active_window']}'"
-        activity_entry += "\n"
-        
-        with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(activity_entry)
-        
-        # Если пользователь неактивен, пропускаем запись времени
-        if not should_track:
-            skip_entry = f"{now.strftime('%Y-%m-%d %H:%M:%S')} | {current_project['title']} | BIT_SKIP | Position: {bit_position} | REASON: user_idle\n"
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(skip_entry)
-            return True
-        
-        # Получаем маску (создаем если нет)
-        if 'daily_masks' not in current_project:
-            current_project['daily_masks'] = {}
-        
-        current_mask = current_project['daily_masks'].get(today, "0" * 144)
-        if len(current_mask) < 144:
-            current_mask = current_mask + "0" * (144 - len(current_mask))
-        
-        # Устанавливаем бит
-        mask_list = list(current_mask)
-        if mask_list[bit_position] == '0':
-            mask_list[bit_position] = '1'
-            new_mask = ''.join(mask_list)
-            
-            # Обновляем данные
-            current_project['daily_masks'][today] = new_mask
-            
-            # Пересчитываем общее время проекта
-            old_total_minutes = current_project.get('total_minutes', 0)
-            new_total_minutes = 0
-            for mask in current_project['daily_masks'].values():
-                new_total_minutes += mask.count('1') * 5
-            current_project['total_minutes'] = new_total_minutes
-            
-            # Обновляем aggregated_minutes в иерархии (если поддерживается)
-            time_changed = old_total_minutes != new_total_minutes
-            if time_changed and HIERARCHY_SUPPORT:
-                update_hierarchy_minutes(current_project, data)
-            
-            # Проверяем нужен ли перерыв (новая функциональность)
-            break_result = check_break_notification(current_project, data, now, log_path)
-            
-            # Обновляем пассивное отслеживание
-            update_passive_tracking(data, today, bit_position, should_track, activity_info, has_active_project=True)
-            
-            # Сохраняем
-            with open(db_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            # Пишем в лог с информацией об иерархии
-            log_entry = create_log_entry(now, current_project, bit_position, time_changed)
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(log_entry)
+        # Загружаем данные вместе с еще не свернутыми тиками из журнала
+        # (маски прошлых месяцев тику не нужны - шарды истории не читаются)
+        with timer.stage('load'):
+            storage = get_storage(script_dir)
+        try:
+            with timer.stage('load'):
+                data = storage.load(compact=False, history=False)
+            result = track_tick(data, now, storage.commit_tick, log_path, timer=timer)
+        finally:
+            storage.close()
         
-        return True
+        write_tick_metrics(log_path, data, now, timer)
+        return result
         
     except Exception as e:
         # Записываем ошибку в лог для диагностики
         try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            log_path = os.path.join(script_dir, 'tracker.log')
-            error_entry = f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | ERROR | {str(e)}\n"
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(error_entry)
+            with open_tick_log(log_path) as log:
+                log.event(datetime.datetime.now(), 'ERROR', str(e))
         except:
             pass
         return False
 
 
+def track_tick(data, now, commit, log, activity_monitor=None, timer=None):
+    """
+    Выполняет один тик трекинга над уже загруженными данными
+    
+    Общая логика для разового запуска (quick_track) и режима демона:
+    данные изменяются in-place, фиксацию тика на диске выполняет переданный commit.
+    Записи лога за тик копятся в TickLog и пишутся в tracker.log одной операцией
+    
+    Args:
+        data (dict): Данные БД
+        now (datetime): Время тика
+        commit (callable): Функция фиксации тика commit(data, record), см. storage.commit_tick
+        log (str|TickLog): Путь к лог файлу или открытый TickLog
+        activity_monitor (UserActivityMonitor): Готовый монитор активности (опционально)
+        timer (StageTimer): Таймер этапов тика (опционально, см. core.tick_metrics)
+        
+    Returns:
+        bool: Результат тика (False если нет активного проекта)
+    """
+    timer = timer or NULL_TIMER
+    with open_tick_log(log, data) as log:
+        try:
+            return _track_slot(data, now, commit, log, activity_monitor, timer)
+        finally:
+            # Буфер лога сбрасывается здесь, а не при выходе из with, чтобы замерить запись
+            with timer.stage('log'):
+                log.flush()
+
+
+def _track_slot(data, now, commit, log, activity_monitor, timer):
+    """Тело track_tick: записывает слот в открытый TickLog, замеряя этапы timer"""
+    # Проверяем рабочее время (08:00-20:00)
+    if now.hour < 8 or now.hour >= 20:
+        return True  # Вне рабочих часов
+    
+    # Находим активный проект с поддержкой иерархии
+    current_project = find_active_project(data)
+    
+    # Получаем текущую дату
+    today = now.strftime("%Y-%m-%d")
+    
+    # Вычисляем позицию бита (каждые 5 минут с 08:00)
+    bit_position = get_bit_position(now)
+    
+    if bit_position < 0 or bit_position >= 144:
+        return True
+    
+    # Проверяем активность пользователя (Этап 1)
+    with timer.stage('activity'):
+        should_track, activity_info = check_user_activity(data, activity_monitor, log)
+    
+    # Если нет активного проекта, все равно записываем пассивную активность
+    if not current_project:
+        with timer.stage('passive'):
+            update_passive_tracking(data, today, bit_position, should_track, activity_info, has_active_project=False, log=log)
+        
+        # Сохраняем изменения пассивного трекинга
+        flags = get_passive_flags(activity_info.get('is_active', False), False, should_track)
+        with timer.stage('save'):
+            commit(data, make_record(today, bit_position, None, flags, activity_info.get('active_window')))
+        
+        # Логируем отсутствие активного проекта
+        activity_entry = f"{now.strftime('%Y-%m-%d %H:%M:%S')} | NO_ACTIVE_PROJECT | Active: {activity_info['is_active']} | Idle: {activity_info['idle_seconds']}s | Bit: {bit_position}\n"
+        log.write(activity_entry)
+        
+        return False
+    
+    # Логируем информацию об активности
+    activity_entry = f"{now.strftime('%Y-%m-%d %H:%M:%S')} | ACTIVITY | Active: {activity_info['is_active']} | Idle: {activity_info['idle_seconds']}s | Level: {activity_info['activity_level']}"
+    if activity_info.get('active_window'):
+        activity_entry += f" | Window: '{activity_info['active_window']}'"
+    activity_entry += "\n"
+    
+    log.write(activity_entry)
+    
+    # Если пользователь неактивен, пропускаем запись времени
+    if not should_track:
+        skip_entry = f"{now.strftime('%Y-%m-%d %H:%M:%S')} | {current_project['title']} | BIT_SKIP | Position: {bit_position} | REASON: user_idle\n"
+        log.write(skip_entry)
+        return True
+    
+    # Устанавливаем бит (маска создается если нет)
+    with timer.stage('mask'):
+        bit_set = set_project_bit(current_project, today, bit_position)
+        if bit_set:
+            # Увеличиваем общее время проекта на один слот (без пересчета всех масок)
+            old_total_minutes = current_project.get('total_minutes', 0)
+            delta = increment_total_minutes(current_project) - old_total_minutes
+    
+    if bit_set:
+        # Обновляем aggregated_minutes в иерархии
+        time_changed = True
+        with timer.stage('hierarchy'):
+            update_hierarchy_minutes(current_project, data, log, delta)
+        
+        # Обновляем пассивное отслеживание
+        with timer.stage('passive'):
+            update_passive_tracking(data, today, bit_position, should_track, activity_info, has_active_project=True, log=log)
+        
+        # Сохраняем
+        flags = get_passive_flags(activity_info.get('is_active', False), True, should_track)
+        with timer.stage('save'):
+            commit(data, make_record(today, bit_position, current_project['id'], flags, activity_info.get('active_window')))
+        
+        # Пишем в лог с информацией об иерархии
+        log_entry = create_log_entry(now, current_project, bit_position, time_changed)
+        log.write(log_entry)
+        
+        # Перерыв проверяется после записи тика: окно показывает отдельный процесс,
+        # тик не ждет ответа пользователя
+        with timer.stage('break'):
+            check_break_notification(current_project, data, now, log)
+    
+    return True
+
+
+def write_tick_metrics(log_path, data, now, timer):
+    """
+    Дописывает время этапов тика в tracker.perf (core.tick_metrics)
+    
+    Тики вне рабочего времени (без замера активности) не записываются, ошибки
+    записи не влияют на результат тика
+    
+    Args:
+        log_path (str): Путь к tracker.log (tracker.perf лежит рядом)
+        data (dict): Данные БД (настройки meta.tick_metrics)
+        now (datetime): Время тика
+        timer (StageTimer): Таймер этапов тика
+    """
+    if 'activity' not in timer.stages:
+        return
+    config = get_metrics_config(data)
+    if not config['enabled']:
+        return
+    try:
+        append_metrics(get_metrics_path(log_path), timer.to_record(now), config['max_records'])
+    except OSError:
+        pass
+
+
+def get_bit_position(now):
+    """
+    Вычисляет позицию бита для момента времени (каждые 5 минут с 08:00)
+    
+    Args:
+        now (datetime): Момент времени
+        
+    Returns:
+        int: Позиция бита (может выходить за диапазон 0-143 вне рабочих часов)
+    """
+    start_time = now.replace(hour=8, minute=0, second=0, microsecond=0)
+    time_diff = now - start_time
+    total_minutes = int(time_diff.total_seconds() / 60)
+    return total_minutes // 5
+
+
 def find_active_project(data):
     """
     Находит активный проект с поддержкой совместимости форматов
@@ -155,22 +224,24 @@ def find_active_project(data):
     """
     for project in data['projects']:
         if project.get('status') == 'active':
-            # Если поддержка иерархии включена, обеспечиваем наличие всех полей
-            if HIERARCHY_SUPPORT:
-                # TODO: LEGACY_SUPPORT - удалить после миграции
-                project = ensure_project_fields(project)
-            return project
+            # Обеспечиваем наличие всех полей иерархии
+            # TODO: LEGACY_SUPPORT - удалить после миграции
+            return ensure_project_fields(project)
     return None
 
 
-def update_hierarchy_minutes(current_project, data):
+def update_hierarchy_minutes(current_project, data, log=None, delta=None):
     """
     Обновляет aggregated_minutes в иерархии после изменения времени
+    
+    Если передана дельта total_minutes, она прибавляется к проекту и его предкам
+    без пересчета поддеревьев
     """
+    if log is None:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        log = os.path.join(script_dir, 'tracker.log')
+    
     try:
-        if not HIERARCHY_SUPPORT:
-            return
-        
         # Получаем path проекта (с fallback для совместимости)
         project_path = current_project.get('path')
         if not project_path:
@@ -180,33 +251,29 @@ def update_hierarchy_minutes(current_project, data):
             current_project['path'] = project_path
         
         # Обновляем aggregated_minutes для проекта и всех родителей
-        updated_paths = update_aggregated_minutes(project_path, data['projects'])
+        updated_paths = update_aggregated_minutes(project_path, data['projects'], delta=delta)
         
         # Логируем обновления (для диагностики)
         if updated_paths:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            log_path = os.path.join(script_dir, 'tracker.log')
             now = datetime.datetime.now()
             hierarchy_entry = f"{now.strftime('%Y-%m-%d %H:%M:%S')} | HIERARCHY_UPDATE | Updated paths: {', '.join(updated_paths)}\n"
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(hierarchy_entry)
+            with open_tick_log(log, data) as log:
+                log.write(hierarchy_entry)
                 
     except Exception as e:
         # Не прерываем работу трекера из-за ошибок в иерархии
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        log_path = os.path.join(script_dir, 'tracker.log')
         now = datetime.datetime.now()
         error_entry = f"{now.strftime('%Y-%m-%d %H:%M:%S')} | HIERARCHY_ERROR | {str(e)}\n"
-        with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(error_entry)
+        with open_tick_log(log, data) as log:
+            log.write(error_entry)
 
 
 def create_log_entry(now, project, bit_position, time_changed, reason="user_active"):
     """Создает запись лога с информацией о проекте и иерархии"""
     base_entry = f"{now.strftime('%Y-%m-%d %H:%M:%S')} | {project['title']} | BIT_SET | Position: {bit_position}"
     
-    # Добавляем информацию об иерархии если поддерживается
-    if HIERARCHY_SUPPORT and time_changed:
+    # Добавляем информацию об иерархии
+    if time_changed:
         total_mins = project.get('total_minutes', 0)
         aggregated_mins = project.get('aggregated_minutes', total_mins)
         project_path = project.get('path', 'unknown')
@@ -219,23 +286,25 @@ def create_log_entry(now, project, bit_position, time_changed, reason="user_acti
     return base_entry + "\n"
 
 
-def check_break_notification(current_project, data, now, log_path):
+def check_break_notification(current_project, data, now, log, launcher=None):
     """
-    Проверяет нужен ли перерыв и показывает уведомление
+    Проверяет нужен ли перерыв и показывает уведомление в отдельном процессе
     Интеграция согласно specification_0607+.md
     
+    Окно не блокирует тик: процесс окна запускается в фоне и сам применяет выбор
+    пользователя (см. run_break_dialog). Пока окно открыто или идет перерыв/отложение,
+    новые окна не показываются (core.notifications, break_state.json)
+    
     Args:
         current_project (dict): Текущий активный проект
         data (dict): Данные БД
         now (datetime): Текущее время
-        log_path (str): Путь к лог файлу
+        log (str|TickLog): Путь к лог файлу или открытый TickLog
+        launcher (callable): Запуск процесса окна launcher(args) (по умолчанию - фоновый процесс)
         
     Returns:
         dict: Информация о результате проверки перерыва
     """
-    if not NOTIFICATION_SUPPORT:
-        return {'break_needed': False, 'reason': 'notifications_disabled'}
-    
     try:
         # Получаем настройки перерывов из meta (если есть)
         meta = data.get('meta', {})
@@ -251,44 +320,91 @@ def check_break_notification(current_project, data, now, log_path):
         # Вычисляем время непрерывной работы
         continuous_work_minutes = get_continuous_work_minutes(current_project, now)
         
+        from core.notifications import (
+            check_break_needed, dispatch_break_notification, get_break_block_reason, read_break_state,
+            DEFAULT_PENDING_TIMEOUT_MINUTES
+        )
+        
         # Проверяем нужен ли перерыв
-        if check_break_needed(continuous_work_minutes, break_interval_minutes):
-            # Показываем уведомление согласно specification_0607+.md
-            action = show_break_notification(
-                title="Время для перерыва!",
-                message=f"Вы работаете уже {continuous_work_minutes} минут подряд.\nВыберите длительность перерыва:"
-            )
-            
-            # Логируем результат
-            log_entry = f"{now.strftime('%Y-%m-%d %H:%M:%S')} | BREAK_NOTIFICATION | Action: {action} | Work_minutes: {continuous_work_minutes}\n"
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(log_entry)
-            
-            # Обрабатываем выбор пользователя согласно specification
-            if action == "pause_5":
-                handle_break_action(current_project, data, 5, log_path, now)
-                return {'break_needed': True, 'action': 'pause_5', 'minutes': 5}
-            elif action == "pause_15":
-                handle_break_action(current_project, data, 15, log_path, now)
-                return {'break_needed': True, 'action': 'pause_15', 'minutes': 15}
-            elif action == "snooze":
-                handle_snooze_action(current_project, data, log_path, now)
-                return {'break_needed': True, 'action': 'snooze', 'snooze_minutes': 10}
-            elif action == "cancelled":
-                return {'break_needed': True, 'action': 'cancelled'}
-            else:
-                return {'break_needed': True, 'action': 'error'}
-        
-        return {'break_needed': False, 'continuous_minutes': continuous_work_minutes}
+        if not check_break_needed(continuous_work_minutes, break_interval_minutes):
+            return {'break_needed': False, 'continuous_minutes': continuous_work_minutes}
+        
+        log_path = getattr(log, 'path', log)
+        state_path = get_break_state_path(log_path)
+        
+        # Окно уже открыто или пользователь на перерыве / отложил напоминание
+        pending_timeout = break_settings.get('pending_timeout_minutes', DEFAULT_PENDING_TIMEOUT_MINUTES)
+        blocked = get_break_block_reason(read_break_state(state_path), now, pending_timeout)
+        if blocked:
+            return {'break_needed': True, 'action': blocked}
+        
+        args = [sys.executable, os.path.abspath(__file__), '--break-dialog',
+                str(continuous_work_minutes), current_project['title'], log_path]
+        dispatched = dispatch_break_notification(state_path, args, now, launcher)
+        
+        with open_tick_log(log, data) as log:
+            log.event(now, 'BREAK_DISPATCH', f"Dispatched: {dispatched}", f"Work_minutes: {continuous_work_minutes}")
+        
+        return {'break_needed': True, 'action': 'dispatched' if dispatched else 'error'}
         
     except Exception as e:
         # Логируем ошибку но не прерываем работу трекера
         error_entry = f"{now.strftime('%Y-%m-%d %H:%M:%S')} | BREAK_CHECK_ERROR | {str(e)}\n"
-        with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(error_entry)
+        with open_tick_log(log, data) as log:
+            log.write(error_entry)
         return {'break_needed': False, 'reason': 'error', 'error': str(e)}
 
 
+def get_activity_state_path(log_path):
+    """Возвращает путь к activity_state.json рядом с tracker.log"""
+    from core.activity_backends import ACTIVITY_STATE_FILE
+    return os.path.join(os.path.dirname(os.path.abspath(log_path)), ACTIVITY_STATE_FILE)
+
+
+def get_break_state_path(log_path):
+    """Возвращает путь к break_state.json рядом с tracker.log"""
+    from core.notifications import BREAK_STATE_FILE
+    return os.path.join(os.path.dirname(os.path.abspath(log_path)), BREAK_STATE_FILE)
+
+
+def run_break_dialog(work_minutes, project_title, log_path, show_dialog=None):
+    """
+    Процесс окна о перерыве (tracker_quick.py --break-dialog): показывает окно,
+    ждет выбора пользователя и применяет его
+    
+    Args:
+        work_minutes (int): Минут непрерывной работы
+        project_title (str): Название проекта (для лога)
+        log_path (str): Путь к tracker.log
+        show_dialog (callable): Показ окна show_dialog(title, message) -> действие
+            (по умолчанию - core.notifications.show_break_notification)
+        
+    Returns:
+        str|None: Выбранное действие
+    """
+    from core.notifications import show_break_notification, apply_break_action
+    
+    action = (show_dialog or show_break_notification)(
+        "Время для перерыва!",
+        f"Вы работаете уже {work_minutes} минут подряд.\nВыберите длительность перерыва:"
+    )
+    now = datetime.datetime.now()
+    project = {'title': project_title}
+    
+    # Обрабатываем выбор пользователя согласно specification
+    with open_tick_log(log_path) as log:
+        log.event(now, 'BREAK_NOTIFICATION', f"Action: {action}", f"Work_minutes: {work_minutes}")
+        if action == "pause_5":
+            handle_break_action(project, None, 5, log, now)
+        elif action == "pause_15":
+            handle_break_action(project, None, 15, log, now)
+        elif action == "snooze":
+            handle_snooze_action(project, None, log, now)
+    
+    apply_break_action(get_break_state_path(log_path), action, now)
+    return action
+
+
 def get_continuous_work_minutes(project, now):
     """
     Вычисляет количество минут непрерывной работы
@@ -297,16 +413,14 @@ def get_continuous_work_minutes(project, now):
     try:
         today = now.strftime("%Y-%m-%d")
         daily_masks = project.get('daily_masks', {})
-        today_mask = daily_masks.get(today, "0" * 144)
         
         # Считаем активные биты (каждый бит = 5 минут)
-        active_bits = today_mask.count('1')
-        return active_bits * 5
+        return count_minutes(daily_masks.get(today))
     except:
         return 0
 
 
-def handle_break_action(project, data, break_minutes, log_path, now):
+def handle_break_action(project, data, break_minutes, log, now):
     """
     Обрабатывает выбор перерыва пользователем
     
@@ -314,70 +428,68 @@ def handle_break_action(project, data, break_minutes, log_path, now):
         project (dict): Текущий проект  
         data (dict): Данные БД
         break_minutes (int): Длительность перерыва
-        log_path (str): Путь к лог файлу
+        log (str|TickLog): Путь к лог файлу или открытый TickLog
         now (datetime): Текущее время
     """
     try:
         # Логируем начало перерыва
         log_entry = f"{now.strftime('%Y-%m-%d %H:%M:%S')} | BREAK_START | Project: {project['title']} | Duration: {break_minutes}m\n"
-        with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
+        with open_tick_log(log, data) as log:
+            log.write(log_entry)
         
         # TODO: Можно добавить логику паузы проекта или таймера перерыва
         # Пока просто логируем действие
         
     except Exception as e:
         error_entry = f"{now.strftime('%Y-%m-%d %H:%M:%S')} | BREAK_ACTION_ERROR | {str(e)}\n"
-        with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(error_entry)
+        with open_tick_log(log, data) as log:
+            log.write(error_entry)
 
 
-def handle_snooze_action(project, data, log_path, now):
+def handle_snooze_action(project, data, log, now):
     """
     Обрабатывает отложение перерыва
     
     Args:
         project (dict): Текущий проект
         data (dict): Данные БД  
-        log_path (str): Путь к лог файлу
+        log (str|TickLog): Путь к лог файлу или открытый TickLog
         now (datetime): Текущее время
     """
     try:
         # Логируем отложение перерыва
         log_entry = f"{now.strftime('%Y-%m-%d %H:%M:%S')} | BREAK_SNOOZE | Project: {project['title']} | Snoozed for: 10m\n"
-        with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
+        with open_tick_log(log, data) as log:
+            log.write(log_entry)
         
         # TODO: Можно добавить логику отложения (например, запомнить время следующего напоминания)
         
     except Exception as e:
         error_entry = f"{now.strftime('%Y-%m-%d %H:%M:%S')} | SNOOZE_ACTION_ERROR | {str(e)}\n"
-        with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(error_entry)
+        with open_tick_log(log, data) as log:
+            log.write(error_entry)
 
 
-def check_user_activity(data):
+def check_user_activity(data, activity_monitor=None, log=None):
     """
     Проверяет активность пользователя и определяет нужно ли записывать время
     
     Args:
         data (dict): Данные из db.json для получения настроек
+        activity_monitor (UserActivityMonitor): Готовый монитор (режим демона),
+            если не передан - создается из настроек БД
+        log (str|TickLog): Путь к tracker.log или открытый TickLog: рядом хранится
+            состояние источника активности между разовыми запусками
         
     Returns:
         tuple: (should_track: bool, activity_info: dict)
     """
-    if not ACTIVITY_SUPPORT:
-        # Если модуль активности недоступен, считаем пользователя активным
-        return True, {
-            'is_active': True,
-            'idle_seconds': 0.0,
-            'activity_level': 'active',
-            'error': 'activity_support_disabled'
-        }
-    
     try:
         # Создаем монитор активности с настройками из БД
-        activity_monitor = create_activity_monitor_from_config(data)
+        if activity_monitor is None:
+            from core.active import create_activity_monitor_from_config
+            state_path = get_activity_state_path(getattr(log, 'path', log)) if log else None
+            activity_monitor = create_activity_monitor_from_config(data, state_path=state_path)
         
         # Получаем информацию об активности
         activity_info = activity_monitor.get_full_activity_report()
@@ -404,33 +516,28 @@ def get_db_format_info():
     """
     try:
         script_dir = os.path.dirname(os.path.abspath(__file__))
-        db_path = os.path.join(script_dir, 'db.json')
-        
-        with open(db_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        if HIERARCHY_SUPPORT:
-            db_format = detect_db_format(data)
-            return {
-                'format': db_format,
-                'hierarchy_support': True,
-                'projects_count': len(data.get('projects', []))
-            }
-        else:
-            return {
-                'format': 'unknown',
-                'hierarchy_support': False,
-                'projects_count': len(data.get('projects', []))
-            }
+        
+        storage = get_storage(script_dir)
+        try:
+            data = storage.load(compact=False, history=False)
+        finally:
+            storage.close()
+        db_format = detect_db_format(data)
+        return {
+            'format': db_format,
+            'hierarchy_support': True,
+            'projects_count': len(data.get('projects', [])),
+            'storage': storage.backend
+        }
     except:
         return {
             'format': 'error',
-            'hierarchy_support': HIERARCHY_SUPPORT,
+            'hierarchy_support': True,
             'projects_count': 0
         }
 
 
-def update_passive_tracking(data, today, bit_position, should_track, activity_info, has_active_project=False):
+def update_passive_tracking(data, today, bit_position, should_track, activity_info, has_active_project=False, log=None):
     """
     Обновляет пассивное отслеживание активности пользователя
     
@@ -441,83 +548,24 @@ def update_passive_tracking(data, today, bit_position, should_track, activity_in
         should_track (bool): Должно ли записываться время проекта
         activity_info (dict): Информация об активности пользователя
         has_active_project (bool): Есть ли активный проект
+        log (str|TickLog): Лог для записи ошибок (по умолчанию - tracker.log рядом со скриптом)
     """
     try:
-        # Инициализируем passive_tracking если отсутствует
-        if 'passive_tracking' not in data['meta']:
-            data['meta']['passive_tracking'] = {
-                'enabled': True,
-                'track_idle_periods': True,
-                'track_non_project_activity': True,
-                'description': 'Track periods when user is active but no project is selected',
-                'daily_masks': {},
-                'analysis': {
-                    'total_computer_time_minutes': 0,
-                    'total_project_time_minutes': 0,
-                    'total_idle_time_minutes': 0,
-                    'total_untracked_work_minutes': 0,
-                    'productivity_ratio': 0.0,
-                    'description': 'Calculated daily from bit masks'
-                }
-            }
-        
-        passive_tracking = data['meta']['passive_tracking']
-        
-        # Проверяем что функция включена
-        if not passive_tracking.get('enabled', True):
-            return
-        
-        # Инициализируем маски для сегодняшнего дня
-        if today not in passive_tracking['daily_masks']:
-            passive_tracking['daily_masks'][today] = {
-                'computer_activity': '0' * 144,
-                'project_activity': '0' * 144,
-                'idle_periods': '0' * 144,
-                'untracked_work': '0' * 144
-            }
-        
-        masks = passive_tracking['daily_masks'][today]
-        
-        # Определяем состояние пользователя
+        # Определяем состояние пользователя и обновляем маски
         is_user_active = activity_info.get('is_active', False)
-        is_idle = not is_user_active
-        
-        # Обновляем маски
-        def set_bit(mask_name, value):
-            mask = list(masks[mask_name])
-            if bit_position < len(mask):
-                mask[bit_position] = '1' if value else mask[bit_position]
-                masks[mask_name] = ''.join(mask)
-        
-        # 1. computer_activity - любая активность пользователя
-        if is_user_active:
-            set_bit('computer_activity', True)
-        
-        # 2. project_activity - активность + есть активный проект + записываем время
-        if is_user_active and has_active_project and should_track:
-            set_bit('project_activity', True)
-        
-        # 3. idle_periods - когда пользователь неактивен
-        if is_idle:
-            set_bit('idle_periods', True)
-        
-        # 4. untracked_work - активен но нет проекта ИЛИ проект есть но время не записывается
-        if is_user_active and (not has_active_project or not should_track):
-            set_bit('untracked_work', True)
-        
-        # Пересчитываем ежедневную аналитику
-        update_daily_analysis(passive_tracking, today)
+        flags = get_passive_flags(is_user_active, has_active_project, should_track)
+        set_passive_bits(data, today, bit_position, flags)
+        # Заголовок активного окна - в слот дня (core.windows)
+        set_passive_window(data, today, bit_position, flags, activity_info.get('active_window'))
         
     except Exception as e:
         # Не прерываем работу трекера из-за ошибок в пассивном отслеживании
-        import datetime
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        log_path = os.path.join(script_dir, 'tracker.log')
-        now = datetime.datetime.now()
-        error_entry = f"{now.strftime('%Y-%m-%d %H:%M:%S')} | PASSIVE_TRACKING_ERROR | {str(e)}\n"
+        if log is None:
+            script_dir = os.path.dirname(os.path.abspath(__file__))
+            log = os.path.join(script_dir, 'tracker.log')
         try:
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(error_entry)
+            with open_tick_log(log, data) as log:
+                log.event(datetime.datetime.now(), 'PASSIVE_TRACKING_ERROR', str(e))
         except:
             pass
 
@@ -531,35 +579,230 @@ def update_daily_analysis(passive_tracking, today):
         today (str): Дата для анализа
     """
     try:
-        if today not in passive_tracking['daily_masks']:
-            return
-        
-        masks = passive_tracking['daily_masks'][today]
-        
-        # Считаем минуты по маскам (каждый бит = 5 минут)
-        computer_minutes = masks['computer_activity'].count('1') * 5
-        project_minutes = masks['project_activity'].count('1') * 5
-        idle_minutes = masks['idle_periods'].count('1') * 5
-        untracked_minutes = masks['untracked_work'].count('1') * 5
-        
-        # Обновляем аналитику
-        analysis = passive_tracking['analysis']
-        analysis['total_computer_time_minutes'] = computer_minutes
-        analysis['total_project_time_minutes'] = project_minutes
-        analysis['total_idle_time_minutes'] = idle_minutes
-        analysis['total_untracked_work_minutes'] = untracked_minutes
-        
-        # Вычисляем коэффициент продуктивности
-        if computer_minutes > 0:
-            analysis['productivity_ratio'] = round(project_minutes / computer_minutes, 3)
-        else:
-            analysis['productivity_ratio'] = 0.0
-            
+        _update_daily_analysis(passive_tracking, today)
     except Exception as e:
         # Молча игнорируем ошибки аналитики
         pass
 
 
+class TrackerDaemon:
+    """
+    Долгоживущий режим трекера (tracker_quick.py --daemon)
+    
+    Вместо холодного старта интерпретатора каждые 5 минут держит в памяти
+    загруженную БД и монитор активности, тикает на границах 5-минутных слотов
+    и пишет на диск только дельты - записи журнала db.journal или точечные
+    обновления строк SQLite. Внешние изменения файла БД (CLI, веб-дашборд,
+    сворачивание журнала) подхватываются по mtime/size.
+    
+    Между тиками монитор снимает замеры бездействия каждые sample_interval_seconds
+    (core.active.ActivitySampler), и активность слота считается по доле активных
+    замеров, а не по одному замеру в момент тика. Замеры живут только в памяти.
+    """
+    
+    SLOT_MINUTES = 5
+    SLOT_OFFSET_SECONDS = 1  # Запас, чтобы тик гарантированно попал внутрь нового слота
+    
+    def __init__(self, script_dir=None):
+        """
+        Args:
+            script_dir (str): Директория с БД и tracker.log (по умолчанию - директория скрипта)
+        """
+        self.script_dir = script_dir or os.path.dirname(os.path.abspath(__file__))
+        self.storage = get_storage(self.script_dir)
+        self.db_path = self.storage.path
+        self.log_path = os.path.join(self.script_dir, 'tracker.log')
+        self.data = None
+        self.activity_monitor = None
+        self.sampler = None
+        self._activity_config = None
+        self._db_signature = None
+    
+    def _get_db_signature(self):
+        """Возвращает (mtime, size) файла БД для обнаружения внешних изменений"""
+        return self.storage.get_signature()
+    
+    def reload_if_changed(self):
+        """
+        Перечитывает БД если файл изменился с момента последней загрузки/записи
+        
+        Returns:
+            bool: True если данные были перечитаны
+        """
+        signature = self._get_db_signature()
+        if self.data is not None and signature == self._db_signature:
+            return False
+        
+        self.data = self.storage.load(compact=False, history=False)
+        self._db_signature = signature
+        
+        # Монитор пересоздается только при изменении meta.activity_monitoring: источник
+        # хранит состояние между тиками (счетчики прерываний, позиция replay).
+        # Буфер замеров переживает и пересоздание, если не изменился интервал
+        activity_config = self.data.get('meta', {}).get('activity_monitoring', {})
+        if self.activity_monitor is None or activity_config != self._activity_config:
+            from core.active import create_activity_monitor_from_config, create_activity_sampler_from_config
+            sampler = create_activity_sampler_from_config(self.data)
+            if sampler is None or self.sampler is None or sampler.interval != self.sampler.interval:
+                self.sampler = sampler
+            self.activity_monitor = create_activity_monitor_from_config(self.data, sampler=self.sampler)
+            self._activity_config = dict(activity_config)
+        return True
+    
+    def commit(self, data, record):
+        """Фиксирует тик в хранилище и запоминает сигнатуру своей записи"""
+        self.storage.commit_tick(data, record)
+        self._db_signature = self._get_db_signature()
+    
+    def tick(self, now=None):
+        """
+        Выполняет один тик над данными в памяти
+        
+        Args:
+            now (datetime): Время тика (по умолчанию - текущее)
+            
+        Returns:
+            bool: Результат track_tick
+        """
+        if now is None:
+            now = datetime.datetime.now()
+        timer = StageTimer()
+        with timer.stage('load'):
+            self.reload_if_changed()
+        result = track_tick(self.data, now, self.commit, self.log_path, self.activity_monitor, timer)
+        write_tick_metrics(self.log_path, self.data, now, timer)
+        return result
+    
+    def seconds_until_next_slot(self, now):
+        """
+        Вычисляет паузу до начала следующего 5-минутного слота
+        
+        Args:
+            now (datetime): Текущее время
+            
+        Returns:
+            float: Количество секунд до следующей границы слота
+        """
+        slot_seconds = self.SLOT_MINUTES * 60
+        seconds_into_day = now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1000000
+        return slot_seconds - (seconds_into_day % slot_seconds) + self.SLOT_OFFSET_SECONDS
+    
+    def sample(self):
+        """Снимает замер бездействия в буфер монитора (ошибки замера не прерывают демон)"""
+        if self.activity_monitor is None or self.sampler is None:
+            return
+        try:
+            self.activity_monitor.sample()
+        except Exception:
+            pass
+    
+    def wait_for_next_slot(self):
+        """Ждет начала следующего слота, снимая замеры активности каждые sample_interval секунд"""
+        deadline = time.monotonic() + self.seconds_until_next_slot(datetime.datetime.now())
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if self.sampler is None:
+                time.sleep(remaining)
+                continue
+            time.sleep(min(self.sampler.interval, remaining))
+            self.sample()
+    
+    def _log(self, message):
+        now = datetime.datetime.now()
+        try:
+            with open_tick_log(self.log_path, self.data) as log:
+                log.event(now, message)
+        except:
+            pass
+    
+    def run(self, max_ticks=None):
+        """
+        Основной цикл демона
+        
+        Первый тик выполняется сразу (текущий слот мог быть еще не записан),
+        дальше - на границах слотов. Установка бита идемпотентна, поэтому
+        повторный тик в том же слоте безопасен.
+        
+        Args:
+            max_ticks (int): Ограничение числа тиков (для тестов), None - бесконечно
+            
+        Returns:
+            bool: True при штатной остановке
+        """
+        self._log(f"DAEMON_START | PID: {os.getpid()}")
+        ticks = 0
+        
+        try:
+            while max_ticks is None or ticks < max_ticks:
+                if ticks > 0:
+                    self.wait_for_next_slot()
+                
+                try:
+                    self.tick()
+                except Exception as e:
+                    # Сбрасываем кеш: данные в памяти могли остаться в частично измененном виде
+                    self.data = None
+                    self._log(f"ERROR | {str(e)}")
+                
+                ticks += 1
+        except KeyboardInterrupt:
+            pass
+        
+        self.storage.close()
+        self._log("DAEMON_STOP")
+        return True
+
+
+def run_daemon():
+    """Запускает трекер в режиме демона"""
+    daemon = TrackerDaemon()
+    return daemon.run()
+
+
+def profile_tick(output_path=None, script_dir=None, limit=25):
+    """
+    Выполняет один тик под cProfile (tracker_quick.py --profile [файл])
+    
+    Статистика сохраняется в файл pstats (по умолчанию tracker.prof рядом с tracker.log)
+    и печатается сводка самых дорогих вызовов по суммарному времени
+    
+    Args:
+        output_path (str): Путь к файлу статистики
+        script_dir (str): Директория с БД и tracker.log (по умолчанию - директория скрипта)
+        limit (int): Сколько строк сводки напечатать
+        
+    Returns:
+        bool: Результат тика
+    """
+    import cProfile
+    import pstats
+    
+    script_dir = script_dir or os.path.dirname(os.path.abspath(__file__))
+    output_path = output_path or os.path.join(script_dir, 'tracker.prof')
+    
+    profiler = cProfile.Profile()
+    result = profiler.runcall(quick_track, script_dir)
+    profiler.dump_stats(output_path)
+    
+    pstats.Stats(profiler).sort_stats('cumulative').print_stats(limit)
+    print(f"Статистика тика: {output_path} (python -m pstats {output_path})")
+    return result
+
+
 if __name__ == "__main__":
-    success = quick_track()
+    if sys.argv[1:2] == ['--break-dialog']:
+        # tracker_quick.py --break-dialog <минуты> <проект> <tracker.log> - фоновый процесс окна
+        success = run_break_dialog(int(sys.argv[2]), sys.argv[3], sys.argv[4]) is not None
+    elif '--daemon' in sys.argv[1:]:
+        success = run_daemon()
+    elif sys.argv[1:2] == ['--profile']:
+        # tracker_quick.py --profile [файл] - тик под cProfile
+        success = profile_tick(sys.argv[2] if len(sys.argv) > 2 else None)
+    elif sys.argv[1:2] == ['--now']:
+        # tracker_quick.py --now 2025-06-09T10:05 - тик за указанное время (отладка, тест старта)
+        success = quick_track(now=datetime.datetime.fromisoformat(sys.argv[2]))
+    else:
+        success = quick_track()
     sys.exit(0 if success else 1)
@@ -61,10 +61,23 @@ class TimeTrackerAPI {
 
   /**
    * Get all projects
+   * Masks are requested only for the last 7 days (day/week filters of the dashboard)
    */
   async getProjects() {
     try {
-      const response = await this.makeRequest('/api/projects');
+      const formatDate = date =>
+        [
+          date.getFullYear(),
+          String(date.getMonth() + 1).padStart(2, '0'),
+          String(date.getDate()).padStart(2, '0'),
+        ].join('-');
+      const to = new Date();
+      const from = new Date(to);
+      from.setDate(from.getDate() - 6);
+
+      const response = await this.makeRequest(
+        `/api/projects?include_masks=range&from=${formatDate(from)}&to=${formatDate(to)}`
+      );
       return response.data;
     } catch (error) {
       throw new Error(`Ошибка загрузки проектов: ${error.message}`);
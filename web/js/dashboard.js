@@ -665,7 +665,7 @@ class Dashboard {
   renderTimeline(timelineData) {
     const container = this.elements.timelineContent;
 
-    if (!timelineData || !timelineData.raw_output) {
+    if (!timelineData || !timelineData.hours) {
       container.innerHTML = `
                 <div class="no-data" style="text-align: center; padding: 20px; color: #718096;">
                     <i class="fas fa-calendar-times" style="font-size: 32px; margin-bottom: 10px;"></i>
@@ -675,9 +675,17 @@ class Dashboard {
       return;
     }
 
+    // Структурированный ответ /api/timeline: часы со строкой слотов P/A/I/-
+    const legend = Object.entries(timelineData.legend)
+      .map(([symbol, label]) => `[${symbol}] ${label}`)
+      .join(' | ');
+    const lines = timelineData.hours
+      .map((hour) => `${hour.hour} ${hour.slots}`)
+      .join('\n');
+
     container.innerHTML = `
             <div class="timeline-data">
-                <pre style="background: #f7fafc; padding: 15px; border-radius: 8px; font-size: 12px; white-space: pre-wrap; overflow-x: auto;">${timelineData.raw_output}</pre>
+                <pre style="background: #f7fafc; padding: 15px; border-radius: 8px; font-size: 12px; white-space: pre-wrap; overflow-x: auto;">${legend}\n\n${lines}</pre>
             </div>
         `;
   }
@@ -688,7 +696,7 @@ class Dashboard {
   renderStats(statsData) {
     const container = this.elements.statsContent;
 
-    if (!statsData || !statsData.raw_output) {
+    if (!statsData || statsData.error) {
       container.innerHTML = `
                 <div class="no-data" style="text-align: center; padding: 20px; color: #718096;">
                     <i class="fas fa-chart-bar" style="font-size: 32px; margin-bottom: 10px;"></i>
@@ -698,9 +706,43 @@ class Dashboard {
       return;
     }
 
+    const formatTime = (minutes) =>
+      `${Math.floor(minutes / 60)}ч ${minutes % 60}м`;
+
+    const rows = [
+      ['Время за компьютером', statsData.computer_minutes, `${statsData.computer_pct}% от рабочего дня`],
+      ['Проектная работа', statsData.project_minutes, `${statsData.project_pct}% от времени за ПК`],
+      ['Непроектная активность', statsData.untracked_minutes, `${statsData.untracked_pct}% от времени за ПК`],
+      ['Простой/перерывы', statsData.idle_minutes, `${statsData.idle_pct}% от рабочего дня`],
+    ];
+
     container.innerHTML = `
             <div class="stats-data">
-                <pre style="background: #f7fafc; padding: 15px; border-radius: 8px; font-size: 12px; white-space: pre-wrap; overflow-x: auto;">${statsData.raw_output}</pre>
+                <div class="project-stats">
+                    <div class="stat">
+                        <span class="stat-value">${statsData.productivity}%</span>
+                        <span class="stat-label">Продуктивность</span>
+                    </div>
+                    <div class="stat">
+                        <span class="stat-value">${formatTime(statsData.project_minutes)}</span>
+                        <span class="stat-label">Проектная работа</span>
+                    </div>
+                </div>
+                <table style="width: 100%; font-size: 13px; border-collapse: collapse; margin-bottom: 12px;">
+                    ${rows
+                      .map(
+                        ([label, minutes, share]) => `
+                    <tr>
+                        <td style="padding: 4px 0; color: #4a5568;">${label}</td>
+                        <td style="padding: 4px 0; text-align: right; font-weight: 600;">${formatTime(minutes)}</td>
+                        <td style="padding: 4px 0 4px 10px; text-align: right; color: #718096;">${share}</td>
+                    </tr>`
+                      )
+                      .join('')}
+                </table>
+                ${statsData.recommendations
+                  .map((text) => `<p style="font-size: 13px; color: #4a5568; margin-top: 6px;">${text}</p>`)
+                  .join('')}
             </div>
         `;
   }
@@ -6,17 +6,32 @@ Flask приложение с REST API для управления проект
 
 import sys
 import os
+import copy
 import json
 import argparse
+import threading
+import time
 from datetime import datetime
 
 # Добавляем текущую директорию в путь для импорта project_manager
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from flask import Flask, jsonify, request
+    from flask import Flask, jsonify, request, g
     from flask_cors import CORS
     import project_manager
+    from core.masks import parse_mask, to_legacy, count_minutes, count_minutes_in_range
+    from core.analytics import (
+        calculate_passive_stats, calculate_passive_timeline, calculate_range_timeline, calculate_window_usage,
+        get_available_dates, validate_range, find_last_tracked_slot
+    )
+    from core.history import get_hot_month, get_month, get_months_in_range
+    from core.metrics import MetricsRegistry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+    from core.http_cache import (
+        API_CACHE_CONTROL, make_etag, etag_matches, is_compressible, should_compress, gzip_body,
+        get_static_cache_control
+    )
+    from core.project_query import parse_project_query, apply_project_query, select_daily_masks
 except ImportError as e:
     print(f"ОШИБКА: Не удалось импортировать зависимости: {e}")
     print("Попытка автоматической установки...")
@@ -61,11 +76,21 @@ except ImportError as e:
 
 # Создаем Flask приложение
 app = Flask(__name__)
-CORS(app)  # Разрешаем CORS для разработки
+CORS(app, expose_headers=['X-Total-Count'])  # Разрешаем CORS для разработки
 
 # Настройки
 app.config['JSON_AS_ASCII'] = False  # Поддержка кириллицы
-app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
+app.config['JSONIFY_PRETTYPRINT_REGULAR'] = False  # Компактный JSON: дашборду отступы не нужны
+if hasattr(app, 'json'):
+    # Flask 2.2+: настройки JSON задаются через провайдер (JSON_AS_ASCII в 2.3 удален)
+    app.json.ensure_ascii = False
+    app.json.compact = True
+
+# Файлы дашборда (index.html, css/, js/, lib/)
+WEB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'web')
+
+# GET эндпоинты API, ответ которых зависит не только от БД - без ETag
+NO_ETAG_PATHS = ('/api/health',)
 
 
 def json_error(message, status_code=400, details=None):
@@ -95,25 +120,349 @@ def json_success(data=None, message=None):
     return jsonify(response)
 
 
+# Метрики /metrics (core.metrics): время запросов, загрузки БД, попадания в кеш.
+# Значения живут в памяти процесса и сбрасываются при перезапуске сервера
+metrics = MetricsRegistry()
+
+REQUEST_DURATION = metrics.histogram(
+    'tracker_http_request_duration_seconds', 'Время обработки HTTP запроса по маршрутам', ('method', 'route')
+)
+REQUESTS_TOTAL = metrics.counter(
+    'tracker_http_requests_total', 'HTTP запросы по маршрутам и статусам ответа', ('method', 'route', 'status')
+)
+DB_LOADS_TOTAL = metrics.counter(
+    'tracker_db_loads_total', 'Загрузки БД с диска (current - текущий месяц, history - шарды истории)', ('kind',)
+)
+DB_LOAD_DURATION = metrics.histogram(
+    'tracker_db_load_duration_seconds', 'Время загрузки БД с диска', ('kind',)
+)
+CACHE_REQUESTS_TOTAL = metrics.counter(
+    'tracker_cache_requests_total', 'Обращения к кешу данных БД и представлений API', ('cache', 'result')
+)
+
+
+class DBCache:
+    """
+    Общий кеш разобранной БД для всех запросов
+    
+    Данные перечитываются только при изменении сигнатуры хранилища
+    (mtime/size файла БД и журнала тиков), поэтому запрос к неизменной БД
+    стоит одного stat(). Производные представления (отформатированные проекты,
+    данные временной шкалы) кешируются вместе с данными и сбрасываются с ними.
+    
+    Загружается только текущий месяц; маски прошлых месяцев догружаются из
+    шардов истории для запросов, которым они нужны (копия данных на набор месяцев).
+    
+    Возвращаемые данные общие для всех запросов - изменять их нельзя.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._data = None
+        self._views = {}
+        self._history = {}
+    
+    def get_data(self, months=()):
+        """
+        Возвращает данные БД, перечитывая их при изменении файлов
+        
+        Args:
+            months (iterable): Месяцы YYYY-MM, маски которых нужны запросу
+                (текущий месяц загружен всегда)
+        
+        Returns:
+            dict: Данные БД (только для чтения)
+        """
+        hot_month = get_hot_month()
+        months = tuple(sorted(set(month for month in months if month < hot_month)))
+        
+        storage = project_manager.get_db_storage()
+        try:
+            # Сигнатура снимается до чтения: если файл изменится во время загрузки,
+            # следующий запрос увидит новую сигнатуру и перечитает данные
+            key = (storage.path, storage.get_signature())
+            data = None
+            with self._lock:
+                if key == self._key:
+                    data = self._data
+                    if not months:
+                        CACHE_REQUESTS_TOTAL.inc(cache='data', result='hit')
+                        return data
+                    if months in self._history:
+                        CACHE_REQUESTS_TOTAL.inc(cache='data', result='hit')
+                        return self._history[months]
+            
+            CACHE_REQUESTS_TOTAL.inc(cache='data', result='miss')
+            if data is None:
+                # GET запросы не сворачивают журнал: это делают CLI и сам трекер
+                started = time.perf_counter()
+                data = storage.load(compact=False, history=False)
+                DB_LOAD_DURATION.observe(time.perf_counter() - started, kind='current')
+                DB_LOADS_TOTAL.inc(kind='current')
+                with self._lock:
+                    self._key = key
+                    self._data = data
+                    self._views = {}
+                    self._history = {}
+                if not months:
+                    return data
+            
+            started = time.perf_counter()
+            merged = copy.deepcopy(data)
+            storage.load_history(merged, months)
+            DB_LOAD_DURATION.observe(time.perf_counter() - started, kind='history')
+            DB_LOADS_TOTAL.inc(kind='history')
+        finally:
+            storage.close()
+        
+        with self._lock:
+            if data is self._data:
+                self._history[months] = merged
+        return merged
+    
+    def get_history_months(self):
+        """Возвращает месяцы, вынесенные в историю (кешируется вместе с данными)"""
+        def build(data):
+            storage = project_manager.get_db_storage()
+            try:
+                return storage.get_history_months()
+            finally:
+                storage.close()
+        return self.get_view('history_months', build)
+    
+    def get_view(self, name, builder, months=()):
+        """
+        Возвращает производное представление данных, вычисляя его один раз на версию БД
+        
+        Args:
+            name (tuple|str): Ключ представления (включая параметры, например дату)
+            builder (callable): Функция builder(data), вычисляющая представление
+            months (iterable): Месяцы истории, нужные представлению (см. get_data)
+        """
+        data = self.get_data(months)
+        with self._lock:
+            if self._is_current(data) and name in self._views:
+                CACHE_REQUESTS_TOTAL.inc(cache='view', result='hit')
+                return self._views[name]
+        
+        CACHE_REQUESTS_TOTAL.inc(cache='view', result='miss')
+        view = builder(data)
+        with self._lock:
+            if self._is_current(data):
+                self._views[name] = view
+        return view
+    
+    def _is_current(self, data):
+        return data is self._data or any(data is merged for merged in self._history.values())
+    
+    def get_etag(self, *parts):
+        """
+        ETag версии БД для ответа API: сигнатура хранилища (mtime/size БД и журнала)
+        и параметры запроса. Данные при этом не загружаются - только stat()
+        
+        Args:
+            *parts: Параметры, от которых зависит ответ (путь запроса, дата)
+        """
+        storage = project_manager.get_db_storage()
+        try:
+            return make_etag(storage.path, storage.get_signature(), *parts)
+        finally:
+            storage.close()
+    
+    def invalidate(self):
+        """Сбрасывает кеш (после изменений БД через API)"""
+        with self._lock:
+            self._key = None
+            self._data = None
+            self._views = {}
+            self._history = {}
+
+
+def get_months_for_date(date):
+    """
+    Месяцы истории, нужные для запроса за дату
+    
+    Без даты берется последняя доступная: если в текущем месяце пассивных данных
+    еще нет (начало месяца), догружается последний месяц истории
+    """
+    if date:
+        return [get_month(date)]
+    if get_available_dates(db_cache.get_data()):
+        return []
+    return db_cache.get_history_months()[-1:]
+
+
+db_cache = DBCache()
+
+
+def get_storage_disk_usage():
+    """Размер файлов хранилища по типам для метрики tracker_db_size_bytes"""
+    storage = project_manager.get_db_storage()
+    try:
+        return {(name,): size for name, size in storage.get_disk_usage().items()}
+    finally:
+        storage.close()
+
+
+def count_projects_by_status():
+    """Количество проектов по статусам для метрики tracker_projects"""
+    counts = {}
+    for project in db_cache.get_data().get('projects', []):
+        key = (project.get('status', 'unknown'),)
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def get_last_tracked_timestamp():
+    """Unix время начала последнего записанного трекером слота (None если записей нет)"""
+    last = db_cache.get_view('last_tracked_slot', find_last_tracked_slot)
+    if not last:
+        return None
+    day = datetime.strptime(last['date'], '%Y-%m-%d')
+    return day.timestamp() + last['minutes_of_day'] * 60
+
+
+def get_tick_lag_seconds():
+    """Секунды с начала последнего записанного слота (растет, если трекер перестал тикать)"""
+    timestamp = get_last_tracked_timestamp()
+    return None if timestamp is None else max(0.0, time.time() - timestamp)
+
+
+metrics.gauge('tracker_db_size_bytes', 'Размер файлов хранилища БД', ('file',), get_storage_disk_usage)
+metrics.gauge('tracker_projects', 'Количество проектов по статусам', ('status',), count_projects_by_status)
+metrics.gauge(
+    'tracker_last_bit_set_timestamp_seconds', 'Начало последнего записанного слота (unix время)',
+    function=get_last_tracked_timestamp
+)
+metrics.gauge('tracker_tick_lag_seconds', 'Секунды с последнего записанного слота', function=get_tick_lag_seconds)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Записывает время и статус запроса (маршрут - шаблон URL, а не конкретный путь)"""
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_DURATION.observe(time.perf_counter() - started, method=request.method, route=route)
+        REQUESTS_TOTAL.inc(method=request.method, route=route, status=str(response.status_code))
+    return response
+
+
+def not_modified(etag, cache_control):
+    """Ответ 304 Not Modified без тела"""
+    response = app.response_class(status=304)
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+@app.before_request
+def check_api_etag():
+    """
+    Условный GET для API: ETag - версия БД, путь с параметрами и сегодняшняя дата
+    (время за сегодня в ответах меняется со сменой дня). Если клиент уже имеет эту
+    версию, отвечаем 304 не загружая данные и не строя представление
+    """
+    if request.method != 'GET' or request.url_rule is None:
+        return None
+    if not request.path.startswith('/api/') or request.path in NO_ETAG_PATHS:
+        return None
+    
+    try:
+        etag = db_cache.get_etag(request.full_path, datetime.now().strftime('%Y-%m-%d'))
+    except OSError:
+        # БД недоступна - ошибку вернет сам эндпоинт
+        return None
+    
+    g.etag = etag
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        return not_modified(etag, API_CACHE_CONTROL)
+    return None
+
+
+@app.after_request
+def finalize_response(response):
+    """ETag и Cache-Control успешных ответов API, gzip для крупных текстовых ответов"""
+    etag = g.get('etag')
+    if etag and response.status_code == 200:
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = API_CACHE_CONTROL
+    
+    if response.status_code != 200 or response.direct_passthrough or not is_compressible(response.mimetype):
+        return response
+    
+    # Ответ зависит от Accept-Encoding - кеши не должны отдавать сжатый ответ клиенту без gzip
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if should_compress(len(body), response.mimetype, request.headers.get('Accept-Encoding'),
+                       response.headers.get('Content-Encoding')):
+        response.set_data(gzip_body(body))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def serve_static_file(subdir, filename, content_type, not_found_message, cache_control=None):
+    """
+    Отдает файл дашборда с ETag (mtime/size файла), Last-Modified и Cache-Control
+    
+    Args:
+        subdir (str): Поддиректория web/ ('' - сам web/)
+        filename (str): Путь к файлу внутри поддиректории
+        content_type (str): Content-Type ответа
+        not_found_message (str): Текст ответа 404
+        cache_control (str): Cache-Control (по умолчанию - get_static_cache_control())
+    """
+    base_dir = os.path.realpath(os.path.join(WEB_DIR, subdir))
+    path = os.path.realpath(os.path.join(base_dir, filename))
+    # Путь не должен выходить за пределы директории (../)
+    if not path.startswith(base_dir + os.sep) or not os.path.isfile(path):
+        return not_found_message, 404
+    
+    stat = os.stat(path)
+    etag = make_etag(path, stat.st_mtime_ns, stat.st_size)
+    cache_control = cache_control or get_static_cache_control()
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        return not_modified(etag, cache_control)
+    
+    with open(path, 'rb') as f:
+        content = f.read()
+    response = app.response_class(content, 200, content_type=content_type)
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = cache_control
+    response.last_modified = stat.st_mtime
+    return response
+
+
 def calculate_today_minutes(project):
     """Вычисляет время проекта за сегодня"""
     try:
         today = datetime.now().strftime("%Y-%m-%d")
         daily_masks = project.get('daily_masks', {})
-        today_mask = daily_masks.get(today, "")
-        
-        if not today_mask:
-            return 0
         
         # Считаем активные биты (каждый бит = 5 минут)
-        active_bits = today_mask.count('1')
-        return active_bits * 5
+        return count_minutes(daily_masks.get(today))
     except:
         return 0
 
 
-def format_project_for_api(project):
-    """Форматирует проект для JSON API"""
+def format_project_for_api(project, include_masks='all', date_from=None, date_to=None):
+    """
+    Форматирует проект для JSON API
+    
+    Args:
+        project (dict): Проект из БД
+        include_masks (str): Маски в ответе: 'all' - все загруженные, 'none' - без поля
+            daily_masks, 'today' / 'range' - только дни date_from..date_to
+        date_from (str): Первый день масок YYYY-MM-DD (для 'today' и 'range')
+        date_to (str): Последний день масок YYYY-MM-DD
+    """
     total_mins = project.get('total_minutes', 0)
     aggregated_mins = project.get('aggregated_minutes', total_mins)
     today_mins = calculate_today_minutes(project)
@@ -123,7 +472,7 @@ def format_project_for_api(project):
     agg_h, agg_m = divmod(aggregated_mins, 60)
     today_h, today_m = divmod(today_mins, 60)
     
-    return {
+    formatted = {
         'id': project.get('id', ''),
         'path': project.get('path', ''),
         'title': project.get('title', ''),
@@ -135,9 +484,16 @@ def format_project_for_api(project):
         'aggregated_time': f"{agg_h}ч {agg_m}м",
         'today_time': f"{today_h}ч {today_m}м" if today_mins > 0 else "0м",
         'fill_color': project.get('fill_color', '#4CAF50'),
-        'description': project.get('description', ''),
-        'daily_masks': project.get('daily_masks', {})
+        'description': project.get('description', '')
     }
+    
+    if include_masks != 'none':
+        daily_masks = project.get('daily_masks', {})
+        if include_masks != 'all':
+            daily_masks = select_daily_masks(daily_masks, date_from, date_to)
+        # Дашборд работает со строками '0'/'1', компактный формат БД разворачиваем
+        formatted['daily_masks'] = {date: to_legacy(mask) for date, mask in daily_masks.items()}
+    return formatted
 
 
 def sort_projects_for_api(projects):
@@ -176,48 +532,35 @@ def calculate_hourly_timeline_data(date, data):
     # 2. Получаем список всех проектов (для генерации полосок задач)
     projects = data.get('projects', [])
     
+    # Разбираем маски один раз: дальше работаем с int и popcount
+    computer_bits = parse_mask(daily_masks.get('computer_activity')) if daily_masks else 0
+    project_bits = parse_mask(daily_masks.get('project_activity')) if daily_masks else 0
+    active_bits = computer_bits | project_bits
+    
+    project_masks = []
+    for project in projects:
+        p_bits = parse_mask(project.get('daily_masks', {}).get(date))
+        if p_bits:
+            project_masks.append((project, p_bits))
+    
     # Диапазон времени: 08:00-19:00 (12 часов)
     for hour in range(8, 20):
         hour_start = (hour - 8) * 12  # 12 слотов по 5 минут в часе
         hour_end = hour_start + 12
         
-        active_minutes = 0
-        project_minutes = 0
         tasks = []  # Новый массив для задач (проектов) этого часа
         
         # --- А. Считаем общую статистику (Высота столбцов) ---
-        if daily_masks:
-            max_len_active = len(daily_masks.get('computer_activity', ''))
-            max_len_project = len(daily_masks.get('project_activity', ''))
-            
-            for slot in range(hour_start, min(hour_end, 144)):
-                # Считаем общую активность (Computer)
-                if slot < max_len_active:
-                    # Активность = либо есть флаг активности, либо флаг проекта
-                    if (daily_masks['computer_activity'][slot] == '1' or 
-                        (slot < max_len_project and daily_masks['project_activity'][slot] == '1')):
-                        active_minutes += 5
-                
-                # Считаем общее проектное время (Global Project)
-                if slot < max_len_project and daily_masks['project_activity'][slot] == '1':
-                    project_minutes += 5
+        # Активность = либо есть флаг активности, либо флаг проекта
+        active_minutes = count_minutes_in_range(active_bits, hour_start, hour_end)
+        
+        # Считаем общее проектное время (Global Project)
+        project_minutes = count_minutes_in_range(project_bits, hour_start, hour_end)
         
         # --- Б. Считаем статистику по конкретным проектам (Цветные полоски) ---
-        for project in projects:
-            # Получаем маску конкретного проекта за эту дату
-            p_daily_masks = project.get('daily_masks', {})
-            p_mask = p_daily_masks.get(date, '')
-            
-            if not p_mask:
-                continue
-                
-            p_minutes_in_hour = 0
-            p_max_len = len(p_mask)
-            
+        for project, p_bits in project_masks:
             # Считаем биты этого проекта в текущем часовом окне
-            for slot in range(hour_start, min(hour_end, 144)):
-                if slot < p_max_len and p_mask[slot] == '1':
-                    p_minutes_in_hour += 5
+            p_minutes_in_hour = count_minutes_in_range(p_bits, hour_start, hour_end)
             
             # Если проект был активен в этом часе, добавляем его в список задач
             if p_minutes_in_hour > 0:
@@ -287,20 +630,39 @@ def get_passive_tracking_data_for_date(data, date):
     return passive['daily_masks'][date]
 
 
+def build_empty_timeline_view(data, date):
+    """
+    Строит временную шкалу за дату без пассивных данных
+    
+    Данные из кеша общие для всех запросов, поэтому пустые маски добавляются
+    в копию секции meta, а не в исходные данные
+    """
+    empty_data = dict(data)
+    empty_data['meta'] = dict(data.get('meta', {}))
+    passive_tracking = dict(empty_data['meta'].get('passive_tracking', {}))
+    passive_tracking['daily_masks'] = {
+        date: {
+            'computer_activity': '',
+            'project_activity': '',
+            'idle_periods': '',
+            'untracked_work': ''
+        }
+    }
+    empty_data['meta']['passive_tracking'] = passive_tracking
+    return calculate_hourly_timeline_data(date, empty_data)
+
+
 # ==================== API ЭНДПОИНТЫ ====================
 
 @app.route('/')
 def index():
     """Главная страница - перенаправление на дашборд"""
-    import os
-    web_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'web')
-    index_path = os.path.join(web_dir, 'index.html')
+    index_path = os.path.join(WEB_DIR, 'index.html')
     
     if os.path.exists(index_path):
-        # Serve the HTML dashboard
-        with open(index_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        return content
+        # Serve the HTML dashboard (перепроверяется при каждой загрузке страницы)
+        return serve_static_file('', 'index.html', 'text/html; charset=utf-8', 'Dashboard not found',
+                                 cache_control=API_CACHE_CONTROL)
     else:
         # Fallback to API info if dashboard not found
         return json_success({
@@ -316,7 +678,9 @@ def index():
                 'POST /api/archive',
                 'GET  /api/analytics',
                 'GET  /api/timeline',
-                'GET  /api/timeline/data'
+                'GET  /api/timeline/data',
+                'GET  /api/windows',
+                'GET  /metrics'
             ]
         }, message='Добро пожаловать в Simple Time Tracker API!')
 
@@ -324,93 +688,92 @@ def index():
 @app.route('/css/<path:filename>')
 def serve_css(filename):
     """Serve CSS files"""
-    import os
-    web_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'web')
-    css_path = os.path.join(web_dir, 'css', filename)
-    
-    if os.path.exists(css_path):
-        with open(css_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        return content, 200, {'Content-Type': 'text/css'}
-    else:
-        return "CSS file not found", 404
+    return serve_static_file('css', filename, 'text/css; charset=utf-8', "CSS file not found")
 
 
 @app.route('/js/<path:filename>')
 def serve_js(filename):
     """Serve JavaScript files"""
-    import os
-    web_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'web')
-    js_path = os.path.join(web_dir, 'js', filename)
-    
-    if os.path.exists(js_path):
-        with open(js_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        return content, 200, {'Content-Type': 'application/javascript'}
-    else:
-        return "JavaScript file not found", 404
+    return serve_static_file('js', filename, 'application/javascript; charset=utf-8', "JavaScript file not found")
 
 
 @app.route('/lib/<path:filename>')
 def serve_lib(filename):
     """Serve library files"""
-    import os
-    web_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'web')
-    lib_path = os.path.join(web_dir, 'lib', filename)
-    
-    if os.path.exists(lib_path):
-        with open(lib_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        # Determine content type based on file extension
-        if filename.endswith('.js'):
-            content_type = 'application/javascript'
-        elif filename.endswith('.css'):
-            content_type = 'text/css'
-        else:
-            content_type = 'application/octet-stream'
-        return content, 200, {'Content-Type': content_type}
+    # Determine content type based on file extension
+    if filename.endswith('.js'):
+        content_type = 'application/javascript; charset=utf-8'
+    elif filename.endswith('.css'):
+        content_type = 'text/css; charset=utf-8'
     else:
-        return "Library file not found", 404
+        content_type = 'application/octet-stream'
+    return serve_static_file('lib', filename, content_type, "Library file not found")
 
 
 @app.route('/api/projects', methods=['GET'])
 def get_projects():
-    """GET /api/projects - список всех проектов с сортировкой"""
+    """
+    GET /api/projects - список проектов с сортировкой
+    
+    Параметры (core.project_query): fields, include_masks=all|none|today|range (from, to),
+    status, path, limit, offset. По умолчанию все загруженные маски, как до появления
+    параметров. Количество проектов после фильтров - в заголовке X-Total-Count
+    """
     try:
-        # Загружаем БД
-        data, _ = project_manager.load_db()
-        projects = data.get('projects', [])
+        today = datetime.now().strftime("%Y-%m-%d")
+        try:
+            query = parse_project_query(request.args, today)
+        except ValueError as e:
+            return json_error(str(e), 400)
         
-        # Форматируем и сортируем
-        formatted_projects = [format_project_for_api(p) for p in projects]
-        sorted_projects = sort_projects_for_api(formatted_projects)
+        # Форматированный и отсортированный список кешируется до изменения БД отдельно
+        # для каждого набора масок; фильтры, страница и поля применяются к нему
+        masks = (query['include_masks'], query['date_from'], query['date_to'])
+        months = get_months_in_range(query['date_from'], query['date_to']) if query['include_masks'] == 'range' else ()
+        sorted_projects = db_cache.get_view(
+            ('projects', today) + masks,
+            lambda data: build_projects_view(data, *masks),
+            months
+        )
         
-        return json_success({
-            'projects': sorted_projects,
-            'total': len(sorted_projects)
-        })
+        result = apply_project_query(sorted_projects, query)
+        response = json_success(result)
+        response.headers['X-Total-Count'] = str(result['total'])
+        return response
         
     except Exception as e:
         return json_error(f"Ошибка загрузки проектов: {str(e)}", 500)
 
 
+def build_projects_view(data, include_masks='all', date_from=None, date_to=None):
+    """Строит отформатированный и отсортированный список проектов для API (маски см. format_project_for_api)"""
+    formatted_projects = [format_project_for_api(p, include_masks, date_from, date_to) for p in data.get('projects', [])]
+    return sort_projects_for_api(formatted_projects)
+
+
+def build_active_project_view(data):
+    """Строит отформатированный активный проект для API (None если нет)"""
+    for project in data.get('projects', []):
+        if project.get('status') == 'active':
+            return format_project_for_api(project)
+    return None
+
+
+def load_active_project():
+    """Возвращает отформатированный активный проект из кеша"""
+    today = datetime.now().strftime("%Y-%m-%d")
+    return db_cache.get_view(('active', today), build_active_project_view)
+
+
 @app.route('/api/active', methods=['GET'])
 def get_active_project():
     """GET /api/active - получить активный проект"""
     try:
-        data, _ = project_manager.load_db()
-        projects = data.get('projects', [])
-        
-        # Ищем активный проект
-        active_project = None
-        for project in projects:
-            if project.get('status') == 'active':
-                active_project = project
-                break
+        active_project = load_active_project()
         
         if active_project:
             return json_success({
-                'project': format_project_for_api(active_project)
+                'project': active_project
             })
         else:
             return json_success({
@@ -434,16 +797,13 @@ def start_project():
         
         # Используем существующую функцию project_manager
         if project_manager.set_active_project(identifier):
+            db_cache.invalidate()
+            
             # Получаем обновленный активный проект
-            active_data, _ = project_manager.load_db()
-            active_project = None
-            for project in active_data['projects']:
-                if project.get('status') == 'active':
-                    active_project = project
-                    break
+            active_project = load_active_project()
             
             return json_success({
-                'project': format_project_for_api(active_project) if active_project else None
+                'project': active_project
             }, message=f'Проект "{identifier}" активирован')
         else:
             return json_error(f'Проект "{identifier}" не найден', 404)
@@ -463,6 +823,7 @@ def pause_project():
         identifier = data['identifier']
         
         if project_manager.set_project_status(identifier, 'paused'):
+            db_cache.invalidate()
             return json_success(message=f'Проект "{identifier}" приостановлен')
         else:
             return json_error(f'Проект "{identifier}" не найден', 404)
@@ -482,6 +843,7 @@ def complete_project():
         identifier = data['identifier']
         
         if project_manager.set_project_status(identifier, 'completed'):
+            db_cache.invalidate()
             return json_success(message=f'Проект "{identifier}" завершен')
         else:
             return json_error(f'Проект "{identifier}" не найден', 404)
@@ -501,6 +863,7 @@ def archive_project():
         identifier = data['identifier']
         
         if project_manager.set_project_status(identifier, 'archived'):
+            db_cache.invalidate()
             return json_success(message=f'Проект "{identifier}" архивирован')
         else:
             return json_error(f'Проект "{identifier}" не найден', 404)
@@ -516,32 +879,19 @@ def get_analytics():
         # Получаем дату из параметров (опционально)
         date = request.args.get('date')
         
-        # Захватываем stdout для получения результата show_passive_stats
-        import io
-        import contextlib
-        
-        f = io.StringIO()
-        with contextlib.redirect_stdout(f):
-            success = project_manager.show_passive_stats(date)
-        
-        output = f.getvalue()
+        stats = db_cache.get_view(
+            ('analytics', date), lambda data: calculate_passive_stats(data, date), get_months_for_date(date)
+        )
         
-        if not success:
+        if stats['error']:
             return json_success({
                 'stats': None,
                 'message': 'Нет данных пассивного отслеживания' if not date else f'Нет данных за {date}',
-                'available_dates': None
+                'available_dates': stats['available_dates']
             })
         
-        # Парсим вывод для извлечения данных
-        stats_data = {
-            'raw_output': output,
-            'date': date or 'последняя доступная',
-            'parsed': False  # Можно улучшить парсинг позже
-        }
-        
         return json_success({
-            'analytics': stats_data
+            'analytics': stats
         })
         
     except Exception as e:
@@ -555,32 +905,19 @@ def get_timeline():
         # Получаем дату из параметров (опционально)
         date = request.args.get('date')
         
-        # Захватываем stdout для получения результата show_passive_timeline
-        import io
-        import contextlib
-        
-        f = io.StringIO()
-        with contextlib.redirect_stdout(f):
-            success = project_manager.show_passive_timeline(date)
-        
-        output = f.getvalue()
+        timeline = db_cache.get_view(
+            ('passive_timeline', date), lambda data: calculate_passive_timeline(data, date), get_months_for_date(date)
+        )
         
-        if not success:
+        if timeline['error']:
             return json_success({
                 'timeline': None,
                 'message': 'Нет данных временной шкалы' if not date else f'Нет данных за {date}',
-                'available_dates': None
+                'available_dates': timeline['available_dates']
             })
         
-        # Парсим вывод для извлечения данных
-        timeline_data = {
-            'raw_output': output,
-            'date': date or 'последняя доступная',
-            'parsed': False  # Можно улучшить парсинг позже
-        }
-        
         return json_success({
-            'timeline': timeline_data
+            'timeline': timeline
         })
         
     except Exception as e:
@@ -603,29 +940,23 @@ def get_timeline_data():
         except ValueError:
             return json_error('Неверный формат даты. Используйте YYYY-MM-DD', 400)
         
-        # Загружаем БД
-        data, _ = project_manager.load_db()
+        # Загружаем БД (из кеша) вместе с шардом истории месяца даты
+        months = [get_month(date)]
+        data = db_cache.get_data(months)
         
         # Получаем данные пассивного отслеживания
         daily_masks = get_passive_tracking_data_for_date(data, date)
         
         if daily_masks is None:
             # Если данных за дату нет, возвращаем пустую структуру с пустыми проектами
-            empty_data = data.copy()
-            if 'meta' not in empty_data:
-                empty_data['meta'] = {}
-            if 'passive_tracking' not in empty_data['meta']:
-                empty_data['meta']['passive_tracking'] = {'daily_masks': {}}
-            empty_data['meta']['passive_tracking']['daily_masks'][date] = {
-                'computer_activity': '',
-                'project_activity': '',
-                'idle_periods': '',
-                'untracked_work': ''
-            }
-            return json_success(calculate_hourly_timeline_data(date, empty_data))
+            return json_success(db_cache.get_view(
+                ('timeline_empty', date), lambda data: build_empty_timeline_view(data, date), months
+            ))
         
         # Вычисляем структурированные данные с поддержкой Task Swimlanes
-        timeline_data = calculate_hourly_timeline_data(date, data)
+        timeline_data = db_cache.get_view(
+            ('timeline', date), lambda data: calculate_hourly_timeline_data(date, data), months
+        )
         
         return jsonify(timeline_data)
         
@@ -633,18 +964,91 @@ def get_timeline_data():
         return json_error(f"Ошибка получения данных временной шкалы: {str(e)}", 500)
 
 
+@app.route('/api/timeline/range', methods=['GET'])
+def get_timeline_range():
+    """
+    GET /api/timeline/range?from=YYYY-MM-DD&to=YYYY-MM-DD&granularity=hour|day|week
+    Активность и время проектов за диапазон дат одним запросом
+    """
+    try:
+        date_from = request.args.get('from')
+        date_to = request.args.get('to')
+        granularity = request.args.get('granularity', 'day')
+        
+        if not date_from or not date_to:
+            return json_error('Требуются параметры "from" и "to" (YYYY-MM-DD)', 400)
+        
+        try:
+            validate_range(date_from, date_to, granularity)
+        except ValueError as e:
+            return json_error(str(e), 400)
+        
+        range_data = db_cache.get_view(
+            ('timeline_range', date_from, date_to, granularity),
+            lambda data: calculate_range_timeline(data, date_from, date_to, granularity),
+            get_months_in_range(date_from, date_to)
+        )
+        
+        return json_success(range_data)
+        
+    except Exception as e:
+        return json_error(f"Ошибка получения данных за диапазон: {str(e)}", 500)
+
+
+@app.route('/api/windows', methods=['GET'])
+def get_windows():
+    """GET /api/windows?date=YYYY-MM-DD - время по приложениям (заголовкам активных окон) за день"""
+    try:
+        date = request.args.get('date')
+        if not date:
+            return json_error('Требуется параметр "date" в формате YYYY-MM-DD', 400)
+        
+        try:
+            datetime.strptime(date, '%Y-%m-%d')
+        except ValueError:
+            return json_error('Неверный формат даты. Используйте YYYY-MM-DD', 400)
+        
+        usage = db_cache.get_view(
+            ('windows', date), lambda data: calculate_window_usage(data, date), [get_month(date)]
+        )
+        
+        if usage['error']:
+            return json_success({
+                'windows': None,
+                'message': f'Нет данных за {date}',
+                'available_dates': usage['available_dates']
+            })
+        
+        return json_success({
+            'windows': usage
+        })
+        
+    except Exception as e:
+        return json_error(f"Ошибка получения данных об окнах: {str(e)}", 500)
+
+
+def build_health_view(data):
+    """Тип хранилища (json/sqlite) и количество проектов для /api/health"""
+    storage = project_manager.get_db_storage()
+    try:
+        backend = storage.backend
+    finally:
+        storage.close()
+    return {'storage': backend, 'projects_count': len(data.get('projects', []))}
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Проверка состояния API"""
     try:
-        # Проверяем доступность БД
-        data, _ = project_manager.load_db()
-        project_count = len(data.get('projects', []))
+        # Проверяем доступность БД (через кеш: при неизменной БД - только stat)
+        health = db_cache.get_view('health', build_health_view)
         
         return json_success({
             'status': 'healthy',
             'database': 'connected',
-            'projects_count': project_count,
+            'storage': health['storage'],
+            'projects_count': health['projects_count'],
             'timestamp': datetime.now().isoformat()
         })
         
@@ -652,6 +1056,12 @@ def health_check():
         return json_error(f"Health check failed: {str(e)}", 503)
 
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """GET /metrics - метрики сервера в текстовом формате Prometheus"""
+    return metrics.render(), 200, {'Content-Type': METRICS_CONTENT_TYPE}
+
+
 # Обработчики ошибок
 @app.errorhandler(404)
 def not_found(error):